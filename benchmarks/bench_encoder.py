@@ -0,0 +1,105 @@
+"""
+Response encoder benchmarks
+
+Times json.dumps against the streaming iterencode used for large responses
+on synthetic pidstatus like results of increasing size, bare and wrapped
+in a response envelope, and reports per case:
+
+* mean, p50 and p99 latency over --repeat calls of each encoder
+* the number of pieces iterencode yields
+* the slow down of iterencode relative to json.dumps
+
+The report is JSON, two reports can be compared with --compare:
+
+    python -m benchmarks.bench_encoder --sizes 100,1000,5000 -o new.json
+    python -m benchmarks.bench_encoder --compare old.json -o new.json
+"""
+import sys
+import json
+import argparse
+
+from benchmarks import benchutil
+from slashproc_parser.jsonrpclib.jsonrpc import iterencode
+
+DEFAULT_SIZES = (10, 100, 1000, 5000)
+DEFAULT_REPEAT = 20
+
+
+def pidstatus(processes):
+    """
+    A result shaped like pidstatus get_data for that many processes
+    """
+    return {'pidstatus': dict(
+        (str(pid), {'name': 'process%d' % pid, 'state': 'S (sleeping)',
+                    'vmrss': pid * 4, 'vmsize': pid * 16, 'threads': 1,
+                    'groups': [0, 4, 24, pid % 1000],
+                    'sigq': {'queued': 0, 'limit': 63459}})
+        for pid in range(1, processes + 1))}
+
+
+SHAPES = {
+    'bare': lambda size: pidstatus(size)['pidstatus'],
+    'envelope': lambda size: {'id': '1', 'jsonrpc': '2.0',
+                              'result': pidstatus(size)},
+}
+
+
+def measure(func, repeat):
+    func()
+    latencies = list()
+    for _ in range(repeat):
+        start = benchutil.timer()
+        func()
+        latencies.append(benchutil.timer() - start)
+    return benchutil.summarize(latencies)
+
+
+def run(sizes, repeat):
+    results = list()
+    for size in sizes:
+        for shape in sorted(SHAPES):
+            obj = SHAPES[shape](size)
+            dumps = measure(lambda: json.dumps(obj), repeat)
+            streamed = measure(lambda: ''.join(iterencode(obj)), repeat)
+            for encoder, result in (('dumps', dumps),
+                                    ('iterencode', streamed)):
+                result.update(size=size, shape=shape, encoder=encoder)
+                results.append(result)
+            streamed.update(pieces=len(list(iterencode(obj))),
+                            ratio=streamed['mean'] / dumps['mean'])
+            sys.stderr.write(format_result(dumps, streamed) + '\n')
+    return results
+
+
+def format_result(dumps, streamed):
+    return '%6d %-8s dumps %9.3fms iterencode %9.3fms x%.2f %5d pieces' % (
+        dumps['size'], dumps['shape'], dumps['mean'] * 1000,
+        streamed['mean'] * 1000, streamed['ratio'], streamed['pieces'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='comma separated numbers of processes')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('-o', '--output', help='JSON report, default stdout')
+    parser.add_argument('--compare', help='previous JSON report')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative slow down reported as a regression')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    report = {'meta': benchutil.meta(benchmark='encoder', repeat=args.repeat,
+                                     sizes=sizes),
+              'results': run(sizes, args.repeat)}
+    benchutil.save(report, args.output)
+
+    if args.compare:
+        regressions = benchutil.compare(benchutil.load(args.compare), report,
+                                        ('size', 'shape', 'encoder'), 'mean',
+                                        args.threshold)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
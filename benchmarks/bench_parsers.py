@@ -0,0 +1,178 @@
+"""
+Parser benchmarks with scaling curves
+
+Times get_groups, get_vars and get_data of every parser in parsers.__all__
+against synthetic /proc trees of increasing size and reports, per case:
+
+* mean, p50 and p99 latency over --repeat calls
+* allocations of one call, bytes allocated at the peak when tracemalloc is
+  available, otherwise the number of gc tracked objects the result keeps
+* peak RSS growth of the case in kB
+
+Every case runs in its own forked child so ru_maxrss only covers that case.
+The report is JSON, two reports can be compared with --compare:
+
+    python -m benchmarks.bench_parsers --sizes 100,1000,10000 -o new.json
+    python -m benchmarks.bench_parsers --compare old.json -o new.json
+"""
+import os
+import gc
+import sys
+import json
+import shutil
+import argparse
+import resource
+import tempfile
+
+from benchmarks import benchutil
+from slashproc_parser import fixtures
+from slashproc_parser.basic_parser import BasicSPParser
+from slashproc_parser.basic_server import import_parsers
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+METHODS = ('get_groups', 'get_vars', 'get_data')
+DEFAULT_SIZES = (100, 1000, 10000)
+DEFAULT_REPEAT = 20
+
+
+def fixture_args(processes):
+    """
+    Scales the other dimensions of the tree with the number of processes
+    """
+    return dict(processes=processes,
+                interfaces=max(2, processes // 200),
+                cpus=max(4, min(processes // 100, 256)))
+
+
+def vm_rss():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def allocations(func):
+    if tracemalloc is not None:
+        tracemalloc.start()
+        try:
+            func()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    gc.collect()
+    before = len(gc.get_objects())
+    result = func()
+    after = len(gc.get_objects())
+    del result
+    return after - before
+
+
+def measure(func, repeat):
+    func()  # warm up caches and imports
+    latencies = list()
+    for _ in range(repeat):
+        start = benchutil.timer()
+        func()
+        latencies.append(benchutil.timer() - start)
+    result = benchutil.summarize(latencies)
+    result['alloc'] = allocations(func)
+    return result
+
+
+def run_case(func, repeat):
+    """
+    Measures func in a forked child, returns the result dict
+    """
+    rfd, wfd = os.pipe()
+    pid = os.fork()
+    if not pid:
+        os.close(rfd)
+        code = 0
+        try:
+            rss = vm_rss()
+            result = measure(func, repeat)
+            result['peak_rss_kb'] = \
+                resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss
+        except Exception as e:
+            result = {'error': '%s: %s' % (type(e).__name__, e)}
+            code = 1
+        with os.fdopen(wfd, 'w') as f:
+            f.write(json.dumps(result))
+        os._exit(code)
+
+    os.close(wfd)
+    with os.fdopen(rfd) as f:
+        output = f.read()
+    os.waitpid(pid, 0)
+    return json.loads(output) if output else {'error': 'no result'}
+
+
+def run(sizes, repeat, names=None, methods=METHODS, workdir=None):
+    classes = import_parsers()[1]
+    results = list()
+    for size in sizes:
+        root = tempfile.mkdtemp(prefix='bench-proc-', dir=workdir)
+        try:
+            fixtures.generate(root, **fixture_args(size))
+            BasicSPParser.set_proc_root(root)
+            for name in sorted(classes):
+                if names and name not in names:
+                    continue
+                for method in methods:
+                    result = run_case(getattr(classes[name], method), repeat)
+                    result.update(size=size, parser=name, method=method)
+                    results.append(result)
+                    sys.stderr.write(format_result(result) + '\n')
+        finally:
+            BasicSPParser.set_proc_root('/proc')
+            shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def format_result(r):
+    if 'error' in r:
+        return '%6d %-12s %-10s %s' % (r['size'], r['parser'], r['method'],
+                                       r['error'])
+    return '%6d %-12s %-10s mean %9.3fms p99 %9.3fms alloc %9d rss %7dkB' % (
+        r['size'], r['parser'], r['method'], r['mean'] * 1000,
+        r['p99'] * 1000, r['alloc'], r['peak_rss_kb'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='comma separated numbers of processes')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--parsers', help='comma separated parser names')
+    parser.add_argument('--methods', default=','.join(METHODS))
+    parser.add_argument('--workdir', help='where fixture trees are written')
+    parser.add_argument('-o', '--output', help='JSON report, default stdout')
+    parser.add_argument('--compare', help='previous JSON report')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative slow down reported as a regression')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    names = args.parsers.split(',') if args.parsers else None
+    results = run(sizes, args.repeat, names, args.methods.split(','),
+                  args.workdir)
+    report = {'meta': benchutil.meta(
+                  benchmark='parsers', repeat=args.repeat, sizes=sizes,
+                  alloc='bytes' if tracemalloc is not None else 'objects'),
+              'results': results}
+    benchutil.save(report, args.output)
+
+    if args.compare:
+        regressions = benchutil.compare(benchutil.load(args.compare), report,
+                                        ('size', 'parser', 'method'), 'mean',
+                                        args.threshold)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
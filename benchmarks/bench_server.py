@@ -0,0 +1,281 @@
+"""
+Server load benchmark
+
+Starts basic_server in a subprocess on a local port, once per server mode,
+and drives it from client threads with a mix of GET routes, single RPC
+calls and batches. Reports, per mode and concurrency:
+
+* throughput in requests per second and the error count
+* mean, p50, p99 and p999 latency, overall and per kind of request
+* server CPU seconds and utilisation from /proc/<pid>/stat, including
+  the reaped children of the forking server
+
+By default the server reads a synthetic /proc tree, pass --proc-root /proc
+to load the real one:
+
+    python -m benchmarks.bench_server --modes threaded,forking,single \\
+        --concurrency 1,8,32 --duration 10 -o server.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import httplib
+import argparse
+import tempfile
+import threading
+import subprocess
+
+from benchmarks import benchutil
+from slashproc_parser import fixtures
+
+DEFAULT_PORT = 18848
+DEFAULT_MIX = 'get=5,rpc=4,batch=1'
+
+GET_PATHS = (
+    '/slashproc/proc/meminfo',
+    '/slashproc/proc/loadavg',
+    '/slashproc/proc/uptime',
+    '/slashproc/proc/vmstat',
+    '/slashproc/proc/cpuinfo',
+)
+
+RPC_CALLS = (
+    ('get_parsers', {}),
+    ('get_groups', {'parser': 'meminfo'}),
+    ('get_vars', {'parser': 'vmstat'}),
+    ('get_data', {'parser': 'meminfo'}),
+    ('get_data', {'parser': 'loadavg'}),
+    ('get_data', {'parser': 'cpuinfo', 'get': 'model_name'}),
+    ('get_data', {'parser': 'pidstatus'}),
+)
+
+BATCH_SIZE = 5
+
+
+def rpc(method, params, rpcid):
+    return {'jsonrpc': '2.0', 'method': method, 'params': params, 'id': rpcid}
+
+
+def cpu_seconds(pid):
+    """
+    Returns utime + stime of pid and its reaped children in seconds
+    """
+    with open('/proc/%d/stat' % pid) as f:
+        # the command name may hold spaces, the fields start after it
+        fields = f.read().rsplit(')', 1)[1].split()
+    return sum(int(v) for v in fields[11:15]) / \
+        float(os.sysconf('SC_CLK_TCK'))
+
+
+class Server(object):
+    """
+    basic_server running in a subprocess
+    """
+
+    def __init__(self, mode, port, proc_root):
+        self.mode = mode
+        self.port = port
+        self.proc_root = proc_root
+        self.process = None
+
+    def start(self, timeout=10):
+        with open(os.devnull, 'w') as devnull:
+            self.process = subprocess.Popen(
+                [sys.executable, '-m', 'slashproc_parser.basic_server',
+                 '--port', str(self.port), '--server', self.mode, '--quiet',
+                 '--proc-root', self.proc_root],
+                stdout=devnull, stderr=devnull)
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError('server exited with %d' %
+                                   self.process.returncode)
+            try:
+                socket.create_connection(('localhost', self.port), 1).close()
+                return
+            except socket.error:
+                time.sleep(0.05)
+        self.stop()
+        raise RuntimeError('server did not start on port %d' % self.port)
+
+    def cpu(self):
+        return cpu_seconds(self.process.pid)
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait()
+
+
+class Client(threading.Thread):
+    """
+    Sends requests until the deadline and records their latency
+    """
+
+    def __init__(self, port, kinds, deadline, seed):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.port = port
+        self.kinds = kinds
+        self.deadline = deadline
+        self.random = random.Random(seed)
+        self.latencies = dict((k, list()) for k in set(kinds))
+        self.errors = 0
+        self.rpcid = 0
+
+    def request(self, kind):
+        if kind == 'get':
+            return 'GET', self.random.choice(GET_PATHS), None
+        if kind == 'rpc':
+            self.rpcid += 1
+            return 'POST', '/', json.dumps(
+                rpc(*self.random.choice(RPC_CALLS), rpcid=self.rpcid))
+        calls = list()
+        for _ in range(BATCH_SIZE):
+            self.rpcid += 1
+            calls.append(rpc(*self.random.choice(RPC_CALLS),
+                             rpcid=self.rpcid))
+        return 'POST', '/', json.dumps(calls)
+
+    def send(self, method, path, body):
+        connection = httplib.HTTPConnection('localhost', self.port, timeout=30)
+        try:
+            headers = {'Content-Type': 'application/json'} if body else {}
+            connection.request(method, path, body, headers)
+            response = connection.getresponse()
+            response.read()
+            return response.status == 200
+        finally:
+            connection.close()
+
+    def run(self):
+        while time.time() < self.deadline:
+            kind = self.random.choice(self.kinds)
+            method, path, body = self.request(kind)
+            start = benchutil.timer()
+            try:
+                ok = self.send(method, path, body)
+            except (socket.error, httplib.HTTPException):
+                ok = False
+            if ok:
+                self.latencies[kind].append(benchutil.timer() - start)
+            else:
+                self.errors += 1
+
+
+def parse_mix(mix):
+    """
+    Returns the request kinds repeated by weight, eg. get=2,rpc=1
+    """
+    kinds = list()
+    for item in mix.split(','):
+        kind, weight = item.split('=')
+        if kind not in ('get', 'rpc', 'batch'):
+            raise ValueError("unknown request kind '%s'" % kind)
+        kinds.extend([kind] * int(weight))
+    return kinds
+
+
+def run_load(server, concurrency, duration, kinds, warmup=1.0):
+    # let the sampler take its first samples before measuring
+    time.sleep(warmup)
+    cpu = server.cpu()
+    start = time.time()
+    clients = [Client(server.port, kinds, start + duration, seed)
+               for seed in range(concurrency)]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.time() - start
+    cpu = server.cpu() - cpu
+
+    latencies = list()
+    result = {'mode': server.mode, 'concurrency': concurrency,
+              'duration': elapsed, 'kinds': dict()}
+    for kind in set(kinds):
+        samples = [l for c in clients for l in c.latencies[kind]]
+        latencies.extend(samples)
+        result['kinds'][kind] = benchutil.summarize(samples)
+    result.update(benchutil.summarize(latencies))
+    result.update(requests=len(latencies),
+                  errors=sum(c.errors for c in clients),
+                  throughput=len(latencies) / elapsed,
+                  server_cpu=cpu,
+                  server_utilisation=cpu / elapsed)
+    return result
+
+
+def format_result(r):
+    return ('%-8s c=%-3d %8.1f req/s  p50 %7.2fms  p99 %7.2fms  '
+            'p999 %7.2fms  errors %d  cpu %5.1f%%') % (
+        r['mode'], r['concurrency'], r['throughput'],
+        (r['p50'] or 0) * 1000, (r['p99'] or 0) * 1000,
+        (r['p999'] or 0) * 1000, r['errors'], r['server_utilisation'] * 100)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--modes', default='threaded',
+                        help='comma separated server modes, '
+                             'threaded, forking or single')
+    parser.add_argument('--concurrency', default='1,8,32',
+                        help='comma separated numbers of client threads')
+    parser.add_argument('--duration', type=float, default=10,
+                        help='seconds of load per run')
+    parser.add_argument('--mix', default=DEFAULT_MIX,
+                        help='weights of GET routes, RPC calls and batches')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--proc-root',
+                        help='proc tree the server reads, default a '
+                             'generated one')
+    parser.add_argument('--processes', type=int, default=1000,
+                        help='processes in the generated proc tree')
+    parser.add_argument('-o', '--output', help='JSON report, default stdout')
+    parser.add_argument('--compare', help='previous JSON report')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative p99 increase reported as a regression')
+    args = parser.parse_args()
+
+    kinds = parse_mix(args.mix)
+    proc_root = args.proc_root
+    if proc_root is None:
+        proc_root = tempfile.mkdtemp(prefix='bench-proc-')
+        fixtures.generate(proc_root, processes=args.processes)
+
+    results = list()
+    try:
+        for mode in args.modes.split(','):
+            for concurrency in [int(c) for c in args.concurrency.split(',')]:
+                server = Server(mode, args.port, proc_root)
+                server.start()
+                try:
+                    result = run_load(server, concurrency, args.duration, kinds)
+                finally:
+                    server.stop()
+                results.append(result)
+                sys.stderr.write(format_result(result) + '\n')
+    finally:
+        if args.proc_root is None:
+            shutil.rmtree(proc_root, ignore_errors=True)
+
+    report = {'meta': benchutil.meta(
+                  benchmark='server', duration=args.duration, mix=args.mix,
+                  proc_root=args.proc_root or 'generated',
+                  processes=args.processes),
+              'results': results}
+    benchutil.save(report, args.output)
+
+    if args.compare:
+        regressions = benchutil.compare(benchutil.load(args.compare), report,
+                                        ('mode', 'concurrency'), 'p99',
+                                        args.threshold)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Helpers shared by the benchmarks
+"""
+import os
+import sys
+import json
+import time
+import platform
+import timeit
+
+timer = timeit.default_timer
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of values, pct between 0 and 100
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(-(-pct * len(ordered) // 100)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(latencies):
+    """
+    Returns the latency statistics of a list of seconds
+    """
+    return {'n': len(latencies),
+            'mean': sum(latencies) / len(latencies) if latencies else None,
+            'min': min(latencies) if latencies else None,
+            'max': max(latencies) if latencies else None,
+            'p50': percentile(latencies, 50),
+            'p99': percentile(latencies, 99),
+            'p999': percentile(latencies, 99.9)}
+
+
+def meta(**kwargs):
+    info = {'python': platform.python_version(),
+            'platform': platform.platform(),
+            'host': platform.node(),
+            'cpus': os.sysconf('SC_NPROCESSORS_ONLN'),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}
+    info.update(kwargs)
+    return info
+
+
+def save(report, output=None):
+    text = json.dumps(report, indent=1, sort_keys=True)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        sys.stdout.write(text + '\n')
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(old, new, keys, metric, threshold):
+    """
+    Prints the change of metric between two reports for every matching case
+
+    :param keys: fields that identify a case
+    :param threshold: relative slow down reported as a regression
+    :rtype int: number of regressions
+    """
+    def index(report):
+        return dict((tuple(r.get(k) for k in keys), r)
+                    for r in report['results'])
+
+    before = index(old)
+    regressions = 0
+    for case, result in sorted(index(new).items()):
+        if case not in before or not before[case].get(metric) or \
+                result.get(metric) is None:
+            continue
+        ratio = result[metric] / before[case][metric]
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        sys.stderr.write('%-50s %10.6f -> %10.6f  x%.2f%s\n' % (
+            ' '.join(str(c) for c in case), before[case][metric],
+            result[metric], ratio, flag))
+    return regressions
@@ -6,8 +6,11 @@ This is primarily to help Developers write and test
 individual sp_parsers.
 
 """
+import os
 import pprint
 
+from slashproc_parser.parsers.parse_helpers import read_file
+
 
 class SPParserError(Exception):
     def __init__(self, value):
@@ -58,14 +61,78 @@ class MSG(object):
         return msg % param if '%s' in msg else msg
 
 
+#seconds the data of each volatility class may be cached
+#  boot     fixed until the next boot, eg. /proc/version, cached for as
+#           long as the boot id stays the same and the TTL without one
+#  rare     settings only changed by hand, eg. /proc/sys
+#  slow     nearly static, eg. /proc/cpuinfo whose MHz drift
+#  dynamic  changes all the time, eg. /proc/meminfo
+VOLATILITY_TTLS = {
+    'boot': 3600,
+    'rare': 30,
+    'slow': 10,
+    'dynamic': 1,
+}
+
+
 class BasicSPParser(object):
     """
     Base class for any sp_parser
+
+    Parsers declare their files as absolute /proc paths and open them
+    through proc_path, so the whole process can be pointed at another
+    proc tree, a captured snapshot or a container host's /host/proc
     """
 
+    # where every parser looks for /proc, see set_proc_root
+    proc_root = '/proc'
+
+    # changes on every boot, keys the data of 'boot' parsers
+    BOOT_ID = '/proc/sys/kernel/random/boot_id'
+
+    # how often the data changes, one of VOLATILITY_TTLS
+    VOLATILITY = 'dynamic'
+
+    # seconds the data may be cached, None for the volatility's TTL
+    CACHE_TTL = None
+
+    # get_groups and get_vars follow the data, eg. a group per process,
+    # and are read on every request instead of cached like the data
+    DYNAMIC_SCHEMA = False
+
     def __init__(self, *args, **kwargs):
         super(BasicSPParser, self).__init__()
 
+    @staticmethod
+    def set_proc_root(root):
+        """
+        Sets the proc root for every parser in the process
+        """
+        BasicSPParser.proc_root = root.rstrip('/') or '/'
+
+    @staticmethod
+    def proc_path(path):
+        """
+        Maps a /proc path onto the proc root
+
+        :param path: absolute path starting with /proc
+        """
+        if path == '/proc':
+            return BasicSPParser.proc_root
+        if path.startswith('/proc/'):
+            return os.path.join(BasicSPParser.proc_root,
+                                path[len('/proc/'):])
+        return path
+
+    @staticmethod
+    def read_proc(path):
+        """
+        Returns the contents of a /proc path under the proc root
+
+        Reads are timed as the read phase of the current request
+        """
+        return read_file(BasicSPParser.proc_path(path))
+
     @staticmethod
     def get_groups():
         """
@@ -87,6 +154,36 @@ class BasicSPParser(object):
         """
         raise NotImplementedError("Method get_data not defined")
 
+    @staticmethod
+    def get_boot_id():
+        """
+        Returns the id of the current boot, or None if the proc tree has none
+        """
+        try:
+            return BasicSPParser.read_proc(BasicSPParser.BOOT_ID).strip()
+        except IOError:
+            return None
+
+    @classmethod
+    def get_ttl(cls):
+        """
+        Seconds the data of the parser may be served from a cache
+        """
+        if cls.CACHE_TTL is not None:
+            return cls.CACHE_TTL
+        return VOLATILITY_TTLS[cls.VOLATILITY]
+
+    @classmethod
+    def get_counters(cls):
+        """
+        Names of the vars marked as monotonic counters by get_vars
+
+        A var is a counter when its descriptor has 'counter': True
+        :rtype set:
+        """
+        return set(k for k, v in cls.get_vars().iteritems()
+                   if isinstance(v, dict) and v.get('counter'))
+
     def cl(self):
         """
         Gets the class of the lowest class, ie the class instantiated
@@ -194,13 +291,17 @@ class BasicSPParser(object):
         Recommend every var has a label
         Recommend every var has a unit
         Recommend every var has a description
+        Monotonic counters may be marked with 'counter': True
 
         Example:
             'var1': {'label': 'The first Variable'},
 
             'var2': {'label': 'The Second Variable',
                      'unit': 'kB',
-                     'desc': 'Description recommended but not necessary'}
+                     'desc': 'Description recommended but not necessary'},
+
+            'var3': {'label': 'The Third Variable',
+                     'counter': True}
             }
         :param debug: Debug flag to print debug output
         :rtype bool:
@@ -7,33 +7,142 @@ requests.post(addr, data='{"method": "get_data", "params":{"parser": "cpuinfo",
 curl -X POST http://localhost:8848 -d '{"method": "get_data", "id":"2", "params":{"path":"/proc/uptime"}}'
 
 reply
-{"jsonrpc": "2.0", "result": {"uptime": {"found": {"uptime": 55}}}, "id": "2"}
+{"jsonrpc": "2.0", "result": {"uptime": {"found": {"uptime": 55}}, "timestamp": 1445350215.2}, "id": "2"}
 """
 import sys
+import json
+import math
+import time
+import socket
+import bisect
+import hashlib
+import argparse
 import parsers
 
-from SocketServer import ThreadingMixIn
+from SocketServer import ThreadingMixIn, ForkingMixIn
+from slashproc_parser import stats
+from slashproc_parser.basic_parser import BasicSPParser
+from slashproc_parser.cache import ParserCache
+from slashproc_parser.changes import ChangeTracker
+from slashproc_parser.diskstore import DiskStore
+from slashproc_parser.metrics import renderer
+from slashproc_parser.rates import RateEngine
+from slashproc_parser.sampler import Sampler
+from slashproc_parser.shm import ShmPublisher
+from slashproc_parser.store import SampleStore, AGGREGATES, downsample
+from slashproc_parser.jsonrpclib import RawJSON
 from slashproc_parser.jsonrpclib.SimpleJSONRPCServer import SimpleJSONRPCServer
+from slashproc_parser.jsonrpclib.SimpleJSONRPCServer import \
+    SimpleJSONRPCRequestHandler
 
 SERVER_PORT = 8848
 
+#permissions of the socket file with --unix-socket, owner and group
+SOCKET_MODE = 0660
+
 #do debug mode and
 #prevent returning errors through to the json parser
 DEBUG = True
 
+#last observed values for get_changes
+change_tracker = ChangeTracker()
+
+#previous counter values for get_data in rate mode
+rate_engine = RateEngine()
+
+#names of the counter vars of each parser
+counter_names = dict()
+
+#seconds between background samples, 0 samples 'boot' parsers once at
+#start up and others every TTL, see start_sampler. Parsers left out, eg.
+#cpuinfo, are read on request through parser_cache
+SAMPLE_INTERVALS = {
+    'loadavg': 1,
+    'meminfo': 1,
+    'vmstat': 1,
+    'uptime': 1,
+    'pidstatus': 10,
+    'cmdline': 0,
+    'version': 0,
+}
+
+#sampled on a thread each, their reads take long enough on a busy host to
+#delay the 1s samples of the others
+SAMPLE_SEPARATE = ('pidstatus',)
+
+#samples kept per numeric var of the stored parsers, an hour at 1s,
+#compressed this takes about the memory of 5 minutes uncompressed
+STORE_SIZE = 3600
+STORE_COMPRESS = True
+STORE_PARSERS = ('meminfo', 'vmstat', 'loadavg', 'uptime')
+
+#narrowest bucket of get_history, in seconds
+MIN_STEP = 0.001
+
+#samples of STORE_PARSERS are also written here when set
+HISTORY_DIR = None
+HISTORY_DAYS = 7
+
+#latest samples of SHM_PARSERS are published to this file when set, see shm
+SHM_PATH = None
+SHM_PARSERS = ('meminfo', 'loadavg')
+
+#parsers rendered by /metrics when none are asked for
+METRICS_PARSERS = ('meminfo', 'vmstat', 'loadavg', 'uptime')
+
+#reads of parsers that are not sampled, served to other requests for the
+#TTL each parser declares through its volatility, see BasicSPParser.get_ttl
+parser_cache = ParserCache()
+
+#get_groups and get_vars results of the parsers with their etag, kept for
+#the parser's TTL unless the parser has a DYNAMIC_SCHEMA, see read_schema
+schema_cache = ParserCache()
+
+#whole get_data results of 'boot' parsers rendered to JSON once per read,
+#{parser: ((timestamp, data), RawJSON)}
+rendered = dict()
+
+#background sampler, requests read the parsers directly when not running
+sampler = None
+
+#recent samples of STORE_PARSERS, filled by the sampler
+store = None
+
+#older samples of STORE_PARSERS, kept on disk across restarts
+disk_store = None
+
+#shared memory snapshot of SHM_PARSERS
+shm_publisher = None
+
 
 class SimpleThreadedJSONRPCServer(ThreadingMixIn, SimpleJSONRPCServer):
     pass
 
 
+class SimpleForkingJSONRPCServer(ForkingMixIn, SimpleJSONRPCServer):
+    pass
+
+
+#server classes selectable with --server
+SERVER_MODES = {
+    'threaded': SimpleThreadedJSONRPCServer,
+    'forking': SimpleForkingJSONRPCServer,
+    'single': SimpleJSONRPCServer,
+}
+
+
 class ERR():
     err1 = "Parser not Found"
     err2 = "get param '%s' not found in groups or vars"
+    err3 = "History not available, the sampler is not running"
+    err4 = "Unknown aggregate '%s'"
+    err5 = "Unknown mode '%s'"
+    err6 = "Invalid value for '%s'"
 
     @classmethod
     def msg(cls, num, param=''):
         msg = getattr(cls, 'err%s' % num)
-        msg % param if '%s' in msg else msg
+        msg = msg % param if '%s' in msg else msg
         return {'err': num, 'msg':msg}
 
 
@@ -49,8 +158,9 @@ def import_parsers():
         mod = __import__('slashproc_parser.parsers.' + modpy, fromlist=[modpy])
 
         classes = [getattr(mod, modpy) for modpy in dir(mod)
-            if isinstance(getattr(mod, modpy), type) and modpy not in 
-                    ['BasicSPParser']]
+            if isinstance(getattr(mod, modpy), type) and
+                issubclass(getattr(mod, modpy), BasicSPParser) and
+                    modpy not in ['BasicSPParser']]
 
         for cls in classes:
             parsers_name.append(cls.__name__.lower())
@@ -59,6 +169,116 @@ def import_parsers():
     return (parsers_name, parsers_cls)
 
 
+def start_sampler(intervals=None, history_dir=None, shm_path=None):
+    """
+    Starts sampling the parsers in the background
+
+    get_data is then served from the latest sample of every sampled parser
+    and the numeric vars of STORE_PARSERS are kept in the store, and on
+    disk under history_dir if given. The latest values of SHM_PARSERS are
+    published to shm_path if given.
+    """
+    global sampler, store, disk_store, shm_publisher
+
+    names, classes = import_parsers()
+    if intervals is None:
+        intervals = SAMPLE_INTERVALS
+    # a single sample of a parser whose data changes would be served for
+    # the life of the process, past the TTL get_parsers advertises
+    intervals = dict((k, v) for k, v in intervals.iteritems() if k in classes)
+    for name, interval in intervals.items():
+        if not interval and classes[name].VOLATILITY != 'boot':
+            intervals[name] = classes[name].get_ttl()
+    if history_dir is None:
+        history_dir = HISTORY_DIR
+    if shm_path is None:
+        shm_path = SHM_PATH
+
+    store = SampleStore(STORE_SIZE, parsers=STORE_PARSERS,
+                        compress=STORE_COMPRESS)
+    sampler = Sampler(classes, intervals, SAMPLE_SEPARATE)
+    sampler.add_listener(store.add_sample)
+    sampler.add_listener(lambda parser, timestamp, data:
+                         update_rates(parser, timestamp, data, classes))
+    if history_dir:
+        disk_store = DiskStore(history_dir, retention_days=HISTORY_DAYS,
+                               parsers=STORE_PARSERS)
+        sampler.add_listener(disk_store.add_sample)
+    if shm_path:
+        shm_publisher = ShmPublisher(shm_path, dict(
+            (name, classes[name]) for name in SHM_PARSERS if name in classes))
+        sampler.add_listener(shm_publisher.add_sample)
+    sampler.start()
+    return sampler
+
+
+def stop_sampler():
+    global sampler, store, disk_store, shm_publisher
+
+    if sampler is not None:
+        sampler.stop()
+        sampler = None
+        store = None
+    if disk_store is not None:
+        disk_store.close()
+        disk_store = None
+    if shm_publisher is not None:
+        shm_publisher.close()
+        shm_publisher = None
+
+
+def read_data(parser, classes):
+    """
+    Returns (timestamp, data) from the latest sample, or reads the parser
+    through the cache, 'boot' parsers are cached until the boot id changes
+    """
+    sample = sampler.latest(parser) if sampler else None
+    if sample:
+        return sample
+
+    cls = classes[parser]
+    key = cls.get_boot_id() if cls.VOLATILITY == 'boot' else None
+    with stats.phase('parse'):
+        return parser_cache.get(parser, cls.get_data, cls.get_ttl(), key)
+
+
+def render_found(parser, sample):
+    """
+    Returns the get_data result of a whole sample as RawJSON, rendered once
+    per sample
+    """
+    cached = rendered.get(parser)
+    if cached is None or cached[0] is not sample:
+        timestamp, data = sample
+        cached = rendered[parser] = (sample, RawJSON({'found': data,
+                                                      'timestamp': timestamp}))
+    return cached[1]
+
+
+def update_rates(parser, timestamp, data, classes):
+    """
+    Feeds a sample of parser to the rate engine if it has counters
+    """
+    if parser not in counter_names:
+        counter_names[parser] = classes[parser].get_counters()
+    if counter_names[parser]:
+        rate_engine.update(parser, timestamp, data, counter_names[parser])
+
+
+def read_rates(parser, classes):
+    """
+    Returns (timestamp, rates) of the counters of parser
+
+    Sampled parsers already feed the rate engine, others are read now and
+    compared against the previous rate request
+    """
+    if not (sampler and sampler.is_sampled(parser)):
+        with stats.phase('parse'):
+            data = classes[parser].get_data()
+        update_rates(parser, time.time(), data, classes)
+    return rate_engine.latest(parser)
+
+
 def input_validation(path, parser, get):
 
     SEPARATORS = "., |"
@@ -93,11 +313,94 @@ def input_validation(path, parser, get):
 
     return parser[0], get
 
-def get_parsers():
+def get_parsers(detail=False):
+    """
+    Method to return the names of the parsers
+
+    {"method": "get_parsers",
+     "params": {
+        "detail": true
+    }}
+
+    Usage:
+    detail: return {name: {"volatility", "ttl", "interval"}} instead, so
+        clients can schedule their polls. ttl is how long a read is cached,
+        interval how often the parser is sampled, null when it is not
+    """
     names, classes = import_parsers()
-    return names
+    if not detail:
+        return names
+
+    intervals = sampler.intervals if sampler else dict()
+    return dict((name, {'volatility': classes[name].VOLATILITY,
+                        'ttl': classes[name].get_ttl(),
+                        'interval': intervals.get(name)})
+                for name in names)
 
-def get_groups(path=None, parser=None, get=None):
+def read_schema(parser, cls, kind):
+    """
+    Returns get_groups or get_vars of a parser, kind 'groups' or 'vars',
+    as the RawJSON {'found': descriptors, 'etag': hash of descriptors}
+    """
+    def read():
+        descriptors = getattr(cls, 'get_' + kind)()
+        encoded = json.dumps(descriptors, sort_keys=True)
+        etag = hashlib.sha1(encoded).hexdigest()[:16]
+        return RawJSON({'found': descriptors, 'etag': etag},
+                       '{"etag": "%s", "found": %s}' % (etag, encoded))
+
+    if cls.DYNAMIC_SCHEMA:
+        return read()
+    key = cls.get_boot_id() if cls.VOLATILITY == 'boot' else None
+    return schema_cache.get('%s/%s' % (parser, kind), read, cls.get_ttl(),
+                            key)[1]
+
+
+def etag_matches(current, etag):
+    """
+    True if etag, a tag or a list of tags the client has, holds current
+    """
+    if not etag:
+        return False
+    tags = [etag] if isinstance(etag, basestring) else etag
+    return current in tags or '*' in tags
+
+
+def get_schema(kind, path, parser, get, etag):
+    # get_groups and get_vars
+    names, classes = import_parsers()
+
+    parser, get = input_validation(path, parser, get)
+
+    if not parser or parser not in names:
+        return ERR.msg(1)
+    stats.set_parser(parser)
+    with stats.phase('parse'):
+        schema = read_schema(parser, classes[parser], kind)
+
+    if not get or 'all' in get or 'star' in get:
+        if etag_matches(schema['etag'], etag):
+            return {'etag': schema['etag'], 'notmodified': True}
+        return schema
+
+    current = filtered_etag(schema['etag'], get)
+    if etag_matches(current, etag):
+        return {'etag': current, 'notmodified': True}
+    with stats.phase('filter'):
+        ret = filter_descriptors(schema['found'], get)
+    ret['etag'] = current
+    return ret
+
+
+def filtered_etag(etag, get):
+    """
+    The etag of the descriptors picked by get out of a schema tagged etag
+    """
+    names = ','.join(sorted(set(get)))
+    return hashlib.sha1('%s/%s' % (etag, names)).hexdigest()[:16]
+
+
+def get_groups(path=None, parser=None, get=None, etag=None):
     """
     Method to return one or more group descriptors
 
@@ -106,7 +409,8 @@ def get_groups(path=None, parser=None, get=None):
         "path": "/core1",
         #or
         "parser": "[/proc/cpuinfo|cpuinfo]",
-        "get": "core1"
+        "get": "core1",
+        "etag": "5d41402abc4b2a76"
     }}
 
     Usage:
@@ -114,35 +418,35 @@ def get_groups(path=None, parser=None, get=None):
     or
     parser: the parser
     get: a csv string or list of groups
+    etag: the etag of an earlier response with the same get, if those
+          groups are still the same only {'etag', 'notmodified': True}
+          is returned
 
     """
-    names, classes = import_parsers()
+    return get_schema('groups', path, parser, get, etag)
 
-    parser, get = input_validation(path, parser, get)
-
-    if not parser or parser not in names:
-        return ERR.msg(1)
-    groups = classes[parser].get_groups()
 
-    if not get or 'all' in get or 'star' in get:
-        return {'found': groups}
+def filter_descriptors(descriptors, get):
+    """
+    Picks the requested groups or vars out of their descriptors
+    """
 
     #TODO if desc just return desc
     ret = dict()
     for g in get:
-        if g in groups:
+        if g in descriptors:
             if 'found' in ret:
-                ret['found'][g] = groups[g]
+                ret['found'][g] = descriptors[g]
             else:
-                ret['found'] = {g: groups[g]}
+                ret['found'] = {g: descriptors[g]}
         else:
             if 'notfound' in ret:
-                notfound.append(g)
+                ret['notfound'].append(g)
             else:
                 ret['notfound'] = [g]
     return ret
 
-def get_vars(path=None, parser=None, get=None):
+def get_vars(path=None, parser=None, get=None, etag=None):
     """
     Method to return the var descriptors
 
@@ -151,7 +455,8 @@ def get_vars(path=None, parser=None, get=None):
         "path": "cpuinfo/v1",
         #or
         "parser": "cpuinfo",
-        "get": "v1 v2"
+        "get": "v1 v2",
+        "etag": "5d41402abc4b2a76"
     }}
 
     Usage:
@@ -159,35 +464,11 @@ def get_vars(path=None, parser=None, get=None):
 
     parser: the parser
     get: a csv string or list of vars
+    etag: as for get_groups
     """
+    return get_schema('vars', path, parser, get, etag)
 
-    names, classes = import_parsers()
-
-    parser, get = input_validation(path, parser, get)
-
-    if not parser or parser not in names:
-        return ERR.msg(1)
-    thevars = classes[parser].get_vars()
-
-    if not get or 'all' in get or 'star' in get:
-        return {'found': thevars}
-
-    ret = dict()
-    for g in get:
-        if g in thevars:
-            if 'found' in ret:
-                ret['found'][g] = thevars[g]
-            else:
-                ret['found'] = {g: thevars[g]}
-        else:
-            if 'notfound' in ret:
-                notfound.append(g)
-            else:
-                ret['notfound'] = [g]
-    
-    return ret
-
-def get_data(path=None, parser=None, get=None):
+def get_data(path=None, parser=None, get=None, mode=None):
     """
     Method to return the data
 
@@ -196,7 +477,8 @@ def get_data(path=None, parser=None, get=None):
         "path": "/core1",
         #or
         "parser": "cpuinfo",
-        "get": "g1, g2, var1, var2"
+        "get": "g1, g2, var1, var2",
+        "mode": "rate"
     }}
 
     Usage:
@@ -205,6 +487,10 @@ def get_data(path=None, parser=None, get=None):
     parser: the parser
     get: a csv string or list of groups and vars
 
+    mode: "rate" returns the per-second rates of the counter vars since
+        the previous sample instead of their values, the first request of
+        a parser that is not sampled only records a baseline
+
     """
     names, classes = import_parsers()
 
@@ -212,14 +498,20 @@ def get_data(path=None, parser=None, get=None):
 
     if not parser or parser not in names:
         return ERR.msg(1)
-    groups = classes[parser].get_groups()
-    vars = classes[parser].get_vars()
-
-
-    data = classes[parser].get_data()
+    stats.set_parser(parser)
+
+    if mode == 'rate':
+        timestamp, data = read_rates(parser, classes)
+    elif mode is None:
+        sample = read_data(parser, classes)
+        timestamp, data = sample
+        if not get and classes[parser].VOLATILITY == 'boot':
+            return render_found(parser, sample)
+    else:
+        return ERR.msg(5, mode)
 
     if not get:
-        return {'found': data}
+        return {'found': data, 'timestamp': timestamp}
 
 
     ret = dict()
@@ -233,12 +525,13 @@ def get_data(path=None, parser=None, get=None):
             elif isinstance(dct[k], dict):
                 recurse_dict(dct[k], pth+'/'+k, get)
 
-    recurse_dict(data, '', get)
+    with stats.phase('filter'):
+        recurse_dict(data, '', get)
 
     for i in found:
         get.remove(i)
    
-    retdict = dict()
+    retdict = {'timestamp': timestamp}
     if ret:
         retdict['found'] = ret
     if get:
@@ -246,12 +539,248 @@ def get_data(path=None, parser=None, get=None):
 
     return retdict
 
+def get_changes(parser=None, since_token=None):
+    """
+    Method to return only the files that changed since a previous call
+
+    {"method": "get_changes",
+     "params": {
+        "parser": "sysnet",
+        "since_token": "5a1b2c3d.42"
+    }}
+
+    Usage:
+    parser: the parser, intended for the /proc/sys parsers
+    since_token: the token returned by the previous call, omit it to
+        get a full snapshot
+
+    reply
+    {"token": "5a1b2c3d.43",
+     "changed": {"net/ipv4/ip_forward": "1"},
+     "removed": ["net/ipv4/conf/veth0/forwarding"]}
+
+    "full" is set when the token was unknown and every entry is returned
+    """
+    names, classes = import_parsers()
+
+    parser, _ = input_validation(None, parser, None)
+
+    if not parser or parser not in names:
+        return ERR.msg(1)
+
+    _, data = read_data(parser, classes)
+
+    return change_tracker.changes(parser, data, since_token)
+
+def history_range(parser, pth, since, until):
+    """
+    Returns (timestamps, values) of a series, reading the part older than
+    the samples held in memory from disk
+    """
+    timestamps, values = store.range(parser, pth, since, until)
+
+    oldest = store.oldest(parser, pth)
+    if disk_store is None or since is None or oldest is None or since >= oldest:
+        return timestamps, values
+
+    older = min(until, oldest) if until is not None else oldest
+    disk_timestamps, disk_values = disk_store.range(parser, pth, since, older)
+    # the record covering the oldest sample in memory holds that sample
+    cut = bisect.bisect_left(disk_timestamps,
+                             oldest - oldest % disk_store.resolution)
+    return disk_timestamps[:cut] + timestamps, disk_values[:cut] + values
+
+def is_finite(value):
+    """
+    True for ints and floats that are neither inf nor nan
+    """
+    return isinstance(value, (int, long, float)) and \
+        not isinstance(value, bool) and \
+        not (math.isinf(value) or math.isnan(value))
+
+def get_history(path=None, since=None, until=None, step=None, agg='avg',
+                parser=None, get=None):
+    """
+    Method to return the recent samples of one or more vars
+
+    {"method": "get_history",
+     "params": {
+        "path": "/proc/meminfo/memfree",
+        #or
+        "parser": "meminfo",
+        "get": "memfree",
+        "since": -300,
+        "step": 10,
+        "agg": "avg"
+    }}
+
+    Usage:
+    path: location to single var or group of a stored parser
+
+    parser: the parser
+    get: a csv string or list of vars
+
+    since, until: epoch seconds, negative values are relative to now,
+        samples older than memory holds come from HISTORY_DIR if set
+    step: downsample into buckets of step seconds, at least MIN_STEP,
+        omit for raw samples
+    agg: how buckets are aggregated, avg, min, max, sum or last
+
+    reply, keyed like get_data, values that are not finite, eg. NaN, are
+    null as JSON has no such numbers
+    {"found": {"/meminfo/memfree": {"timestamps": [1445350210.0, ...],
+                                    "values": [5302708.0, ...]}}}
+    """
+    if store is None:
+        return ERR.msg(3)
+    for name, value in (('since', since), ('until', until), ('step', step)):
+        if value is not None and not is_finite(value):
+            return ERR.msg(6, name)
+    if step is not None and step < MIN_STEP:
+        return ERR.msg(6, 'step')
+    if step and agg not in AGGREGATES:
+        return ERR.msg(4, agg)
+
+    parser, get = input_validation(path, parser, get)
+
+    if not parser or not store.paths(parser):
+        return ERR.msg(1)
+
+    now = time.time()
+    if since is not None and since < 0:
+        since += now
+    if until is not None and until < 0:
+        until += now
+
+    found = dict()
+    for pth in store.find(parser, get):
+        timestamps, values = history_range(parser, pth, since, until)
+        if step:
+            timestamps, values = downsample(timestamps, values, step, agg)
+        found['/' + pth] = {'timestamps': list(timestamps),
+                            'values': [v if is_finite(v) else None
+                                       for v in values]}
+
+    if not found:
+        return {'notfound': get}
+    return {'found': found}
+
+def get_metrics(path=None, parser=None):
+    """
+    Method to return numeric vars in the Prometheus text format
+
+    GET /metrics renders METRICS_PARSERS, GET /metrics/meminfo,vmstat only
+    the listed parsers
+
+    Usage:
+    path or parser: csv string or list of parsers
+
+    Returns a generator of text chunks, served from the latest samples of
+    sampled parsers
+    """
+    names, classes = import_parsers()
+
+    first, rest = input_validation(path or parser, None, None)
+    selected = [first] + rest if first else list(METRICS_PARSERS)
+    return renderer.render([p for p in selected if p in names], classes,
+                           read_data)
+
+
+def get_stats(parser=None, reset=False):
+    """
+    Method to return the request timings
+
+    {"method": "get_stats",
+     "params": {
+        "parser": "meminfo",
+        "reset": false
+    }}
+
+    Usage:
+    parser: only the timings of this parser, default all
+
+    reset: clear every timing once returned
+
+    Returns {"found": {parser: {method: {phase: histogram}}}} where phase
+    is one of read, parse, filter, serialize or total. Histograms hold the
+    count, mean, max and p50, p90, p99 upper bounds in seconds, and the
+    counts of their non empty power of two microsecond buckets
+
+    "cache" holds the hits, misses, coalesced reads and TTL of every
+    parser read through the cache
+    """
+    if parser is not None:
+        parser, _ = input_validation(None, parser, None)
+    cache = parser_cache.counters()
+    if parser is not None:
+        cache = dict((k, v) for k, v in cache.iteritems() if k == parser)
+    ret = {'found': stats.stats.snapshot(parser), 'cache': cache}
+    if reset:
+        stats.stats.reset()
+    return ret
+
+
+#methods served over JSON-RPC, and by client.LocalClient
+RPC_FUNCTIONS = (get_parsers, get_groups, get_vars, get_data, get_changes,
+                 get_history, get_stats)
+
+#methods served by GET routes only, their results are not JSON, and by
+#client.LocalClient
+GET_FUNCTIONS = (get_metrics,)
+
+
 def main():
-    server = SimpleThreadedJSONRPCServer(('localhost', SERVER_PORT))
-    server.register_function(get_parsers)
-    server.register_function(get_groups)
-    server.register_function(get_vars)
-    server.register_function(get_data)
+    argparser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    argparser.add_argument('--history-dir', default=HISTORY_DIR,
+                           help="keep %d days of samples in this directory"
+                                % HISTORY_DAYS)
+    argparser.add_argument('--shm-path', default=SHM_PATH,
+                           help="publish the latest values of %s to this file"
+                                % ', '.join(SHM_PARSERS))
+    argparser.add_argument('--proc-root', default=BasicSPParser.proc_root,
+                           help="read the proc tree mounted here, eg. /host/proc")
+    argparser.add_argument('--port', type=int, default=SERVER_PORT)
+    argparser.add_argument('--unix-socket', metavar='PATH',
+                           help="listen on this unix socket instead of the port")
+    argparser.add_argument('--socket-mode', type=lambda mode: int(mode, 8),
+                           default=SOCKET_MODE,
+                           help="octal permissions of the unix socket, "
+                                "default %o" % SOCKET_MODE)
+    argparser.add_argument('--server', choices=sorted(SERVER_MODES),
+                           default='threaded',
+                           help="how requests are handled")
+    argparser.add_argument('--compress-level', type=int,
+                           default=SimpleJSONRPCRequestHandler.compress_level,
+                           choices=range(10),
+                           help="gzip or deflate level of responses, 0 to "
+                                "never compress")
+    argparser.add_argument('--compress-threshold', type=int,
+                           default=SimpleJSONRPCRequestHandler.compress_threshold,
+                           help="compress responses of at least this many bytes")
+    argparser.add_argument('--quiet', action='store_true',
+                           help="do not log every request")
+    argparser.add_argument('--slow-request', type=float, default=stats.SLOW_REQUEST,
+                           help="log requests taking longer than this many seconds")
+    args = argparser.parse_args()
+
+    BasicSPParser.set_proc_root(args.proc_root)
+    stats.SLOW_REQUEST = args.slow_request
+    SimpleJSONRPCRequestHandler.compress_level = args.compress_level
+    SimpleJSONRPCRequestHandler.compress_threshold = args.compress_threshold
+
+    start_sampler(history_dir=args.history_dir, shm_path=args.shm_path)
+    server_class = SERVER_MODES[args.server]
+    if args.unix_socket:
+        server = server_class(args.unix_socket, logRequests=not args.quiet,
+                              address_family=socket.AF_UNIX,
+                              socket_mode=args.socket_mode)
+    else:
+        server = server_class(('localhost', args.port),
+                              logRequests=not args.quiet)
+    for function in RPC_FUNCTIONS:
+        server.register_function(function)
+    for function in GET_FUNCTIONS:
+        server.register_get_function(function)
     server.serve_forever()
 
 if __name__ == '__main__':
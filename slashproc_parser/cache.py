@@ -0,0 +1,126 @@
+"""
+Cache of parser reads
+
+Parsers that are not sampled in the background are read on request. The
+cache keeps the result of every such read for the parser's TTL, and
+coalesces concurrent misses: the first request reads the parser while
+the others wait for its result instead of scanning /proc themselves.
+
+A TTL of 0 disables caching for the parser but still coalesces reads
+that are in flight at the same time.
+
+Reads may also be keyed, a cached read then stays valid for as long as
+the key does not change, whatever its age. The server keys the parsers
+whose data is fixed until reboot by the boot id.
+"""
+import time
+import threading
+
+#seconds a read is served for parsers without a TTL of their own
+DEFAULT_TTL = 1
+
+
+class Flight(object):
+    """
+    A read in progress that other requests wait on
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ParserCache(object):
+    """
+    Per-parser TTL cache with request coalescing
+    """
+
+    def __init__(self, ttls=None, default_ttl=DEFAULT_TTL):
+        """
+        :param ttls: dict of parser name to TTL in seconds
+        :param default_ttl: TTL of the other parsers
+        """
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self._entries = dict()
+        self._keys = dict()
+        self._flights = dict()
+        self._counters = dict()
+        self._lock = threading.Lock()
+
+    def ttl(self, parser):
+        return self.ttls.get(parser, self.default_ttl)
+
+    def _count(self, parser, counter):
+        counters = self._counters.get(parser)
+        if counters is None:
+            counters = self._counters[parser] = \
+                {'hits': 0, 'misses': 0, 'coalesced': 0}
+        counters[counter] += 1
+
+    def get(self, parser, read, ttl=None, key=None):
+        """
+        Returns (timestamp, data) of parser, calling read on a miss
+
+        :param read: function returning the parser's data
+        :param ttl: TTL of the parser, kept for later calls
+        :param key: when given the read is valid while the key is the same
+            instead of for the TTL
+        """
+        with self._lock:
+            if ttl is not None:
+                self.ttls[parser] = ttl
+            entry = self._entries.get(parser)
+            if entry is not None:
+                if key is not None:
+                    valid = self._keys.get(parser) == key
+                else:
+                    valid = time.time() - entry[0] < self.ttl(parser)
+                if valid:
+                    self._count(parser, 'hits')
+                    return entry
+
+            flight = self._flights.get(parser)
+            leader = flight is None
+            if leader:
+                flight = self._flights[parser] = Flight()
+                self._count(parser, 'misses')
+            else:
+                self._count(parser, 'coalesced')
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            data = read()
+            flight.result = (time.time(), data)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if flight.result is not None:
+                    self._entries[parser] = flight.result
+                    self._keys[parser] = key
+                del self._flights[parser]
+            flight.event.set()
+        return flight.result
+
+    def invalidate(self, parser=None):
+        with self._lock:
+            if parser is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(parser, None)
+
+    def counters(self):
+        """
+        Returns {parser: {'hits', 'misses', 'coalesced', 'ttl'}}
+        """
+        with self._lock:
+            return dict((parser, dict(counters, ttl=self.ttl(parser)))
+                        for parser, counters in self._counters.iteritems())
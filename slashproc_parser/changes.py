@@ -0,0 +1,128 @@
+"""
+Change detection for parser data
+
+Keeps the last observed value of every file returned by a parser so that
+clients polling the /proc/sys parsers only receive the entries that
+changed since their previous call.
+
+Tokens are opaque strings of the form '<epoch>.<generation>'. The epoch
+changes every time the server starts, so a token handed out by a previous
+server process forces a full resync instead of a silently wrong diff.
+
+Removed entries are remembered for KEEP_GENERATIONS generations, tokens
+older than that also force a full resync, so churning keys such as pids
+do not grow the state forever.
+"""
+import time
+import threading
+
+from slashproc_parser.parsers.parse_helpers import flatten_tree
+
+KEEP_GENERATIONS = 1000
+
+
+class ParserState(object):
+    """
+    Last observed values of one parser and the generation they changed in
+    """
+
+    def __init__(self):
+        self.generation = 0
+        self.values = dict()
+        self.removed = dict()
+        # removals up to this generation are forgotten
+        self.pruned = 0
+
+    def update(self, flat):
+        """
+        Records a new observation, bumping the generation if anything changed
+        """
+        changed = [k for k, v in flat.iteritems()
+                   if k not in self.values or self.values[k][0] != v]
+        gone = [k for k in self.values if k not in flat]
+
+        if not changed and not gone:
+            return
+
+        self.generation += 1
+        for k in changed:
+            self.values[k] = (flat[k], self.generation)
+            self.removed.pop(k, None)
+        for k in gone:
+            del self.values[k]
+            self.removed[k] = self.generation
+
+        if self.generation - self.pruned >= 2 * KEEP_GENERATIONS:
+            self.prune(self.generation - KEEP_GENERATIONS)
+
+    def prune(self, generation):
+        """
+        Forgets the entries removed up to generation
+        """
+        self.removed = dict((k, gen) for k, gen in self.removed.iteritems()
+                            if gen > generation)
+        self.pruned = generation
+
+
+class ChangeTracker(object):
+    """
+    Tracks the values returned by each parser between calls
+    """
+
+    def __init__(self):
+        self.epoch = '%x' % int(time.time())
+        self._states = dict()
+        self._lock = threading.Lock()
+
+    def token(self, generation):
+        return '%s.%d' % (self.epoch, generation)
+
+    def parse_token(self, token):
+        """
+        Returns the generation of a token, or None if a full resync is needed
+        """
+        if not token:
+            return None
+        try:
+            epoch, generation = str(token).split('.')
+            generation = int(generation)
+        except ValueError:
+            return None
+        if epoch != self.epoch:
+            return None
+        return generation
+
+    def changes(self, parser, data, since_token=None):
+        """
+        Records data for parser and returns what changed since since_token
+
+        :param parser: name of the parser the data came from
+        :param data: the nested dict returned by the parser's get_data
+        :param since_token: token returned by a previous call, or None
+        :rtype dict:
+        """
+        flat = flatten_tree(data)
+
+        with self._lock:
+            state = self._states.setdefault(parser, ParserState())
+            state.update(flat)
+
+            since = self.parse_token(since_token)
+            full = since is None or since > state.generation or \
+                since < state.pruned
+
+            if full:
+                changed = dict((k, v) for k, (v, _) in state.values.iteritems())
+                removed = []
+            else:
+                changed = dict((k, v) for k, (v, gen) in state.values.iteritems()
+                               if gen > since)
+                removed = [k for k, gen in state.removed.iteritems()
+                           if gen > since]
+            ret = {'token': self.token(state.generation), 'changed': changed}
+
+        if removed:
+            ret['removed'] = removed
+        if full:
+            ret['full'] = True
+        return ret
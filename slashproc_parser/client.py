@@ -0,0 +1,67 @@
+"""
+Clients of the basic_server methods
+
+connect returns a client for a uri, a JSON-RPC ServerProxy for a server
+or a LocalClient which calls the methods in this process:
+
+    client = connect('http://localhost:8848')
+    client = connect('local')
+
+    client.get_data(parser='meminfo', get='memfree')
+
+Both answer the same methods with the same parameters, so code can move
+between reading a remote host and its own /proc by changing the uri.
+"""
+import copy
+
+from slashproc_parser import basic_server
+from slashproc_parser.jsonrpclib import Server, RawJSON
+
+LOCAL = 'local'
+
+
+class LocalClient(object):
+    """
+    Calls the basic_server methods directly, without HTTP or JSON
+
+    Results are copies of the python objects the methods return, which are
+    shared with the server's caches and samples. copy=False skips the copy
+    for callers that treat results as read only. Reads are served from the
+    sampler's samples when it is started in this process, see
+    basic_server.start_sampler.
+    """
+
+    def __init__(self, copy=True):
+        self.copy = copy
+        self._functions = dict((f.__name__, f)
+                               for f in basic_server.RPC_FUNCTIONS)
+
+    def __getattr__(self, name):
+        if name.startswith('_') or name not in self._functions:
+            raise AttributeError(name)
+        function = self._functions[name]
+
+        def call(*args, **kwargs):
+            return self._result(function(*args, **kwargs))
+        call.__name__ = name
+        call.__doc__ = function.__doc__
+        return call
+
+    def _result(self, result):
+        if isinstance(result, RawJSON):
+            # only encoded ahead for the wire
+            result = dict(result)
+        if self.copy and isinstance(result, (dict, list)):
+            result = copy.deepcopy(result)
+        return result
+
+
+def connect(uri=LOCAL, transport=None):
+    """
+    Returns a client for uri, 'local' for a LocalClient
+
+    :param transport: transport of the ServerProxy, eg. PooledTransport()
+    """
+    if uri in (None, LOCAL):
+        return LocalClient()
+    return Server(uri, transport=transport)
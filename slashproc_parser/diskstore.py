@@ -0,0 +1,180 @@
+"""
+On-disk time series of sampled values
+
+Every series gets one file per UTC day holding a fixed record per time
+slot, so a sample is written by index and read back without any search:
+
+    <directory>/<YYYYMMDD>/<parser>/<quoted var path>
+
+A record is one little-endian double, slot i of a day covers
+[day + i * resolution, day + (i + 1) * resolution). Files are created
+sparse with ftruncate, so a new day costs no writes in the sampler thread
+and slots that were never written read as +0.0, a stored 0 is written as
+-0.0 to tell them apart. At the default 1 second resolution a file is
+675 kB, so 7 days of the ~200 meminfo and vmstat vars take at most 1 GB.
+
+Files are mmapped, the writer keeps today's maps open and readers unpack
+straight out of the mapping with struct.unpack_from, which is as close to
+zero-copy as python 2 allows since mmap does not support memoryview.
+"""
+import os
+import math
+import mmap
+import time
+import shutil
+import struct
+import urllib
+import threading
+from array import array
+
+from slashproc_parser.store import to_number
+from slashproc_parser.parsers.parse_helpers import flatten_tree
+
+DAY = 86400
+RECORD = struct.Struct('<d')
+
+DEFAULT_RESOLUTION = 1
+DEFAULT_RETENTION_DAYS = 7
+
+
+class DiskStore(object):
+    """
+    Memory-mapped fixed-record files of the numeric vars of sampled parsers
+    """
+
+    def __init__(self, directory, resolution=DEFAULT_RESOLUTION,
+                 retention_days=DEFAULT_RETENTION_DAYS, parsers=None):
+        """
+        :param directory: where the day directories are kept
+        :param resolution: seconds covered by one record
+        :param retention_days: days kept before prune removes them
+        :param parsers: names of the parsers to store, None for all
+        """
+        if DAY % resolution:
+            raise ValueError('resolution must divide a day')
+        self.directory = directory
+        self.resolution = resolution
+        self.retention_days = retention_days
+        self.parsers = set(parsers) if parsers is not None else None
+        self.records = DAY // resolution
+        self._day = None
+        self._maps = dict()
+        self._lock = threading.Lock()
+
+    def day_of(self, timestamp):
+        return int(timestamp) - int(timestamp) % DAY
+
+    def filename(self, parser, path, day):
+        return os.path.join(self.directory,
+                            time.strftime('%Y%m%d', time.gmtime(day)),
+                            parser, urllib.quote(path, safe=''))
+
+    def _create(self, filename):
+        dirname = os.path.dirname(filename)
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        # sparse, blocks are allocated as slots are written. Sized under a
+        # temporary name first so a crash never leaves a short file behind
+        with open(filename + '.tmp', 'wb') as f:
+            f.truncate(RECORD.size * self.records)
+        os.rename(filename + '.tmp', filename)
+
+    def _writer(self, parser, path, day):
+        key = (parser, path)
+        mm = self._maps.get(key)
+        if mm is None:
+            filename = self.filename(parser, path, day)
+            if not os.path.exists(filename):
+                self._create(filename)
+            with open(filename, 'r+b') as f:
+                mm = self._maps[key] = mmap.mmap(f.fileno(), 0)
+        return mm
+
+    def _rollover(self, day):
+        for mm in self._maps.itervalues():
+            mm.close()
+        self._maps.clear()
+        self._day = day
+        self.prune(day)
+
+    def add_sample(self, parser, timestamp, data):
+        """
+        Writes the numeric values of data, signature of a Sampler listener
+        """
+        if self.parsers is not None and parser not in self.parsers:
+            return
+
+        day = self.day_of(timestamp)
+        offset = int(timestamp - day) // self.resolution * RECORD.size
+        flat = flatten_tree(data)
+
+        with self._lock:
+            if day != self._day:
+                self._rollover(day)
+            for path, value in flat.iteritems():
+                value = to_number(value)
+                if value is None:
+                    continue
+                # -0.0, +0.0 is an unwritten slot
+                RECORD.pack_into(self._writer(parser, path, day), offset,
+                                 value or -0.0)
+
+    def range(self, parser, path, since, until=None):
+        """
+        Returns (timestamps, values) arrays with since <= timestamp <= until
+
+        Timestamps are the start of each record's slot
+        """
+        if until is None:
+            until = time.time()
+        timestamps, values = array('d'), array('d')
+
+        day = self.day_of(since)
+        while day <= until:
+            filename = self.filename(parser, path, day)
+            if os.path.exists(filename):
+                first = max(0, int(since - day) // self.resolution)
+                last = min(self.records - 1, int(until - day) // self.resolution)
+                if last >= first:
+                    self._read(filename, day, first, last, timestamps, values)
+            day += DAY
+
+        return timestamps, values
+
+    def _read(self, filename, day, first, last, timestamps, values):
+        with open(filename, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            count = last - first + 1
+            records = struct.unpack_from('<%dd' % count, mm,
+                                         first * RECORD.size)
+        finally:
+            mm.close()
+
+        for i, value in enumerate(records):
+            # +0.0 is an unwritten slot, -0.0 a stored 0
+            if value or math.copysign(1, value) < 0:
+                timestamps.append(day + (first + i) * self.resolution)
+                values.append(value or 0.0)
+
+    def prune(self, now=None):
+        """
+        Removes the day directories older than retention_days
+        """
+        if now is None:
+            now = time.time()
+        if not os.path.isdir(self.directory):
+            return
+        oldest = time.strftime('%Y%m%d', time.gmtime(
+            self.day_of(now) - (self.retention_days - 1) * DAY))
+        for name in os.listdir(self.directory):
+            if name.isdigit() and len(name) == 8 and name < oldest:
+                shutil.rmtree(os.path.join(self.directory, name),
+                              ignore_errors=True)
+
+    def close(self):
+        with self._lock:
+            for mm in self._maps.itervalues():
+                mm.close()
+            self._maps.clear()
+            self._day = None
@@ -0,0 +1,374 @@
+#!/usr/bin/env python
+"""
+Synthetic /proc trees for scale testing
+
+Writes a fake proc tree in the formats the parsers read, sized like a big
+host, so scaling problems can be reproduced anywhere:
+
+    python -m slashproc_parser.fixtures /tmp/proc --processes 100000 \\
+        --interfaces 64 --cpus 128 --depth 8
+
+and then point the parsers at it with BasicSPParser.set_proc_root or the
+server's --proc-root.
+
+The same seed always writes the same tree.
+"""
+import os
+import random
+import argparse
+
+MEMINFO = (
+    'MemTotal', 'MemFree', 'MemAvailable', 'Buffers', 'Cached', 'SwapCached',
+    'Active', 'Inactive', 'Active(anon)', 'Inactive(anon)', 'Active(file)',
+    'Inactive(file)', 'Unevictable', 'Mlocked', 'SwapTotal', 'SwapFree',
+    'Dirty', 'Writeback', 'AnonPages', 'Mapped', 'Shmem', 'Slab',
+    'SReclaimable', 'SUnreclaim', 'KernelStack', 'PageTables',
+    'NFS_Unstable', 'Bounce', 'WritebackTmp', 'CommitLimit', 'Committed_AS',
+    'VmallocTotal', 'VmallocUsed', 'VmallocChunk', 'HardwareCorrupted',
+    'AnonHugePages', 'Hugepagesize', 'DirectMap4k', 'DirectMap2M',
+    'DirectMap1G',
+)
+
+VMSTAT = (
+    'nr_free_pages', 'nr_alloc_batch', 'nr_inactive_anon', 'nr_active_anon',
+    'nr_inactive_file', 'nr_active_file', 'nr_unevictable', 'nr_mlock',
+    'nr_anon_pages', 'nr_mapped', 'nr_file_pages', 'nr_dirty',
+    'nr_writeback', 'nr_slab_reclaimable', 'nr_slab_unreclaimable',
+    'nr_page_table_pages', 'nr_kernel_stack', 'nr_unstable', 'nr_bounce',
+    'nr_vmscan_write', 'nr_writeback_temp', 'nr_isolated_anon',
+    'nr_isolated_file', 'nr_shmem', 'nr_dirtied', 'nr_written',
+    'nr_dirty_threshold', 'nr_dirty_background_threshold', 'pgpgin',
+    'pgpgout', 'pswpin', 'pswpout', 'pgalloc_dma', 'pgalloc_dma32',
+    'pgalloc_normal', 'pgalloc_movable', 'pgfree', 'pgactivate',
+    'pgdeactivate', 'pgfault', 'pgmajfault', 'pgrefill_dma',
+    'pgrefill_dma32', 'pgrefill_normal', 'pgsteal_kswapd_dma',
+    'pgsteal_kswapd_dma32', 'pgsteal_kswapd_normal', 'pgsteal_direct_dma',
+    'pgsteal_direct_dma32', 'pgsteal_direct_normal', 'pgscan_kswapd_dma',
+    'pgscan_kswapd_dma32', 'pgscan_kswapd_normal', 'pgscan_direct_dma',
+    'pgscan_direct_dma32', 'pgscan_direct_normal', 'pginodesteal',
+    'slabs_scanned', 'kswapd_inodesteal', 'pageoutrun', 'allocstall',
+    'pgrotated', 'numa_hit', 'numa_miss', 'numa_foreign', 'numa_local',
+    'numa_other', 'thp_fault_alloc', 'thp_collapse_alloc',
+)
+
+CPU_FLAGS = ('fpu vme de pse tsc msr pae mce cx8 apic sep mtrr pge mca cmov '
+             'pat pse36 clflush dts acpi mmx fxsr sse sse2 ss ht tm pbe '
+             'syscall nx pdpe1gb rdtscp lm constant_tsc arch_perfmon pebs '
+             'bts rep_good nopl xtopology nonstop_tsc aperfmperf pni '
+             'pclmulqdq dtes64 monitor ds_cpl vmx smx est tm2 ssse3 fma cx16 '
+             'xtpr pdcm pcid dca sse4_1 sse4_2 x2apic movbe popcnt aes xsave '
+             'avx f16c rdrand lahf_lm abm')
+
+SYS_KERNEL = {
+    'hostname': 'fixture-host',
+    'domainname': '(none)',
+    'ostype': 'Linux',
+    'osrelease': '4.4.0-21-generic',
+    'version': '#42-Ubuntu SMP Thu Apr 21 16:25:03 UTC 2016',
+    'pid_max': '4194304',
+    'threads-max': '1031166',
+    'panic': '0',
+    'printk': '4\t4\t1\t7',
+    'shmmax': '18446744073692774399',
+    'sem': '32000\t1024000000\t500\t32000',
+    'random/boot_id': '6c3c8d5e-3a3f-4b5c-9a43-0b6f2c1f9d10',
+    'random/entropy_avail': '3021',
+    'random/poolsize': '4096',
+    'random/uuid': '0e6b5f3c-1b2f-4d8e-8a5a-7f6e3d2c1b0a',
+    'sched_child_runs_first': '0',
+    'sched_rt_period_us': '1000000',
+    'sched_rt_runtime_us': '950000',
+}
+
+SYS_VM = {
+    'swappiness': '60',
+    'dirty_ratio': '20',
+    'dirty_background_ratio': '10',
+    'dirty_expire_centisecs': '3000',
+    'dirty_writeback_centisecs': '500',
+    'overcommit_memory': '0',
+    'overcommit_ratio': '50',
+    'min_free_kbytes': '67584',
+    'vfs_cache_pressure': '100',
+    'drop_caches': '0',
+    'max_map_count': '65530',
+    'nr_hugepages': '0',
+    'panic_on_oom': '0',
+    'page-cluster': '3',
+}
+
+SYS_DEV = {
+    'hpet/max-user-freq': '64',
+    'raid/speed_limit_max': '200000',
+    'raid/speed_limit_min': '1000',
+    'cdrom/autoclose': '1',
+    'cdrom/autoeject': '0',
+}
+
+SYS_NET = {
+    'core/somaxconn': '128',
+    'core/netdev_max_backlog': '1000',
+    'core/rmem_default': '212992',
+    'core/rmem_max': '212992',
+    'core/wmem_default': '212992',
+    'core/wmem_max': '212992',
+    'core/dev_weight': '64',
+    'ipv4/ip_forward': '0',
+    'ipv4/ip_local_port_range': '32768\t60999',
+    'ipv4/tcp_syncookies': '1',
+    'ipv4/tcp_fin_timeout': '60',
+    'ipv4/tcp_keepalive_time': '7200',
+    'ipv4/tcp_max_syn_backlog': '128',
+    'ipv4/tcp_rmem': '4096\t87380\t6291456',
+    'ipv4/tcp_wmem': '4096\t16384\t4194304',
+    'ipv4/tcp_congestion_control': 'cubic',
+    'unix/max_dgram_qlen': '512',
+}
+
+IPV4_CONF = {
+    'accept_redirects': '1', 'accept_source_route': '0', 'arp_filter': '0',
+    'arp_ignore': '0', 'forwarding': '0', 'log_martians': '0',
+    'mc_forwarding': '0', 'proxy_arp': '0', 'rp_filter': '1',
+    'secure_redirects': '1', 'send_redirects': '1',
+}
+
+IPV6_CONF = {
+    'accept_ra': '1', 'accept_redirects': '1', 'autoconf': '1',
+    'disable_ipv6': '0', 'forwarding': '0', 'hop_limit': '64', 'mtu': '1500',
+    'router_solicitations': '3', 'use_tempaddr': '0',
+}
+
+NEIGH = {
+    'app_solicit': '0', 'base_reachable_time_ms': '30000',
+    'delay_first_probe_time': '5', 'gc_stale_time': '60',
+    'mcast_solicit': '3', 'retrans_time_ms': '1000', 'ucast_solicit': '3',
+    'unres_qlen': '101',
+}
+
+STATUS = """Name:\t%(name)s
+Umask:\t0022
+State:\t%(state)s
+Tgid:\t%(pid)d
+Ngid:\t0
+Pid:\t%(pid)d
+PPid:\t%(ppid)d
+TracerPid:\t0
+Uid:\t%(uid)d\t%(uid)d\t%(uid)d\t%(uid)d
+Gid:\t%(uid)d\t%(uid)d\t%(uid)d\t%(uid)d
+FDSize:\t64
+Groups:\t
+NStgid:\t%(pid)d
+NSpid:\t%(pid)d
+NSpgid:\t%(pid)d
+NSsid:\t%(pid)d
+VmPeak:\t  %(vmpeak)d kB
+VmSize:\t  %(vmsize)d kB
+VmLck:\t       0 kB
+VmPin:\t       0 kB
+VmHWM:\t   %(vmrss)d kB
+VmRSS:\t   %(vmrss)d kB
+VmData:\t   %(vmdata)d kB
+VmStk:\t     132 kB
+VmExe:\t     %(vmexe)d kB
+VmLib:\t    2112 kB
+VmPTE:\t      52 kB
+VmPMD:\t      12 kB
+VmSwap:\t       0 kB
+HugetlbPages:\t       0 kB
+Threads:\t%(threads)d
+SigQ:\t0/63379
+SigPnd:\t0000000000000000
+ShdPnd:\t0000000000000000
+SigBlk:\t0000000000000000
+SigIgn:\t0000000000001000
+SigCgt:\t0000000180000002
+CapInh:\t0000000000000000
+CapPrm:\t0000000000000000
+CapEff:\t0000000000000000
+CapBnd:\t0000003fffffffff
+CapAmb:\t0000000000000000
+Seccomp:\t0
+Cpus_allowed:\t%(cpus_mask)s
+Cpus_allowed_list:\t0-%(last_cpu)d
+Mems_allowed:\t00000000,00000001
+Mems_allowed_list:\t0
+voluntary_ctxt_switches:\t%(voluntary)d
+nonvoluntary_ctxt_switches:\t%(nonvoluntary)d
+"""
+
+NAMES = ('bash', 'sshd', 'nginx', 'postgres', 'python', 'java', 'cron',
+         'rsyslogd', 'dockerd', 'containerd-shim', 'sleep', 'kworker/0:1')
+
+
+def write(root, name, content):
+    path = os.path.join(root, name)
+    dirname = os.path.dirname(path)
+    if not os.path.isdir(dirname):
+        os.makedirs(dirname)
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def write_tree(root, prefix, files):
+    for name, value in files.iteritems():
+        write(root, os.path.join(prefix, name), value + '\n')
+
+
+def gen_cpuinfo(cpus):
+    blocks = list()
+    for i in range(cpus):
+        blocks.append("\n".join((
+            "processor\t: %d" % i,
+            "vendor_id\t: GenuineIntel",
+            "cpu family\t: 6",
+            "model\t\t: 63",
+            "model name\t: Intel(R) Xeon(R) CPU E5-2680 v3 @ 2.50GHz",
+            "stepping\t: 2",
+            "microcode\t: 0x3d",
+            "cpu MHz\t\t: %.3f" % (1200 + i % 1300),
+            "cache size\t: 30720 KB",
+            "physical id\t: %d" % (i // 24),
+            "siblings\t: 24",
+            "core id\t\t: %d" % (i % 12),
+            "cpu cores\t: 12",
+            "apicid\t\t: %d" % i,
+            "initial apicid\t: %d" % i,
+            "fpu\t\t: yes",
+            "fpu_exception\t: yes",
+            "cpuid level\t: 15",
+            "wp\t\t: yes",
+            "flags\t\t: %s" % CPU_FLAGS,
+            "bogomips\t: 4988.27",
+            "clflush size\t: 64",
+            "cache_alignment\t: 64",
+            "address sizes\t: 46 bits physical, 48 bits virtual",
+            "power management:",
+            "")))
+    return "\n".join(blocks)
+
+
+def gen_meminfo(rnd):
+    lines = list()
+    for k in MEMINFO:
+        if k == 'Hugepagesize':
+            # counts without a unit, skipped by MemInfo like the real ones
+            lines.extend(("HugePages_Total:       0", "HugePages_Free:        0"))
+        lines.append("%-16s%8d kB" % (k + ':', rnd.randint(0, 64 * 1024 * 1024)))
+    return "\n".join(lines) + "\n"
+
+
+def gen_vmstat(rnd):
+    return "".join("%s %d\n" % (k, rnd.randint(0, 10 ** 9)) for k in VMSTAT)
+
+
+def gen_parents(processes, depth):
+    """
+    Returns {pid: ppid}, chains of depth processes hang off init
+    """
+    parents = {1: 0}
+    for k in range(processes - 1):
+        pid = k + 2
+        parents[pid] = 1 if k % depth == 0 else pid - 1
+    return parents
+
+
+def gen_status(rnd, pid, ppid, cpus):
+    vmsize = rnd.randint(4000, 4000000)
+    return STATUS % {
+        'name': 'init' if pid == 1 else rnd.choice(NAMES),
+        'state': rnd.choice(('S (sleeping)', 'S (sleeping)', 'R (running)')),
+        'pid': pid,
+        'ppid': ppid,
+        'uid': rnd.choice((0, 0, 33, 1000)),
+        'vmpeak': vmsize + rnd.randint(0, 1000),
+        'vmsize': vmsize,
+        'vmrss': vmsize // rnd.randint(2, 20),
+        'vmdata': vmsize // 4,
+        'vmexe': rnd.randint(100, 10000),
+        'threads': rnd.randint(1, 64),
+        'cpus_mask': '%x' % ((1 << cpus) - 1),
+        'last_cpu': cpus - 1,
+        'voluntary': rnd.randint(0, 10 ** 7),
+        'nonvoluntary': rnd.randint(0, 10 ** 5),
+    }
+
+
+def generate(root, processes=100, interfaces=2, cpus=4, depth=4, seed=0):
+    """
+    Writes a fake proc tree under root
+
+    :param processes: number of /proc/[pid]/status files, pid 1 is init
+    :param interfaces: number of ethN interfaces under /proc/sys/net
+    :param cpus: number of processors in /proc/cpuinfo
+    :param depth: length of the parent-child chains below init, PidStatus
+        recurses once per level so keep it well under the recursion limit
+    :param seed: seed of the generated values
+    :rtype str: root
+    """
+    for name, value in (('processes', processes), ('cpus', cpus),
+                        ('depth', depth)):
+        if value < 1:
+            raise ValueError('%s must be at least 1, not %r' % (name, value))
+    rnd = random.Random(seed)
+
+    write(root, 'cpuinfo', gen_cpuinfo(cpus))
+    write(root, 'meminfo', gen_meminfo(rnd))
+    write(root, 'vmstat', gen_vmstat(rnd))
+    write(root, 'loadavg', "%.2f %.2f %.2f %d/%d %d\n" % (
+        rnd.random() * cpus, rnd.random() * cpus, rnd.random() * cpus,
+        rnd.randint(1, cpus), processes, processes + 1))
+    write(root, 'uptime', "%.2f %.2f\n" % (86400.5, 86400.5 * cpus * 0.9))
+    write(root, 'version', "Linux version 4.4.0-21-generic (buildd@lgw01-21) "
+          "(gcc version 5.3.1 20160413 (Ubuntu 5.3.1-14ubuntu2) ) "
+          "#42-Ubuntu SMP Thu Apr 21 16:25:03 UTC 2016\n")
+    write(root, 'cmdline', "BOOT_IMAGE=/boot/vmlinuz-4.4.0-21-generic "
+          "root=UUID=0e6b5f3c-1b2f-4d8e-8a5a-7f6e3d2c1b0a ro quiet splash\n")
+
+    write_tree(root, 'sys/kernel', SYS_KERNEL)
+    write_tree(root, 'sys/vm', SYS_VM)
+    write_tree(root, 'sys/dev', SYS_DEV)
+    write_tree(root, 'sys/net', SYS_NET)
+
+    ifaces = ['all', 'default', 'lo'] + ['eth%d' % i for i in range(interfaces)]
+    for iface in ifaces:
+        write_tree(root, 'sys/net/ipv4/conf/' + iface, IPV4_CONF)
+        write_tree(root, 'sys/net/ipv6/conf/' + iface, IPV6_CONF)
+        if iface != 'all':
+            write_tree(root, 'sys/net/ipv4/neigh/' + iface, NEIGH)
+            write_tree(root, 'sys/net/ipv6/neigh/' + iface, NEIGH)
+
+    for pid, ppid in sorted(gen_parents(processes, depth).iteritems()):
+        write(root, '%d/status' % pid, gen_status(rnd, pid, ppid, cpus))
+
+    return root
+
+
+def at_least(minimum):
+    """
+    argparse type of ints no smaller than minimum
+    """
+    def check(text):
+        value = int(text)
+        if value < minimum:
+            raise argparse.ArgumentTypeError('must be at least %d' % minimum)
+        return value
+    return check
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    argparser.add_argument('root', help="directory to write the tree to")
+    argparser.add_argument('--processes', type=at_least(1), default=100)
+    argparser.add_argument('--interfaces', type=at_least(0), default=2)
+    argparser.add_argument('--cpus', type=at_least(1), default=4)
+    argparser.add_argument('--depth', type=at_least(1), default=4,
+                           help="length of the process chains below init")
+    argparser.add_argument('--seed', type=int, default=0)
+    args = argparser.parse_args()
+
+    generate(args.root, args.processes, args.interfaces, args.cpus,
+             args.depth, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Gorilla-style compressed time series
+
+Compresses (timestamp, value) pairs the way Facebook's Gorilla TSDB does:
+
+* timestamps are kept in milliseconds and encoded as the delta of the
+  delta to the previous one, which is 0, a single bit, for a sampler
+  running on a steady interval
+* values are XORed with the previous value, an unchanged gauge costs a
+  single bit and a slowly moving counter only its changed middle bits
+
+Points are appended to an open block which is closed every BLOCK_SIZE
+points. Closed blocks are immutable byte strings and carry their first
+and last timestamp so range queries skip whole blocks and decode the
+rest as a stream.
+
+Timestamps come back rounded to the millisecond.
+"""
+import struct
+from array import array
+from collections import deque, namedtuple
+
+BLOCK_SIZE = 128
+
+_DOUBLE = struct.Struct('<d')
+_UINT64 = struct.Struct('<Q')
+
+#(prefix, prefix bits, value bits, lowest value) for delta of deltas
+_DOD_RANGES = (
+    (0b10, 2, 7, -63),
+    (0b110, 3, 9, -255),
+    (0b1110, 4, 12, -2047),
+)
+
+Block = namedtuple('Block', 'first last count data')
+
+
+def float_to_bits(value):
+    return _UINT64.unpack(_DOUBLE.pack(value))[0]
+
+
+def bits_to_float(bits):
+    return _DOUBLE.unpack(_UINT64.pack(bits))[0]
+
+
+class BitWriter(object):
+
+    def __init__(self):
+        self.data = bytearray()
+        self._acc = 0
+        self._nbits = 0
+
+    def write(self, value, nbits):
+        self._acc = (self._acc << nbits) | (value & ((1 << nbits) - 1))
+        self._nbits += nbits
+        while self._nbits >= 8:
+            self._nbits -= 8
+            self.data.append((self._acc >> self._nbits) & 0xff)
+        self._acc &= (1 << self._nbits) - 1
+
+    def getvalue(self):
+        """
+        Returns the bytes written so far, the last byte zero padded
+        """
+        if not self._nbits:
+            return str(self.data)
+        return str(self.data + bytearray([(self._acc << (8 - self._nbits)) & 0xff]))
+
+    def nbytes(self):
+        return len(self.data) + 1
+
+
+class BitReader(object):
+
+    def __init__(self, data):
+        self.data = bytearray(data)
+        self.pos = 0
+
+    def read(self, nbits):
+        value = 0
+        while nbits:
+            byte = self.data[self.pos >> 3]
+            offset = self.pos & 7
+            take = min(8 - offset, nbits)
+            value = (value << take) | ((byte >> (8 - offset - take)) &
+                                       ((1 << take) - 1))
+            self.pos += take
+            nbits -= take
+        return value
+
+    def read_bit(self):
+        bit = (self.data[self.pos >> 3] >> (7 - (self.pos & 7))) & 1
+        self.pos += 1
+        return bit
+
+
+class Encoder(object):
+    """
+    Appends points to one block
+    """
+
+    def __init__(self):
+        self.bits = BitWriter()
+        self.count = 0
+        self.first = None
+        self.last = None
+        self._delta = 0
+        self._value = 0
+        self._leading = -1
+        self._trailing = 0
+
+    def append(self, timestamp, value):
+        t = int(round(timestamp * 1000))
+        v = float_to_bits(value)
+
+        if not self.count:
+            self.bits.write(t, 64)
+            self.bits.write(v, 64)
+            self.first = t
+        else:
+            delta = t - self.last
+            self._write_dod(delta - self._delta)
+            self._delta = delta
+            self._write_xor(v ^ self._value)
+
+        self.last = t
+        self._value = v
+        self.count += 1
+
+    def _write_dod(self, dod):
+        if dod == 0:
+            self.bits.write(0, 1)
+            return
+        for prefix, prefix_bits, value_bits, lowest in _DOD_RANGES:
+            if lowest <= dod < lowest + (1 << value_bits):
+                self.bits.write(prefix, prefix_bits)
+                self.bits.write(dod - lowest, value_bits)
+                return
+        self.bits.write(0b1111, 4)
+        self.bits.write(dod, 64)
+
+    def _write_xor(self, xor):
+        if not xor:
+            self.bits.write(0, 1)
+            return
+        leading = min(64 - xor.bit_length(), 31)
+        trailing = (xor & -xor).bit_length() - 1
+
+        if self._leading >= 0 and leading >= self._leading and \
+                trailing >= self._trailing:
+            # fits in the previous window of meaningful bits
+            self.bits.write(0b10, 2)
+            self.bits.write(xor >> self._trailing,
+                            64 - self._leading - self._trailing)
+            return
+
+        meaningful = 64 - leading - trailing
+        self.bits.write(0b11, 2)
+        self.bits.write(leading, 5)
+        self.bits.write(meaningful - 1, 6)
+        self.bits.write(xor >> trailing, meaningful)
+        self._leading = leading
+        self._trailing = trailing
+
+    def close(self):
+        return Block(self.first / 1000.0, self.last / 1000.0, self.count,
+                     self.bits.getvalue())
+
+
+def decode(data, count):
+    """
+    Yields the (timestamp, value) pairs of a block
+    """
+    if not count:
+        return
+    bits = BitReader(data)
+    t = bits.read(64)
+    v = bits.read(64)
+    yield t / 1000.0, bits_to_float(v)
+
+    delta = 0
+    leading = trailing = 0
+    for _ in xrange(count - 1):
+        if bits.read_bit():
+            for prefix, prefix_bits, value_bits, lowest in _DOD_RANGES:
+                if not bits.read_bit():
+                    delta += bits.read(value_bits) + lowest
+                    break
+            else:
+                dod = bits.read(64)
+                if dod >= 1 << 63:
+                    dod -= 1 << 64
+                delta += dod
+        t += delta
+
+        if bits.read_bit():
+            if bits.read_bit():
+                leading = bits.read(5)
+                meaningful = bits.read(6) + 1
+                trailing = 64 - leading - meaningful
+            v ^= bits.read(64 - leading - trailing) << trailing
+
+        yield t / 1000.0, bits_to_float(v)
+
+
+class CompressedSeries(object):
+    """
+    Bounded series of compressed blocks, keeps at least size points
+    """
+
+    def __init__(self, size, block_size=BLOCK_SIZE):
+        self.size = size
+        self.block_size = block_size
+        self.blocks = deque(maxlen=max(1, -(-size // block_size)))
+        self.encoder = Encoder()
+
+    def __len__(self):
+        return sum(b.count for b in self.blocks) + self.encoder.count
+
+    def append(self, timestamp, value):
+        self.encoder.append(timestamp, value)
+        if self.encoder.count >= self.block_size:
+            self.blocks.append(self.encoder.close())
+            self.encoder = Encoder()
+
+    def iter_blocks(self):
+        for block in list(self.blocks):
+            yield block
+        if self.encoder.count:
+            yield self.encoder.close()
+
+    def points(self, since=None, until=None):
+        """
+        Yields (timestamp, value) pairs in the range, decoding only the
+        blocks that overlap it
+        """
+        for block in self.iter_blocks():
+            if since is not None and block.last < since:
+                continue
+            if until is not None and block.first > until:
+                return
+            for timestamp, value in decode(block.data, block.count):
+                if since is not None and timestamp < since:
+                    continue
+                if until is not None and timestamp > until:
+                    return
+                yield timestamp, value
+
+    def range(self, since=None, until=None):
+        """
+        Returns (timestamps, values) arrays with since <= timestamp <= until
+        """
+        timestamps, values = array('d'), array('d')
+        for timestamp, value in self.points(since, until):
+            timestamps.append(timestamp)
+            values.append(value)
+        return timestamps, values
+
+    @property
+    def oldest(self):
+        if self.blocks:
+            return self.blocks[0].first
+        if self.encoder.count:
+            return self.encoder.first / 1000.0
+        return None
+
+    def nbytes(self):
+        return (sum(len(b.data) for b in self.blocks) +
+                self.encoder.bits.nbytes())
@@ -2,6 +2,10 @@ import json
 import slashproc_parser.jsonrpclib as jsonrpclib
 from slashproc_parser.jsonrpclib import Fault
 from slashproc_parser.jsonrpclib.jsonrpc import USE_UNIX_SOCKETS
+from slashproc_parser.jsonrpclib.jsonrpc import iterdumps, iterencode
+from slashproc_parser.jsonrpclib.jsonrpc import Spliced, compressobj
+from slashproc_parser import stats
+from slashproc_parser import metrics
 import SimpleXMLRPCServer
 import SocketServer
 import socket
@@ -47,12 +51,42 @@ def validate_request(request):
         return fault
     return True
 
+def timed_chunks(chunks):
+    """
+    Adds the encoding of chunks to the serialize phase of the current
+    request, and ends the request once they are all encoded
+    """
+    chunks = iter(chunks)
+    try:
+        while True:
+            with stats.phase('serialize'):
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        stats.end()
+
 class SimpleJSONRPCDispatcher(SimpleXMLRPCServer.SimpleXMLRPCDispatcher):
 
+    # the response of a call is held back until this many bytes of it are
+    # encoded, an error while encoding them becomes a fault of that call
+    buffer_threshold = 64 * 1024
+
     def __init__(self, encoding=None):
         SimpleXMLRPCServer.SimpleXMLRPCDispatcher.__init__(self,
                                         allow_none=True,
                                         encoding=encoding)
+        # methods only called by GET routes
+        self.get_only = set()
+
+    def register_get_function(self, function, name=None):
+        """
+        Registers a function served by the GET routes only, eg. one
+        returning a generator of text JSON can not encode
+        """
+        self.register_function(function, name)
+        self.get_only.add(name or function.__name__)
 
     def _marshaled_dispatch(self, data, dispatch_method = None):
         response = None
@@ -88,31 +122,102 @@ class SimpleJSONRPCDispatcher(SimpleXMLRPCServer.SimpleXMLRPCDispatcher):
         return response
 
     def _marshaled_single_dispatch(self, request):
+        chunks = self._single_dispatch_chunks(request)
+        if chunks is None:
+            return None
+        try:
+            return ''.join(chunks)
+        except:
+            exc_type, exc_value, exc_tb = sys.exc_info()
+            fault = Fault(-32603, '%s:%s' % (exc_type, exc_value))
+            return fault.response()
+
+    def _marshaled_dispatch_chunks(self, data):
+        """
+        Like _marshaled_dispatch, yields the response in pieces as it is
+        encoded. Every call of a batch is made once the response of the
+        previous one is written. An error while encoding the first
+        buffer_threshold bytes of a call gives a fault of that call, a
+        later one ends the response where it is.
+        """
+        try:
+            request = jsonrpclib.loads(data)
+        except Exception, e:
+            fault = Fault(-32700, 'Request %s invalid. (%s)' % (data, e))
+            yield fault.response()
+            return
+        if not request:
+            fault = Fault(-32600, 'Request invalid -- no request data.')
+            yield fault.response()
+            return
+        if type(request) is types.ListType:
+            separator = '['
+            for req_entry in request:
+                result = validate_request(req_entry)
+                if type(result) is Fault:
+                    chunks = [result.response()]
+                else:
+                    chunks = self._single_dispatch_chunks(req_entry)
+                if chunks is None:
+                    continue
+                yield separator
+                separator = ','
+                for chunk in chunks:
+                    yield chunk
+            if separator == ',':
+                yield ']'
+        else:
+            result = validate_request(request)
+            if type(result) is Fault:
+                yield result.response()
+                return
+            for chunk in self._single_dispatch_chunks(request) or ():
+                yield chunk
+
+    def _single_dispatch_chunks(self, request):
         # TODO - Use the multiprocessing and skip the response if
         # it is a notification
         # Put in support for custom dispatcher here
         # (See SimpleXMLRPCServer._marshaled_dispatch)
         method = request.get('method')
         params = request.get('params')
+        if method in self.get_only:
+            fault = Fault(-32601, 'Method %s not supported.' % method,
+                          rpcid=request.get('id'))
+            return [fault.response()]
+        stats.begin(method)
         try:
             response = self._dispatch(method, params)
         except:
+            stats.end()
             exc_type, exc_value, exc_tb = sys.exc_info()
             fault = Fault(-32603, '%s:%s' % (exc_type, exc_value))
-            return fault.response()
+            return [fault.response()]
         if 'id' not in request.keys() or request['id'] == None:
             # It's a notification
+            stats.end()
             return None
+        chunks = timed_chunks(iterdumps(response, rpcid=request['id']))
+        return self._fault_on_error(chunks, request['id'])
+
+    def _fault_on_error(self, chunks, rpcid):
+        held, size = [], 0
         try:
-            response = jsonrpclib.dumps(response,
-                                        methodresponse=True,
-                                        rpcid=request['id']
-                                        )
-            return response
-        except:
+            for chunk in chunks:
+                held.append(chunk)
+                size += len(chunk)
+                if size >= self.buffer_threshold:
+                    break
+        except Exception:
             exc_type, exc_value, exc_tb = sys.exc_info()
-            fault = Fault(-32603, '%s:%s' % (exc_type, exc_value))
-            return fault.response()
+            fault = Fault(-32603, '%s:%s' % (exc_type, exc_value),
+                          rpcid=rpcid)
+            yield fault.response()
+            return
+        for chunk in held:
+            yield chunk
+        for chunk in chunks:
+            yield chunk
 
     def _dispatch(self, method, params):
         func = None
@@ -152,20 +257,98 @@ class SimpleJSONRPCDispatcher(SimpleXMLRPCServer.SimpleXMLRPCDispatcher):
 class SimpleJSONRPCRequestHandler(
         SimpleXMLRPCServer.SimpleXMLRPCRequestHandler):
 
-    get_routes = {"slashproc": "get_data"}
+    # keep connections open between requests, idle ones are closed after
+    # timeout seconds. Servers handling one connection at a time close
+    # each after its response, see _keep_alive
+    protocol_version = "HTTP/1.1"
+    timeout = 5
+
+    get_routes = {"slashproc": "get_data", "metrics": "get_metrics",
+                  "groups": "get_groups", "vars": "get_vars"}
+
+    # methods given the tags of If-None-Match as their etag param, their
+    # results carry an 'etag' and are {'etag', 'notmodified': True} when
+    # the client has it, which is answered with 304 Not Modified
+    conditional_methods = ("get_groups", "get_vars")
+
+    # generators returned by these routes are streamed as text
+    text_routes = {"metrics": metrics.CONTENT_TYPE}
+
+    # responses longer than this are sent in chunks of about this size
+    # as they are encoded, instead of whole with a Content-length
+    stream_threshold = 64 * 1024
+
+    # responses of at least compress_threshold bytes are compressed when
+    # the client accepts gzip or deflate, a compress_level of 0 disables
+    # compression
+    compress_threshold = 1024
+    compress_level = 6
 
     def do_GET(self):
         method, params = self._validate_get_path()
         if not (method or params):
             self.report_404()
             return
-        response = self.server._dispatch(method, params)
-        json_response = json.dumps({"result": response})
-        self.send_response(200)
-        self._send(json_response, "application/json")
+        if method in self.conditional_methods:
+            tags = self._if_none_match()
+            if tags:
+                params["etag"] = tags
+        stats.begin(method)
+        try:
+            response = self.server._dispatch(method, params)
+        except:
+            stats.end()
+            raise
+        headers = []
+        if isinstance(response, dict) and "etag" in response:
+            # weak, gzip, deflate and identity bodies share the tag
+            headers.append(("ETag", 'W/"%s"' % response["etag"]))
+            if response.get("notmodified"):
+                stats.end()
+                self._send_not_modified(headers)
+                return
+        if isinstance(response, types.GeneratorType):
+            try:
+                with stats.phase('serialize'):
+                    self._send_stream(response, self._text_type(method))
+            finally:
+                stats.end()
+            return
+        if isinstance(response, jsonrpclib.RawJSON):
+            chunks = [response.splice({})]
+        else:
+            chunks = iterencode({"result": response})
+        chunks = timed_chunks(chunks)
+        try:
+            head, done = self._read_ahead(chunks)
+        except Exception:
+            chunks.close()
+            raise
+        self._send_chunks(head, done, chunks, "application/json", headers)
+
+    def _if_none_match(self):
+        # the tags of If-None-Match without quotes, weak ones included
+        tags = list()
+        for tag in self.headers.get("If-None-Match", "").split(","):
+            tag = tag.strip()
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            tag = tag.strip('"')
+            if tag:
+                tags.append(tag)
+        return tags
+
+    def _send_not_modified(self, headers):
+        self.send_response(304)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.flush()
 
     def do_POST(self):
         if not self.is_rpc_path_valid():
+            # the body is left unread, the connection can not be reused
+            self.close_connection = 1
             self.report_404()
             return
         try:
@@ -177,33 +360,205 @@ class SimpleJSONRPCRequestHandler(
                 L.append(self.rfile.read(chunk_size))
                 size_remaining -= len(L[-1])
             data = ''.join(L)
-            response = self.server._marshaled_dispatch(data)
-            self.send_response(200)
+            chunks = self.server._marshaled_dispatch_chunks(data)
+            head, done = self._read_ahead(chunks)
         except Exception, e:
             self.send_response(500)
             err_lines = traceback.format_exc().splitlines()
             trace_string = '%s | %s' % (err_lines[-3], err_lines[-1])
             fault = jsonrpclib.Fault(-32603, 'Server error: %s' % trace_string)
-            response = fault.response()
-        if response == None:
-            response = ''
-        self._send(response, "application/json-rpc")
+            self._send(fault.response(), "application/json-rpc")
+            return
+        self._send_chunks(head, done, chunks, "application/json-rpc")
+
+    def _read_ahead(self, chunks):
+        # Returns (the first stream_threshold bytes of chunks, whether
+        # that is all of them), so short responses get a Content-length
+        # and errors before the threshold can still be answered. A RawJSON
+        # response is whole already and is not streamed.
+        head = []
+        size = 0
+        for chunk in chunks:
+            head.append(chunk)
+            size += len(chunk)
+            if size >= self.stream_threshold and \
+                    not isinstance(chunk, Spliced):
+                return head, False
+        return head, True
+
+    def _content_coding(self):
+        # gzip or deflate if Accept-Encoding allows it, else None
+        if not self.compress_level:
+            return None
+        accepted = dict()
+        for item in self.headers.get("Accept-Encoding", "").split(","):
+            coding, _, params = item.partition(";")
+            quality = 1.0
+            params = params.strip()
+            if params.startswith("q="):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    quality = 0
+            accepted[coding.strip().lower()] = quality
+        for coding in ("gzip", "deflate"):
+            if accepted.get(coding, accepted.get("*", 0)) > 0:
+                return coding
+        return None
+
+    def _compress(self, response, coding):
+        # RawJSON keeps the compression of its own text between responses
+        if isinstance(response, Spliced):
+            return response.compress(coding, self.compress_level)
+        compressor = compressobj(coding, self.compress_level)
+        return compressor.compress(response) + compressor.flush()
+
+    def _send_chunks(self, head, done, chunks, content_type, headers=()):
+        self.send_response(200)
+        for name, value in headers:
+            self.send_header(name, value)
+        coding = self._content_coding()
+        if self.compress_level:
+            self.send_header("Vary", "Accept-Encoding")
+        if done:
+            response = head[0] if len(head) == 1 else ''.join(head)
+            if coding and len(response) >= self.compress_threshold:
+                response = self._compress(response, coding)
+                self.send_header("Content-Encoding", coding)
+            self._send(response, content_type)
+            return
+
+        compressor = None
+        if coding:
+            compressor = compressobj(coding, self.compress_level)
+            self.send_header("Content-Encoding", coding)
+        self.send_header("Content-type", content_type)
+        chunked = self.request_version == "HTTP/1.1"
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            # the body ends with the connection
+            if self._keep_alive():
+                self.send_header("Connection", "close")
+            self.close_connection = 1
+        self.end_headers()
+
+        buffered = head
+        size = sum(len(chunk) for chunk in head)
+        try:
+            for chunk in chunks:
+                buffered.append(chunk)
+                size += len(chunk)
+                if size >= self.stream_threshold:
+                    self._write_chunk(''.join(buffered), chunked, compressor)
+                    buffered, size = [], 0
+            self._write_chunk(''.join(buffered), chunked, compressor)
+            if compressor is not None:
+                self._write_chunk(compressor.flush(), chunked)
+        except Exception:
+            # the status is sent, cut the response short so the client
+            # sees it is incomplete
+            logging.exception("Streaming %s failed", self.path)
+            self.close_connection = 1
+            return
+        if chunked:
+            self.wfile.write("0\r\n\r\n")
+        self.wfile.flush()
+
+    def _write_chunk(self, data, chunked, compressor=None):
+        if compressor is not None:
+            data = compressor.compress(data)
+        if not data:
+            return
+        if chunked:
+            self.wfile.write("%x\r\n%s\r\n" % (len(data), data))
+        else:
+            self.wfile.write(data)
         
     def _validate_get_path(self):
-        parts = [p.strip() for p in self.path.split("/") if p.strip()]
+        path = self.path.split("?", 1)[0]
+        parts = [p.strip() for p in path.split("/") if p.strip()]
         for prefix, method in self.get_routes.items():
-            if parts[0] == prefix:
+            if parts and parts[0] == prefix:
                 params = "/" + "/".join(parts[1:])
                 return method, {"path": params}
         return None, None
         
+    def _text_type(self, method):
+        for prefix, route in self.get_routes.items():
+            if route == method and prefix in self.text_routes:
+                return self.text_routes[prefix]
+        return "text/plain"
+
+    def _send_stream(self, chunks, content_type):
+        # without a Content-length the body ends with the connection, so
+        # nothing has to be buffered
+        self.send_response(200)
+        self.send_header("Content-type", content_type)
+        if self._keep_alive():
+            self.send_header("Connection", "close")
+        coding = self._content_coding()
+        compressor = None
+        if coding:
+            compressor = compressobj(coding, self.compress_level)
+            self.send_header("Content-Encoding", coding)
+            self.send_header("Vary", "Accept-Encoding")
+        self.end_headers()
+        self.close_connection = 1
+        try:
+            for chunk in chunks:
+                self._write_chunk(chunk, False, compressor)
+            if compressor is not None:
+                self._write_chunk(compressor.flush(), False)
+        except Exception:
+            logging.exception("Streaming %s failed", self.path)
+        self.wfile.flush()
+
+    def send_response(self, code, message=None):
+        SimpleXMLRPCServer.SimpleXMLRPCRequestHandler.send_response(
+            self, code, message)
+        if not self._keep_alive():
+            # sets close_connection
+            self.send_header("Connection", "close")
+
+    def _keep_alive(self):
+        # a kept alive connection to a server handling one at a time would
+        # hold off every other client until it idles out
+        return isinstance(self.server, (SocketServer.ThreadingMixIn,
+                                        SocketServer.ForkingMixIn))
+
+    def setup(self):
+        # TCP_NODELAY fails on unix sockets
+        if not self._is_tcp():
+            self.disable_nagle_algorithm = False
+        SimpleXMLRPCServer.SimpleXMLRPCRequestHandler.setup(self)
+
+    def log_message(self, format, *args):
+        # peers of a unix socket have no address, the socket path is logged
+        peer = self.client_address[0] if self._is_tcp() else \
+            self.server.server_address
+        sys.stderr.write("%s - - [%s] %s\n" % (peer,
+                                               self.log_date_time_string(),
+                                               format % args))
+
+    def log_error(self, format, *args):
+        # every idle keep-alive connection ends in a timeout, it is only
+        # logged along with the requests
+        if format.startswith("Request timed out") and \
+                not self.server.logRequests:
+            return
+        SimpleXMLRPCServer.SimpleXMLRPCRequestHandler.log_error(
+            self, format, *args)
+
+    def _is_tcp(self):
+        return isinstance(self.client_address, tuple)
+
     def _send(self, response, content_type):
         self.send_header("Content-type", content_type)
         self.send_header("Content-length", str(len(response)))
         self.end_headers()
         self.wfile.write(response)
         self.wfile.flush()
-        self.connection.shutdown(1)
     
 
 class SimpleJSONRPCServer(SocketServer.TCPServer, SimpleJSONRPCDispatcher):
@@ -212,8 +567,13 @@ class SimpleJSONRPCServer(SocketServer.TCPServer, SimpleJSONRPCDispatcher):
 
     def __init__(self, addr, requestHandler=SimpleJSONRPCRequestHandler,
                  logRequests=True, encoding=None, bind_and_activate=True,
-                 address_family=socket.AF_INET):
+                 address_family=socket.AF_INET, socket_mode=None):
+        """
+        :param socket_mode: permissions of the socket file when
+            address_family is AF_UNIX, eg. 0660, default from the umask
+        """
         self.logRequests = logRequests
+        self.socket_mode = socket_mode
         SimpleJSONRPCDispatcher.__init__(self, encoding)
         # TCPServer.__init__ has an extra parameter on 2.6+, so
         # check Python version and decide on how to call it
@@ -239,6 +599,23 @@ class SimpleJSONRPCServer(SocketServer.TCPServer, SimpleJSONRPCDispatcher):
             flags |= fcntl.FD_CLOEXEC
             fcntl.fcntl(self.fileno(), fcntl.F_SETFD, flags)
 
+    def _is_unix(self):
+        return USE_UNIX_SOCKETS and self.address_family == socket.AF_UNIX
+
+    def server_bind(self):
+        SocketServer.TCPServer.server_bind(self)
+        # before listen, so no client connects with the umask's permissions
+        if self._is_unix() and self.socket_mode is not None:
+            os.chmod(self.server_address, self.socket_mode)
+
+    def server_close(self):
+        SocketServer.TCPServer.server_close(self)
+        if self._is_unix():
+            try:
+                os.unlink(self.server_address)
+            except OSError:
+                pass
+
 class CGIJSONRPCRequestHandler(SimpleJSONRPCDispatcher):
 
     def __init__(self, encoding=None):
@@ -29,6 +29,13 @@ class Config(object):
     user_agent = 'jsonrpclib/0.1 (Python %s)' % \
         '.'.join([str(ver) for ver in sys.version_info[0:3]])
     # User agent to use for calls.
+    history = False
+    # Set to True to keep the latest requests and responses in
+    # jsonrpclib.history, off it costs nothing.
+    history_size = 20
+    # The number of requests and of responses history keeps.
+    history_bytes = 1024 * 1024
+    # The total size of the strings history keeps.
     _instance = None
     
     @classmethod
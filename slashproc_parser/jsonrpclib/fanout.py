@@ -0,0 +1,377 @@
+"""
+Fan-out client calling many JSON-RPC servers at once
+
+Where ServerProxy blocks a thread per server, FanOut drives every
+connection from a single thread with asyncore, the event loop of the
+python 2 standard library:
+
+>>> from slashproc_parser.jsonrpclib.fanout import FanOut
+>>> fanout = FanOut(concurrency=200, timeout=5)
+>>> hosts = ['http://agent%d:8848' % i for i in range(2000)]
+>>> for uri, result, error in fanout.call(hosts, 'get_data', parser='meminfo'):
+...     print uri, error or result['found']
+
+Results are yielded as the servers answer, not in the order of the uris.
+At most concurrency requests are open at a time, each with its own
+timeout, per uri from timeouts or the default. Host names are looked up
+on background threads as their requests are admitted, the timeout of a
+request covers its lookup. A failed request yields
+its exception as error and None as result: socket errors, socket.timeout,
+xmlrpclib.ProtocolError for an HTTP status other than 200 and
+jsonrpc.ProtocolError for an error response.
+"""
+import os
+import sys
+import time
+import errno
+import socket
+import urllib
+import asyncore
+import xmlrpclib
+import threading
+from collections import deque
+
+from slashproc_parser.jsonrpclib import config
+from slashproc_parser.jsonrpclib.jsonrpc import dumps, loads, check_for_errors
+from slashproc_parser.jsonrpclib.jsonrpc import random_id, decompress
+
+DEFAULT_CONCURRENCY = 100
+DEFAULT_TIMEOUT = 10
+
+# longest a loop iteration waits, so timeouts are noticed
+POLL_INTERVAL = 0.05
+
+
+def parse_uri(uri):
+    """
+    Returns (socket address, host header, handler) of an http or unix uri
+    """
+    schema, rest = urllib.splittype(uri)
+    if schema == 'unix':
+        return rest, 'localhost', '/'
+    if schema != 'http':
+        raise IOError('Unsupported JSON-RPC protocol.')
+    host, handler = urllib.splithost(rest)
+    hostname, port = urllib.splitport(host)
+    return (hostname, int(port or 80)), host, handler or '/'
+
+
+class Resolver(object):
+    """
+    Looks up host names on background threads, once each
+
+    gethostbyname blocks, inside the event loop it would stall every open
+    request. A lookup that hangs only holds up the requests to its host,
+    which time out as usual.
+    """
+
+    def __init__(self):
+        self.results = dict()
+        self.started = set()
+
+    def lookup(self, hostname):
+        """
+        Returns (address, error) of hostname, None while it is looked up
+        """
+        result = self.results.get(hostname)
+        if result is None and hostname not in self.started:
+            self.started.add(hostname)
+            try:
+                socket.inet_aton(hostname)
+            except socket.error:
+                thread = threading.Thread(target=self._lookup,
+                                          args=(hostname,))
+                thread.daemon = True
+                thread.start()
+            else:
+                result = self.results[hostname] = hostname, None
+        return result
+
+    def _lookup(self, hostname):
+        try:
+            self.results[hostname] = socket.gethostbyname(hostname), None
+        except Exception, e:
+            self.results[hostname] = None, e
+
+
+def dechunk(body):
+    """
+    Decodes a chunked transfer encoded body
+    """
+    chunks = list()
+    pos = 0
+    while True:
+        end = body.index('\r\n', pos)
+        size = int(body[pos:end].split(';')[0], 16)
+        if not size:
+            return ''.join(chunks)
+        chunks.append(body[end + 2:end + 2 + size])
+        pos = end + 2 + size + 2
+
+
+class Request(asyncore.dispatcher):
+    """
+    One POST, from connecting to the end of the response
+    """
+
+    def __init__(self, uri, body, timeout, socket_map, done, resolver):
+        """
+        :param resolver: Resolver looking up the host name of uri
+        """
+        asyncore.dispatcher.__init__(self, map=socket_map)
+        self.uri = uri
+        self.deadline = time.time() + timeout
+        self.done = done
+        self.received = list()
+        self.finished = False
+        # the response is scanned as it arrives instead of joined on every
+        # read, headers until their end is found, then only counted
+        self.head = ''
+        self.length = None
+        self.body_size = None
+
+        self.address, host, handler = parse_uri(uri)
+        self.resolver = resolver
+        self.outgoing = ('POST %s HTTP/1.1\r\n'
+                         'Host: %s\r\n'
+                         'User-Agent: %s\r\n'
+                         'Content-Type: application/json-rpc\r\n'
+                         'Content-Length: %d\r\n'
+                         'Accept-Encoding: gzip\r\n'
+                         'Connection: close\r\n'
+                         '\r\n%s') % (handler, host, config.user_agent,
+                                      len(body), body)
+        self.lookup()
+
+    def lookup(self):
+        # Connects once the address of the host is known
+        if self.socket is not None or self.finished:
+            return
+        if isinstance(self.address, str):
+            family, address = socket.AF_UNIX, self.address
+        else:
+            hostname, port = self.address
+            result = self.resolver.lookup(hostname)
+            if result is None:
+                return
+            ip, error = result
+            if error is not None:
+                self.finish(error=error)
+                return
+            family, address = socket.AF_INET, (ip, port)
+        self.create_socket(family, socket.SOCK_STREAM)
+        try:
+            self.connect(address)
+        except Exception, e:
+            self.finish(error=e)
+
+    def finish(self, body=None, error=None):
+        if self.finished:
+            return
+        self.finished = True
+        if self.socket is not None:
+            self.close()
+        self.done.append((self, body, error))
+
+    def connect_error(self):
+        # The error of a connect that failed, None once connected
+        if self.connected:
+            return None
+        err = self.socket.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        return err and socket.error(err, os.strerror(err)) or None
+
+    def handle_connect(self):
+        pass
+
+    def writable(self):
+        return bool(self.outgoing) or not self.connected
+
+    def handle_write(self):
+        sent = self.send(self.outgoing)
+        self.outgoing = self.outgoing[sent:]
+
+    def handle_read(self):
+        data = self.recv(65536)
+        if data:
+            self.received.append(data)
+            if self.complete(data):
+                self.handle_close()
+
+    def complete(self, data):
+        # True once Content-length bytes of body have arrived
+        if self.body_size is not None:
+            self.body_size += len(data)
+        else:
+            self.head += data
+            end = self.head.find('\r\n\r\n')
+            if end < 0:
+                return False
+            self.body_size = len(self.head) - end - 4
+            for line in self.head[:end].split('\r\n')[1:]:
+                name, _, value = line.partition(':')
+                if name.strip().lower() == 'content-length':
+                    self.length = int(value)
+            self.head = ''
+        return self.length is not None and self.body_size >= self.length
+
+    def handle_close(self):
+        if self.finished:
+            return
+        error = self.connect_error()
+        if error is not None:
+            self.finish(error=error)
+            return
+        try:
+            self.finish(self.parse(''.join(self.received)))
+        except Exception, e:
+            self.finish(error=e)
+
+    def handle_error(self):
+        # called by asyncore from within the except clause
+        self.finish(error=sys.exc_info()[1])
+
+    def handle_expt_event(self):
+        # asyncore would read the error off the socket and close it, a
+        # refused connect then looked like a response cut short
+        error = self.connect_error()
+        if error is not None:
+            self.finish(error=error)
+        else:
+            self.handle_expt()
+
+    def handle_expt(self):
+        self.finish(error=socket.error(errno.EPROTO, 'Out of band data'))
+
+    def parse(self, data):
+        head, sep, body = data.partition('\r\n\r\n')
+        if not sep:
+            raise socket.error(errno.ECONNRESET, 'Connection closed early')
+        lines = head.split('\r\n')
+        status = lines[0].split(None, 2)
+        headers = dict((k.strip().lower(), v.strip()) for k, _, v in
+                       (l.partition(':') for l in lines[1:]))
+        if len(status) < 2 or status[1] != '200':
+            raise xmlrpclib.ProtocolError(self.uri, int(status[1]),
+                                          status[-1], headers)
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = dechunk(body)
+        elif 'content-length' in headers:
+            body = body[:int(headers['content-length'])]
+        return decompress(body, headers.get('content-encoding'))
+
+    def expire(self, now):
+        if now >= self.deadline:
+            self.finish(error=socket.timeout('timed out'))
+
+
+class FanOut(object):
+    """
+    Sends JSON-RPC requests to many servers concurrently
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY,
+                 timeout=DEFAULT_TIMEOUT, timeouts=None, version=None):
+        """
+        :param concurrency: requests open at the same time
+        :param timeout: seconds a request may take, connecting included
+        :param timeouts: dict of uri to its own timeout
+        :param version: JSON-RPC version, default config.version
+        """
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.timeouts = dict(timeouts or {})
+        self.version = version or config.version
+
+    def request(self, method, params, rpcid=None):
+        return dumps(params, method, rpcid=rpcid or random_id(),
+                     version=self.version)
+
+    def run(self, requests):
+        """
+        Yields (uri, response body, error) as responses arrive
+
+        :param requests: iterable of (uri, request body)
+        """
+        pending = deque(requests)
+        resolver = Resolver()
+        socket_map = dict()
+        active = list()
+        done = list()
+
+        while pending or active:
+            while pending and len(active) < self.concurrency:
+                uri, body = pending.popleft()
+                try:
+                    active.append(Request(uri, body,
+                                          self.timeouts.get(uri, self.timeout),
+                                          socket_map, done, resolver))
+                except Exception, e:
+                    yield uri, None, e
+            for request in active:
+                request.lookup()
+
+            if active:
+                wait = max(0, min(min(r.deadline for r in active) -
+                                  time.time(), POLL_INTERVAL))
+                # select() fails on descriptors above FD_SETSIZE, poll
+                # has no such limit
+                if socket_map:
+                    asyncore.loop(timeout=wait, map=socket_map, count=1,
+                                  use_poll=True)
+                else:
+                    # only lookups outstanding
+                    time.sleep(wait)
+            now = time.time()
+            for request in active:
+                request.expire(now)
+
+            while done:
+                request, body, error = done.pop(0)
+                active.remove(request)
+                yield request.uri, body, error
+
+    def call(self, uris, method, *args, **kwargs):
+        """
+        Calls method on every uri, yields (uri, result, error)
+        """
+        params = args or kwargs
+        requests = ((uri, self.request(method, params)) for uri in uris)
+        for uri, body, error in self.run(requests):
+            if error is None:
+                try:
+                    body = check_for_errors(loads(body))['result']
+                except Exception, e:
+                    body, error = None, e
+            yield uri, body, error
+
+    def batch(self, uris, calls):
+        """
+        Sends one batch of calls to every uri, yields (uri, results, error)
+
+        :param calls: list of (method, params)
+        :rtype: results hold the result of each call in order, or the
+            ProtocolError of a call that failed
+        """
+        ids = [random_id() for _ in calls]
+        body = '[%s]' % ','.join(self.request(method, params, rpcid)
+                                 for (method, params), rpcid in zip(calls, ids))
+        for uri, response, error in self.run((uri, body) for uri in uris):
+            results = None
+            if error is None:
+                try:
+                    results = self.match(ids, loads(response))
+                except Exception, e:
+                    error = e
+            yield uri, results, error
+
+    def match(self, ids, responses):
+        by_id = dict((r.get('id'), r) for r in responses or [])
+        results = list()
+        for rpcid in ids:
+            try:
+                results.append(check_for_errors(by_id[rpcid])['result'])
+            except KeyError:
+                results.append(ValueError('No response for %s' % rpcid))
+            except Exception, e:
+                results.append(e)
+        return results
@@ -1,25 +1,61 @@
+import threading
+from collections import deque
+
+from slashproc_parser.jsonrpclib.config import Config
+
+config = Config.instance()
+
+
 class History(object):
     """
-    This holds all the response and request objects for a
-    session. A server using this should call "clear" after
-    each request cycle in order to keep it from clogging 
-    memory.
+    This holds the latest response and request strings of a
+    session, for debugging. It is off unless config.history is
+    set, and then keeps at most config.history_size requests and
+    responses and config.history_bytes of them in total, the
+    oldest are dropped first.
     """
-    requests = []
-    responses = []
     _instance = None
-    
+
+    def __init__(self):
+        self.requests = deque()
+        self.responses = deque()
+        self.nbytes = 0
+        self._lock = threading.Lock()
+
     @classmethod
     def instance(cls):
         if not cls._instance:
             cls._instance = cls()
         return cls._instance
 
+    @property
+    def enabled(self):
+        return config.history
+
+    def _drop(self, entries):
+        self.nbytes -= len(entries.popleft() or '')
+
+    def _add(self, entries, obj):
+        if not config.history or config.history_size <= 0:
+            return
+        with self._lock:
+            if len(entries) >= config.history_size:
+                self._drop(entries)
+            entries.append(obj)
+            self.nbytes += len(obj or '')
+            while self.nbytes > config.history_bytes and \
+                    (self.requests or self.responses):
+                # the older of the two is at the head of the longer one
+                if len(self.requests) >= len(self.responses):
+                    self._drop(self.requests)
+                else:
+                    self._drop(self.responses)
+
     def add_response(self, response_obj):
-        self.responses.append(response_obj)
+        self._add(self.responses, response_obj)
     
     def add_request(self, request_obj):
-        self.requests.append(request_obj)
+        self._add(self.requests, request_obj)
 
     @property
     def request(self):
@@ -36,5 +72,7 @@ class History(object):
             return self.responses[-1]
 
     def clear(self):
-        del self.requests[:]
-        del self.responses[:]
+        with self._lock:
+            self.requests.clear()
+            self.responses.clear()
+            self.nbytes = 0
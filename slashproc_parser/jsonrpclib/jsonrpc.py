@@ -51,8 +51,16 @@ from xmlrpclib import SafeTransport as XMLSafeTransport
 from xmlrpclib import ServerProxy as XMLServerProxy
 from xmlrpclib import _Method as XML_Method
 import time
+import errno
+import base64
 import string
 import random
+import urllib
+import httplib
+import xmlrpclib
+import threading
+import zlib
+from socket import error as SocketError, timeout as SocketTimeout
 
 # Library includes
 import slashproc_parser.jsonrpclib
@@ -87,13 +95,13 @@ class UnixSocketMissing(Exception):
 
 #JSON Abstractions
 
-def jdumps(obj, encoding='utf-8'):
+def jdumps(obj, encoding='utf-8', default=None):
     # Do 'serialize' test at some point for other classes
     global cjson
     if cjson:
         return cjson.encode(obj)
     else:
-        return json.dumps(obj, encoding=encoding)
+        return json.dumps(obj, encoding=encoding, default=default)
 
 def jloads(json_string):
     global cjson
@@ -156,7 +164,7 @@ class SafeTransport(TransportMixIn, XMLSafeTransport):
         XMLSafeTransport.__init__(self)
 
 from httplib import HTTP, HTTPConnection
-from socket import socket
+from socket import socket, _GLOBAL_DEFAULT_TIMEOUT
 
 USE_UNIX_SOCKETS = False
 
@@ -169,20 +177,177 @@ except ImportError:
 if (USE_UNIX_SOCKETS):
     
     class UnixHTTPConnection(HTTPConnection):
+        """
+        HTTPConnection to the unix socket at path, also usable as the connection_class of PooledTransport
+        """
+        def __init__(self, path, *args, **kwargs):
+            # the Host header has no use here, but HTTP/1.1 requires one
+            HTTPConnection.__init__(self, 'localhost', *args, **kwargs)
+            self.path = path
+
         def connect(self):
             self.sock = socket(AF_UNIX, SOCK_STREAM)
-            self.sock.connect(self.host)
+            if self.timeout is not _GLOBAL_DEFAULT_TIMEOUT:
+                self.sock.settimeout(self.timeout)
+            self.sock.connect(self.path)
 
     class UnixHTTP(HTTP):
         _connection_class = UnixHTTPConnection
 
     class UnixTransport(TransportMixIn, XMLTransport):
+        def __init__(self):
+            TransportMixIn.__init__(self)
+            XMLTransport.__init__(self)
+
         def make_connection(self, host):
-            import httplib
-            host, extra_headers, x509 = self.get_host_info(host)
-            return UnixHTTP(host)
+            # the connection is kept between requests like Transport does,
+            # the legacy UnixHTTP has no getresponse for python 2.7
+            if self._connection and host == self._connection[0]:
+                return self._connection[1]
+            self._connection = host, UnixHTTPConnection(host)
+            return self._connection[1]
+
+
+class PooledTransport(object):
+    """
+    HTTP/1.1 transport keeping idle connections open per host.
+
+    One instance may be shared by any number of ServerProxy objects and
+    threads, each request takes a connection from the pool of its host
+    and puts it back once the response is read. A request that fails on
+    a pooled connection before any response arrived is sent once more on
+    a new connection, since the server may have closed the idle socket.
+    The other idle connections of that host are dropped along with it,
+    as they have most likely been closed by the server too.
+
+    idle_timeout defaults below the 5 seconds SimpleJSONRPCServer keeps
+    an idle connection open, so a pooled connection is rarely stale.
+    """
+    user_agent = config.user_agent
+
+    # errors of a socket the server closed while it sat in the pool
+    STALE_ERRNOS = (errno.ECONNRESET, errno.ECONNABORTED, errno.EPIPE)
+
+    def __init__(self, max_idle=8, idle_timeout=4, timeout=None,
+                 connection_class=HTTPConnection, accept_gzip=True):
+        """
+        :param max_idle: idle connections kept per host
+        :param idle_timeout: seconds after which an idle connection is
+            closed instead of reused
+        :param timeout: socket timeout of the connections
+        :param connection_class: httplib.HTTPConnection compatible class
+        :param accept_gzip: ask for compressed responses
+        """
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.connection_class = connection_class
+        self.accept_gzip = accept_gzip
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def _connect(self, host):
+        if self.timeout is None:
+            return self.connection_class(host)
+        return self.connection_class(host, timeout=self.timeout)
+
+    def _acquire(self, host, fresh=False):
+        # Returns (connection, reused), most recently used first
+        if fresh:
+            return self._connect(host), False
+        now = time.time()
+        with self._lock:
+            pool = self._pools.get(host, [])
+            while pool:
+                connection, last_used = pool.pop()
+                if now - last_used < self.idle_timeout:
+                    return connection, True
+                connection.close()
+        return self._connect(host), False
+
+    def _release(self, host, connection):
+        with self._lock:
+            pool = self._pools.setdefault(host, [])
+            if len(pool) < self.max_idle:
+                pool.append((connection, time.time()))
+                return
+        connection.close()
+
+    def _discard(self, host):
+        # Closes the idle connections of host
+        with self._lock:
+            pool = self._pools.pop(host, [])
+        for connection, last_used in pool:
+            connection.close()
+
+    def _is_stale(self, error):
+        if isinstance(error, (httplib.BadStatusLine,
+                              httplib.CannotSendRequest)):
+            return True
+        return isinstance(error, SocketError) and \
+            not isinstance(error, SocketTimeout) and \
+            error.errno in self.STALE_ERRNOS
+
+    def _send(self, connection, host, handler, request_body, auth):
+        connection.putrequest('POST', handler or '/', skip_accept_encoding=1)
+        connection.putheader('User-Agent', self.user_agent)
+        connection.putheader('Content-Type', 'application/json-rpc')
+        connection.putheader('Content-Length', str(len(request_body)))
+        if self.accept_gzip:
+            connection.putheader('Accept-Encoding', 'gzip')
+        if auth:
+            connection.putheader('Authorization', 'Basic ' +
+                                 base64.b64encode(urllib.unquote(auth)))
+        connection.endheaders(request_body)
+        return connection.getresponse(buffering=True)
+
+    def request(self, host, handler, request_body, verbose=0):
+        auth, pool_host = urllib.splituser(host)
+        for attempt in (0, 1):
+            connection, reused = self._acquire(pool_host, fresh=attempt)
+            connection.set_debuglevel(verbose)
+            try:
+                response = self._send(connection, pool_host, handler,
+                                      request_body, auth)
+            except Exception, e:
+                connection.close()
+                if reused and attempt == 0 and self._is_stale(e):
+                    self._discard(pool_host)
+                    continue
+                raise
+
+            try:
+                data = response.read()
+            except Exception:
+                connection.close()
+                raise
+            if response.status != 200:
+                connection.close()
+                raise xmlrpclib.ProtocolError(host + handler,
+                                              response.status,
+                                              response.reason,
+                                              response.msg)
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(pool_host, connection)
+            return decompress(data, response.getheader('content-encoding'))
+
+    def idle(self, host=None):
+        # Number of idle connections, of one host or all of them
+        with self._lock:
+            if host is not None:
+                return len(self._pools.get(host, []))
+            return sum(len(p) for p in self._pools.values())
+
+    def close(self):
+        with self._lock:
+            pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            for connection, last_used in pool:
+                connection.close()
+
 
-    
 class ServerProxy(XMLServerProxy):
     """
     Unfortunately, much more of this class has to be copied since
@@ -208,8 +373,7 @@ class ServerProxy(XMLServerProxy):
             self.__host, self.__handler = urllib.splithost(uri)
             if not self.__handler:
                 # Not sure if this is in the JSON spec?
-                #self.__handler = '/'
-                self.__handler == '/'
+                self.__handler = '/'
         if transport is None:
             if schema == 'unix':
                 transport = UnixTransport()
@@ -236,7 +400,8 @@ class ServerProxy(XMLServerProxy):
         return
 
     def _run_request(self, request, notify=None):
-        history.add_request(request)
+        if config.history:
+            history.add_request(request)
 
         response = self.__transport.request(
             self.__host,
@@ -251,7 +416,8 @@ class ServerProxy(XMLServerProxy):
         # the response object, or expect the Server to be 
         # outputting the response appropriately?
         
-        history.add_response(response)
+        if config.history:
+            history.add_response(response)
         if not response:
             return None
         return_obj = loads(response)
@@ -405,6 +571,70 @@ class Fault(object):
     def __repr__(self):
         return '<Fault %s: %s>' % (self.faultCode, self.faultString)
 
+#wbits of zlib.compressobj for each HTTP content coding
+CONTENT_CODINGS = {'gzip': 16 + zlib.MAX_WBITS, 'deflate': zlib.MAX_WBITS}
+
+def compressobj(coding, level=6):
+    return zlib.compressobj(level, zlib.DEFLATED, CONTENT_CODINGS[coding])
+
+def decompress(data, coding):
+    # data as received with the Content-Encoding header coding
+    coding = (coding or '').strip().lower()
+    if coding not in CONTENT_CODINGS:
+        return data
+    return zlib.decompress(data, CONTENT_CODINGS[coding])
+
+class RawJSON(dict):
+    # A dict result with its JSON rendered ahead of time. It reads like
+    # the dict it was made from, dumps splices the encoded text into the
+    # response instead of encoding the dict again.
+    def __init__(self, obj, encoded=None):
+        dict.__init__(self, obj)
+        if encoded is None:
+            encoded = jdumps(obj)
+        self.encoded = encoded
+        # {(key, coding, level): (compressed head, compressor)}
+        self._compressed = {}
+        self._lock = threading.Lock()
+
+    def head(self, key='result'):
+        return '{"%s": %s' % (key, self.encoded)
+
+    def splice(self, envelope, key='result'):
+        # Encodes envelope with self under key, envelope must not hold key.
+        # self comes first, so its compression can be kept, see compress
+        rest = jdumps(envelope)[1:]
+        if rest != '}':
+            rest = ', ' + rest
+        return Spliced(self.head(key) + rest, self, key, rest)
+
+    def compress(self, rest, coding, level=6, key='result'):
+        # Returns head + rest compressed. head is compressed once per
+        # coding and level, every response only compresses its own rest
+        # with a copy of the compressor as it was after head.
+        cache_key = (key, coding, level)
+        with self._lock:
+            cached = self._compressed.get(cache_key)
+            if cached is None:
+                compressor = compressobj(coding, level)
+                cached = (compressor.compress(self.head(key)), compressor)
+                self._compressed[cache_key] = cached
+            data, compressor = cached
+            compressor = compressor.copy()
+        return data + compressor.compress(rest) + compressor.flush()
+
+class Spliced(str):
+    # The text of a response holding a RawJSON, see RawJSON.splice
+    def __new__(cls, text, raw, key, rest):
+        spliced = str.__new__(cls, text)
+        spliced.raw = raw
+        spliced.key = key
+        spliced.rest = rest
+        return spliced
+
+    def compress(self, coding, level=6):
+        return self.raw.compress(self.rest, coding, level, self.key)
+
 def random_id(length=8):
     return_id = ''
     for i in range(length):
@@ -483,20 +713,144 @@ def dumps(params=[], methodname=None, methodresponse=None,
     if type(methodname) not in types.StringTypes and methodresponse != True:
         raise ValueError('Method name must be a string, or methodresponse '+
                          'must be set to True.')
-    if config.use_jsonclass == True:
-        from slashproc_parser.jsonrpclib import jsonclass
-        params = jsonclass.dump(params)
+    if methodresponse is True and isinstance(params, RawJSON):
+        if rpcid is None:
+            raise ValueError('A method response must have an rpcid.')
+        response = payload.response()
+        del response['result']
+        return params.splice(response)
+    default = jsonclass_default()
+    if default is not None and cjson:
+        params = default(params)
+        default = None
     if methodresponse is True:
         if rpcid is None:
             raise ValueError('A method response must have an rpcid.')
         response = payload.response(params)
-        return jdumps(response, encoding=encoding)
+        return jdumps(response, encoding=encoding, default=default)
     request = None
     if notify == True:
         request = payload.notify(methodname, params)
     else:
         request = payload.request(methodname, params)
-    return jdumps(request, encoding=encoding)
+    return jdumps(request, encoding=encoding, default=default)
+
+def jsonclass_default():
+    # jsonclass.dump as the default of the encoder translates only the
+    # objects json can not encode, instead of copying the whole params
+    if config.use_jsonclass == True:
+        from slashproc_parser.jsonrpclib import jsonclass
+        return jsonclass.dump
+    return None
+
+#containers are walked at most this deep, the values below are encoded
+#whole
+STREAM_DEPTH = 4
+
+#about how many values each streamed piece holds, smaller values and runs
+#of them are encoded by a single call to the C encoder
+STREAM_SLICE = 1024
+
+#containers with more entries than this are tables, weighed by their first
+#row rather than row by row
+STREAM_ROWS = 16
+
+def iterencode(obj, encoding='utf-8', default=None, depth=STREAM_DEPTH,
+               size=STREAM_SLICE):
+    """
+    Yields the JSON of obj in pieces, as json.dumps would encode it,
+    though the keys of a dict may come in another order.
+
+    Only dicts and lists holding more than about size values are walked
+    in python, their entries are encoded by the C encoder in runs of about
+    size values, so the whole text never has to be held in memory while
+    small responses cost a single encode.
+    """
+    if json is None:
+        # cjson has no incremental encoding
+        yield jdumps(obj, encoding=encoding)
+        return
+    encode = json.JSONEncoder(encoding=encoding, default=default).encode
+    for chunk in _iterencode(obj, encode, depth, size):
+        yield chunk
+
+_CONTAINERS = frozenset((dict, list, tuple))
+
+def _weight(obj, limit):
+    # about how many values obj holds, counted until limit is passed; the
+    # rows of a table are taken to weigh as much as its first
+    if type(obj) not in _CONTAINERS or not obj:
+        return 1
+    if len(obj) > STREAM_ROWS:
+        return len(obj) * _weight(_first(obj), limit)
+    weight = 0
+    for value in (obj.itervalues() if type(obj) is dict else obj):
+        if type(value) in _CONTAINERS:
+            weight += _weight(value, limit - weight)
+            if weight > limit:
+                break
+        else:
+            weight += 1
+    return weight
+
+def _first(obj):
+    return next(obj.itervalues()) if type(obj) is dict else obj[0]
+
+def _iterencode(obj, encode, depth, size):
+    if not depth or _weight(obj, size) <= size:
+        yield encode(obj)
+        return
+    if type(obj) is dict:
+        entries, opening, closing = obj.iteritems(), '{', '}'
+    else:
+        entries, opening, closing = enumerate(obj), '[', ']'
+    row = _weight(_first(obj), size) if len(obj) > STREAM_ROWS else None
+    separator = opening
+    run, weight = [], 0
+    for key, value in entries:
+        value_weight = row or _weight(value, size)
+        if run and weight + value_weight > size:
+            yield separator + _encode_run(run, encode, closing)
+            separator = ', '
+            run, weight = [], 0
+        if value_weight <= size:
+            run.append((key, value))
+            weight += value_weight
+            continue
+        if closing == '}':
+            # the key as json.dumps converts it, followed by ': '
+            yield separator + encode({key: 0})[1:-2]
+        else:
+            yield separator
+        separator = ', '
+        for chunk in _iterencode(value, encode, depth - 1, size):
+            yield chunk
+    if run:
+        yield separator + _encode_run(run, encode, closing)
+    yield closing
+
+def _encode_run(run, encode, closing):
+    # the entries of run without the surrounding brackets
+    if closing == '}':
+        return encode(dict(run))[1:-1]
+    return encode([value for key, value in run])[1:-1]
+
+def iterdumps(params, rpcid, encoding=None, version=None):
+    """
+    Yields the method response of params in pieces, as dumps would
+    return it with methodresponse=True.
+    """
+    if rpcid is None:
+        raise ValueError('A method response must have an rpcid.')
+    if type(params) is Fault or isinstance(params, RawJSON):
+        yield dumps(params, methodresponse=True, rpcid=rpcid,
+                    encoding=encoding, version=version)
+        return
+    payload = Payload(rpcid=rpcid, version=version)
+    for chunk in iterencode(payload.response(params),
+                            encoding=encoding or 'utf-8',
+                            default=jsonclass_default()):
+        yield chunk
 
 def loads(data):
     """
@@ -0,0 +1,172 @@
+"""
+Prometheus text exposition of parser data
+
+Numeric vars are rendered as one metric family per var:
+
+    # HELP slashproc_meminfo_memfree_bytes The amount of physical RAM...
+    # TYPE slashproc_meminfo_memfree_bytes gauge
+    slashproc_meminfo_memfree_bytes 123904000
+
+* the name is <prefix>_<parser>_<var> followed by the base unit of the
+  var's 'unit' descriptor, see UNITS, values are scaled to that unit
+* HELP is the var's 'desc' or 'label'
+* TYPE is counter for vars marked 'counter': True, whose names also get
+  the _total suffix, otherwise gauge
+* the groups between the parser and the var become the group label, eg.
+  slashproc_cpuinfo_cpu_mhz{group="core0"}
+
+Descriptors are turned into families once per parser and var and cached,
+since get_vars of some parsers reads the parser's data. The output is
+produced by a generator, one parser at a time, so the server can write it
+out as it is rendered.
+"""
+import re
+import threading
+
+from slashproc_parser.store import to_number
+from slashproc_parser.parsers.parse_helpers import flatten_tree
+
+PREFIX = 'slashproc'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+#lower case unit descriptor to (base unit suffix, scale)
+UNITS = {
+    'kb': ('bytes', 1024),
+    'bytes': ('bytes', 1),
+    'b': ('bytes', 1),
+    'seconds': ('seconds', 1),
+    's': ('seconds', 1),
+    'ms': ('seconds', 0.001),
+}
+
+_INVALID = re.compile(r'[^a-zA-Z0-9_]')
+
+INF = float('inf')
+
+
+class Family(object):
+    """
+    Name, help, type and scale of the metric of one var
+    """
+
+    def __init__(self, parser, var, descriptor):
+        descriptor = descriptor if isinstance(descriptor, dict) else dict()
+        self.counter = bool(descriptor.get('counter'))
+        self.type = 'counter' if self.counter else 'gauge'
+
+        suffix, self.scale = UNITS.get(
+            str(descriptor.get('unit', '')).strip().lower(), (None, 1))
+        parts = [PREFIX, parser, var]
+        if suffix and not var.endswith(suffix):
+            parts.append(suffix)
+        if self.counter:
+            parts.append('total')
+        self.name = metric_name('_'.join(parts))
+
+        text = descriptor.get('desc') or descriptor.get('label') or var
+        self.help = escape_help(text)
+
+    def header(self):
+        return '# HELP %s %s\n# TYPE %s %s\n' % (self.name, self.help,
+                                                 self.name, self.type)
+
+
+def metric_name(name):
+    name = _INVALID.sub('_', name)
+    return '_' + name if name[:1].isdigit() else name
+
+
+def escape_help(text):
+    return ' '.join(str(text).split()).replace('\\', '\\\\')
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_value(value):
+    if value != value:
+        return 'NaN'
+    if value in (INF, -INF):
+        return '+Inf' if value > 0 else '-Inf'
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class MetricsRenderer(object):
+    """
+    Renders parser data, caching the families of every parser
+    """
+
+    def __init__(self):
+        self._families = dict()
+        self._lock = threading.Lock()
+
+    def families(self, parser, cls):
+        """
+        Returns {var: Family} of parser, built on first use
+        """
+        with self._lock:
+            families = self._families.get(parser)
+        if families is None:
+            families = dict((var, Family(parser, var, descriptor))
+                            for var, descriptor in cls.get_vars().iteritems())
+            with self._lock:
+                self._families[parser] = families
+        return families
+
+    def family(self, parser, cls, var):
+        families = self.families(parser, cls)
+        with self._lock:
+            family = families.get(var)
+            if family is None:
+                # vars the parser found but did not describe
+                family = families[var] = Family(parser, var, None)
+        return family
+
+    def render_parser(self, parser, cls, data):
+        """
+        Returns the exposition text of one parser's data
+        """
+        samples = dict()
+        for path, value in flatten_tree(data).iteritems():
+            value = to_number(value)
+            if value is None:
+                continue
+            parts = path.split('/')
+            if len(parts) > 1 and parts[0] == parser:
+                parts.pop(0)
+            family = self.family(parser, cls, parts[-1])
+            samples.setdefault(family, list()).append(
+                ('/'.join(parts[:-1]), value * family.scale))
+
+        lines = list()
+        for family in sorted(samples, key=lambda f: f.name):
+            lines.append(family.header())
+            for group, value in sorted(samples[family]):
+                labels = '{group="%s"}' % escape_label(group) if group else ''
+                lines.append('%s%s %s\n' % (family.name, labels,
+                                            format_value(value)))
+        return ''.join(lines)
+
+    def render(self, parsers, classes, read):
+        """
+        Yields the exposition text parser by parser
+
+        :param parsers: names of the parsers to render
+        :param classes: dict of parser name to parser class
+        :param read: function of (parser, classes) returning
+            (timestamp, data)
+        """
+        for parser in parsers:
+            timestamp, data = read(parser, classes)
+            yield self.render_parser(parser, classes[parser], data)
+
+    def clear(self):
+        with self._lock:
+            self._families.clear()
+
+
+renderer = MetricsRenderer()
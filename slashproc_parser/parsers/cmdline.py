@@ -12,6 +12,9 @@ class CmdLine(BasicSPParser):
 
     CMDLINE = "/proc/cmdline"
 
+    # fixed until the next boot
+    VOLATILITY = 'boot'
+
     def __init__(self):
         super(CmdLine, self).__init__(self)
 
@@ -868,19 +871,18 @@ class CmdLine(BasicSPParser):
         """
         retdict = dict()
 
-        with open(CmdLine.CMDLINE) as f:
-            line = f.readline().strip('\n')
-            retdict['raw'] = line
+        line = CmdLine.read_proc(CmdLine.CMDLINE).split('\n')[0]
+        retdict['raw'] = line
 
-            for arg in line.split():
+        for arg in line.split():
 
-                if re.match('[\w_.]+=', arg):
-                    pos = arg.find('=')
-                    k, v = arg[:pos], arg[pos+1:]
-                    retdict[CmdLine.key_format(k)] = v
+            if re.match('[\w_.]+=', arg):
+                pos = arg.find('=')
+                k, v = arg[:pos], arg[pos+1:]
+                retdict[CmdLine.key_format(k)] = v
 
-                else:
-                    retdict[CmdLine.key_format(arg)] = arg
+            else:
+                retdict[CmdLine.key_format(arg)] = arg
 
         return retdict
 
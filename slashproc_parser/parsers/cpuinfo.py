@@ -9,6 +9,9 @@ class CpuInfo(BasicSPParser):
     """
     CPUINFO = "/proc/cpuinfo"
 
+    # static apart from the MHz of each core
+    VOLATILITY = 'slow'
+
     def __init__(self):
         super(CpuInfo, self).__init__(self)
 
@@ -580,7 +583,7 @@ class CpuInfo(BasicSPParser):
             return txt.replace('\t', '').replace('\n', '').replace(' ', '_')
 
         data = dict()
-        for l in open(CpuInfo.CPUINFO):
+        for l in CpuInfo.read_proc(CpuInfo.CPUINFO).splitlines():
             line = l.split(':')
 
             #processor_num = 0
@@ -49,12 +49,12 @@ class LoadAvg(BasicSPParser):
         return thevars
 
 
-    def get_data(self):
+    @staticmethod
+    def get_data():
         """
-
+        Parse /proc/loadavg
         """
-        with open(LoadAvg.PROC, 'r') as f:
-            a = f.read().split()
+        a = LoadAvg.read_proc(LoadAvg.PROC).split()
 
         return {'loadavg': {'loadavg_1min': a[0],
                             'loadavg_5mins': a[1],
@@ -69,7 +69,7 @@ class MemInfo(BasicSPParser):
         
         memcache = dict()
         re_parser = re.compile(r'^(?P<key>\S*):\s*(?P<value>\d*)\s*kB')
-        for line in open(MemInfo.MEMINFO):
+        for line in MemInfo.read_proc(MemInfo.MEMINFO).splitlines():
             match = re_parser.match(line)
             if not match:
                 continue # skip lines that don't parse
@@ -1,4 +1,28 @@
 import os
+import time
+
+from slashproc_parser import stats
+
+
+def read_file(path):
+    """Helper for parsers.
+
+    Returns the contents of a file, timed as the read phase of the
+    current request.
+    """
+
+    # called for thousands of files, so timed inline rather than with
+    # stats.phase, and not at all outside a request
+    timer = stats.current()
+    if timer is None:
+        with open(path) as f:
+            return f.read()
+    start = time.time()
+    try:
+        with open(path) as f:
+            return f.read()
+    finally:
+        timer.add('read', time.time() - start)
 
 
 def traverse_directory(path, verbose=False):
@@ -14,7 +38,7 @@ def traverse_directory(path, verbose=False):
     common = os.path.split(path)[0] + '/'
 
     for thedir, subdirs, files in os.walk(path):
-        relative_to_root = thedir.replace(common, '')
+        relative_to_root = thedir[len(common):]
         parts = relative_to_root.split('/')
 
         d = tree
@@ -37,10 +61,43 @@ def traverse_directory(path, verbose=False):
             parents[entry] = deepest_dir
             varpath = os.path.join(thedir, entry)
             try:
-                with open(varpath) as f:
-                    d[deepest_dir][entry] = f.read().replace('\n', '')
+                d[deepest_dir][entry] = read_file(varpath).replace('\n', '')
             except IOError:
                 if verbose:
                     print 'Permission denied: ' + varpath
 
-    return tree, parents, thevars
\ No newline at end of file
+    return tree, parents, thevars
+
+
+def flatten_tree(tree, prefix=''):
+    """Helper for consumers of parser data.
+
+    Flattens nested data dictionaries into a single level dictionary
+    keyed by the '/' joined path of every variable.
+    """
+
+    flat = dict()
+    for key, value in tree.iteritems():
+        path = prefix + '/' + key if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten_tree(value, path))
+        else:
+            flat[path] = value
+    return flat
+
+
+def unflatten_tree(flat):
+    """Helper for consumers of parser data.
+
+    Rebuilds the nested data dictionaries from a dictionary keyed by
+    '/' joined paths, the reverse of flatten_tree.
+    """
+
+    tree = dict()
+    for path, value in flat.iteritems():
+        parts = path.split('/')
+        d = tree
+        for key in parts[:-1]:
+            d = d.setdefault(key, dict())
+        d[parts[-1]] = value
+    return tree
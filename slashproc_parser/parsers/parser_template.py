@@ -10,6 +10,12 @@ class TheParser(BasicSPParser):
 
     THEDIR = "/proc/thedir"
 
+    # how often the data changes, one of boot, rare, slow or dynamic
+    VOLATILITY = 'dynamic'
+
+    # True if get_groups or get_vars change with the data
+    DYNAMIC_SCHEMA = False
+
     def __init__(self):
         super(TheParser, self).__init__(self)
 
@@ -66,6 +72,7 @@ class TheParser(BasicSPParser):
         REMOVE THIS DOCSTRING AND CREATE ONE APPROPIATE TO THE PARSER
 
         Ensure first group is the parser name
+        Ensure files are read through read_proc, eg. TheParser.read_proc(TheParser.THEDIR)
         Ensure return adheres to the groups structure
         Ensure all groups are present in the groups dict
         Ensure all vars adhere to the var format
@@ -6,12 +6,22 @@ import glob
 from itertools import chain
 from collections import defaultdict
 from slashproc_parser.basic_parser import BasicSPParser
+from parse_helpers import read_file
 
 
 class PidStatus(BasicSPParser):
 
     PID = "/proc/[0-9]*/status"
 
+    # a scan reads every process, share it between requests a bit longer
+    CACHE_TTL = 2
+
+    # a group per process
+    DYNAMIC_SCHEMA = True
+
+    # vars counting events since the process started
+    COUNTERS = ('voluntary_ctxt_switches', 'nonvoluntary_ctxt_switches')
+
     def __init__(self):
         super(PidStatus, self).__init__(self)
 
@@ -66,6 +76,8 @@ class PidStatus(BasicSPParser):
                     'unit': '',
                     'parents': list(parents[key])
                 }
+                if PidStatus.key_format(key) in PidStatus.COUNTERS:
+                    thevars[PidStatus.key_format(key)]['counter'] = True
 
         # TODO: fill missing description (and maybe variables too)
         descs = {
@@ -295,6 +307,11 @@ class PidStatus(BasicSPParser):
 
         return thevars
 
+    @classmethod
+    def get_counters(cls):
+        """Counters are known up front, no need to scan every process"""
+        return set(cls.COUNTERS)
+
     @staticmethod
     def get_data():
         """ Gets parsed /proc/[pid]/status data """
@@ -327,12 +344,12 @@ class PidStatus(BasicSPParser):
         processes_plain = {'pid': dict()}
         processes_relations = defaultdict(list)
 
-        for status in glob.iglob(PidStatus.PID):
-            pid = status.split(os.sep)[2]
+        for status in glob.iglob(PidStatus.proc_path(PidStatus.PID)):
+            pid = status.split(os.sep)[-2]
 
             entries = dict()
 
-            for line in open(status):
+            for line in read_file(status).splitlines():
                 parts = [p.strip().replace(':', '') for p in tabs.split(line) if p and p != 'kB']
                 k, v = parts[0], ' '.join(parts[1:])
                 entries[PidStatus.key_format(k)] = v
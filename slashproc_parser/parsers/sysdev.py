@@ -8,11 +8,13 @@ class SysDev(BasicSPParser):
 
     DEV = "/proc/sys/dev"
 
+    VOLATILITY = 'rare'
+
     @staticmethod
     def get_groups():
         """
         """
-        _, parents, all_variables = traverse_directory(SysDev.DEV)
+        _, parents, all_variables = traverse_directory(SysDev.proc_path(SysDev.DEV))
 
         # no need to take into account variables
         for var in all_variables:
@@ -34,7 +36,7 @@ class SysDev(BasicSPParser):
         """
         """
         thevars = dict()
-        _, parents, all_variables = traverse_directory(SysDev.DEV)
+        _, parents, all_variables = traverse_directory(SysDev.proc_path(SysDev.DEV))
 
         for var in all_variables:
             thevars[SysDev.key_format(var)] = {
@@ -220,7 +222,7 @@ class SysDev(BasicSPParser):
     def get_data(verbose=False):
         """
         """
-        tree, _, _ = traverse_directory(SysDev.DEV, verbose=verbose)
+        tree, _, _ = traverse_directory(SysDev.proc_path(SysDev.DEV), verbose=verbose)
         return tree
 
 
@@ -8,6 +8,8 @@ class SysKernel(BasicSPParser):
 
     KERNEL = "/proc/sys/kernel"
 
+    VOLATILITY = 'rare'
+
     @staticmethod
     def get_groups():
         """Enumerates groups depending on number of directories in /proc/sys/kernel.
@@ -15,7 +17,7 @@ class SysKernel(BasicSPParser):
         Returns:
             groups (dict): parsed variables groups
         """
-        _, parents, all_variables = traverse_directory(SysKernel.KERNEL)
+        _, parents, all_variables = traverse_directory(SysKernel.proc_path(SysKernel.KERNEL))
 
         # no need to take into account variables
         for var in all_variables:
@@ -40,7 +42,7 @@ class SysKernel(BasicSPParser):
             thevars (dict): parsed system variables with their descriptions
         """
         thevars = dict()
-        _, parents, all_variables = traverse_directory(SysKernel.KERNEL)
+        _, parents, all_variables = traverse_directory(SysKernel.proc_path(SysKernel.KERNEL))
 
         for var in all_variables:
             thevars[SysKernel.key_format(var)] = {
@@ -427,7 +429,7 @@ class SysKernel(BasicSPParser):
             tree (dict): nested dictionaries with system variables
         """
 
-        tree, _, _ = traverse_directory(SysKernel.KERNEL, verbose=verbose)
+        tree, _, _ = traverse_directory(SysKernel.proc_path(SysKernel.KERNEL), verbose=verbose)
         return tree
 
 
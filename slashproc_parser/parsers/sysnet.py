@@ -8,6 +8,8 @@ class SysNet(BasicSPParser):
 
     NET = "/proc/sys/net"
 
+    VOLATILITY = 'rare'
+
     @staticmethod
     def get_groups():
         """Enumerates groups depending on number of directories in /proc/sys/net.
@@ -15,7 +17,7 @@ class SysNet(BasicSPParser):
         Returns:
             groups (dict): parsed variables groups
         """
-        _, parents, all_variables = traverse_directory(SysNet.NET)
+        _, parents, all_variables = traverse_directory(SysNet.proc_path(SysNet.NET))
 
         # no need to take into account variables
         for var in all_variables:
@@ -41,7 +43,7 @@ class SysNet(BasicSPParser):
         """
 
         thevars = dict()
-        _, parents, all_variables = traverse_directory(SysNet.NET)
+        _, parents, all_variables = traverse_directory(SysNet.proc_path(SysNet.NET))
 
         for var in all_variables:
             thevars[SysNet.key_format(var)] = {
@@ -800,7 +802,7 @@ class SysNet(BasicSPParser):
             tree (dict): nested dictionaries with system variables
         """
 
-        tree, _, _ = traverse_directory(SysNet.NET, verbose=verbose)
+        tree, _, _ = traverse_directory(SysNet.proc_path(SysNet.NET), verbose=verbose)
         return tree
 
 
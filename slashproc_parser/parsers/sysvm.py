@@ -8,6 +8,8 @@ class SysVm(BasicSPParser):
 
     VM = "/proc/sys/vm"
 
+    VOLATILITY = 'rare'
+
     @staticmethod
     def get_groups():
         """Enumerates groups depending on number of directories in /proc/sys/vm.
@@ -15,7 +17,7 @@ class SysVm(BasicSPParser):
         Returns:
             groups (dict): parsed variables groups
         """
-        _, parents, all_variables = traverse_directory(SysVm.VM)
+        _, parents, all_variables = traverse_directory(SysVm.proc_path(SysVm.VM))
 
         # no need to take into account variables
         for var in all_variables:
@@ -40,7 +42,7 @@ class SysVm(BasicSPParser):
 
         """
         thevars = dict()
-        _, parents, all_variables = traverse_directory(SysVm.VM)
+        _, parents, all_variables = traverse_directory(SysVm.proc_path(SysVm.VM))
 
         for var in all_variables:
             thevars[SysVm.key_format(var)] = {
@@ -300,7 +302,7 @@ class SysVm(BasicSPParser):
         Returns:
             tree (dict): nested dictionaries with system variables
         """
-        tree, _, _ = traverse_directory(SysVm.VM, verbose=verbose)
+        tree, _, _ = traverse_directory(SysVm.proc_path(SysVm.VM), verbose=verbose)
         return tree
 
 
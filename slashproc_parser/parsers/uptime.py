@@ -49,7 +49,7 @@ class UpTime(BasicSPParser):
 
             Returns: stats (dict): dictionary with variables and their values
         """
-        for l in open(UpTime.UPTIME):
+        for l in UpTime.read_proc(UpTime.UPTIME).splitlines():
             line = l.split()
 
             uptime_data = {"total": line[0],
@@ -12,6 +12,9 @@ class Version(BasicSPParser):
 
     VERSION = "/proc/version"
 
+    # fixed until the next boot
+    VOLATILITY = 'boot'
+
     def __init__(self):
         super(Version, self).__init__(self)
 
@@ -87,24 +90,23 @@ class Version(BasicSPParser):
             ('gcc_version', '\(gcc version [.\d]+\s+.*\)'),
         ]
 
-        with open(Version.VERSION) as l:
-            line = l.readline().strip('\n')
+        line = Version.read_proc(Version.VERSION).split('\n')[0]
 
-            ker_ver, os_ver = line.split('#')
+        ker_ver, os_ver = line.split('#')
 
-            for var, pattern in kernel_regex:
-                m = re.search(pattern, ker_ver)
-                if m:
-                    retdict[var] = ker_ver[m.start(): m.end()]
+        for var, pattern in kernel_regex:
+            m = re.search(pattern, ker_ver)
+            if m:
+                retdict[var] = ker_ver[m.start(): m.end()]
 
-            m = re.search('(Mon|Tue|Wed|Thu|Fri|Sat|Sun)', os_ver)
+        m = re.search('(Mon|Tue|Wed|Thu|Fri|Sat|Sun)', os_ver)
 
-            ker_date = os_ver[m.start():]
-            os_ver, ker_type = os_ver.replace(ker_date, '').strip().split()
+        ker_date = os_ver[m.start():]
+        os_ver, ker_type = os_ver.replace(ker_date, '').strip().split()
 
-            retdict['kernel_date'] = ker_date
-            retdict['os_version'] = os_ver
-            retdict['kernel_type'] = ker_type
+        retdict['kernel_date'] = ker_date
+        retdict['os_version'] = os_ver
+        retdict['kernel_type'] = ker_type
 
         # leave only innermost braces
         return {k: v.strip('()').strip(' ')
@@ -13,6 +13,9 @@ class VmStat(BasicSPParser):
 
     VMSTAT = "/proc/vmstat"
 
+    # vars counting events since boot
+    COUNTER_PREFIXES = ('pg', 'pswp', 'slabs_scanned')
+
     def __init__(self):
         super(VmStat, self).__init__(self)
 
@@ -47,6 +50,8 @@ class VmStat(BasicSPParser):
                 'unit': '',
                 'parents': ['vmstat']
             }
+            if i.startswith(VmStat.COUNTER_PREFIXES):
+                thevars[VmStat.key_format(i)]['counter'] = True
 
         descs = {
             ('nr_dirty', 'Number of dirty pages', ''),
@@ -108,7 +113,7 @@ class VmStat(BasicSPParser):
             stats (dict): dictionary with variables and their values
         """
         stats = dict()
-        for l in open(VmStat.VMSTAT):
+        for l in VmStat.read_proc(VmStat.VMSTAT).splitlines():
             line = l.split()
             if len(line) == 2:
                 k = line[0].strip().replace('\t', '').replace('\n', '').lower()
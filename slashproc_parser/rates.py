@@ -0,0 +1,100 @@
+"""
+Per-second rates of monotonic counters
+
+Parsers mark their counters with 'counter': True in get_vars. The engine
+keeps the previous value of every counter and turns each new sample into
+per-second deltas, so clients do not have to keep state themselves.
+
+Counters going backwards are handled as follows:
+
+* /proc/uptime went backwards, the host rebooted and every counter
+  restarted from 0, the rate is the value over the uptime
+* the previous value was close to 2**32 or 2**64, the counter wrapped
+* otherwise the counter was reset and counts again from 0
+"""
+import threading
+
+from slashproc_parser.store import to_number
+from slashproc_parser.parsers.uptime import UpTime
+from slashproc_parser.parsers.parse_helpers import flatten_tree, unflatten_tree
+
+#a counter this close to its maximum wrapped rather than reset
+WRAP_MARGIN = 0.25
+
+
+def read_uptime():
+    return float(UpTime.get_data()['uptime']['total'])
+
+
+def counter_delta(previous, value):
+    """
+    Returns the increase of a counter, allowing for wraparound and resets
+    """
+    delta = value - previous
+    if delta >= 0:
+        return delta
+    for bits in (32, 64):
+        if previous >= (1 - WRAP_MARGIN) * 2 ** bits and previous < 2 ** bits:
+            return delta + 2 ** bits
+    return value
+
+
+class RateEngine(object):
+    """
+    Turns counter samples into per-second rates
+    """
+
+    def __init__(self):
+        self._previous = dict()
+        self._rates = dict()
+        self._lock = threading.Lock()
+
+    def update(self, parser, timestamp, data, counters, uptime=None):
+        """
+        Records a sample of parser and computes the rates since the last one
+
+        :param counters: names of the vars that are counters
+        :param uptime: seconds since boot at timestamp, read if not given
+        """
+        if uptime is None:
+            uptime = read_uptime()
+
+        values = dict()
+        for path, value in flatten_tree(data).iteritems():
+            if path.rsplit('/', 1)[-1] in counters:
+                value = to_number(value)
+                if value is not None:
+                    values[path] = value
+
+        with self._lock:
+            previous = self._previous.get(parser)
+            self._previous[parser] = (timestamp, uptime, values)
+            if previous is None:
+                return
+
+            prev_timestamp, prev_uptime, prev_values = previous
+            elapsed = timestamp - prev_timestamp
+            if elapsed <= 0:
+                return
+
+            rates = dict()
+            if uptime < prev_uptime:
+                # rebooted in between, counters started again from 0
+                for path, value in values.iteritems():
+                    rates[path] = value / uptime if uptime > 0 else 0.0
+            else:
+                for path, value in values.iteritems():
+                    if path in prev_values:
+                        rates[path] = counter_delta(prev_values[path],
+                                                    value) / elapsed
+
+            self._rates[parser] = (timestamp, unflatten_tree(rates))
+
+    def latest(self, parser):
+        """
+        Returns (timestamp, rates) with the same layout as the parser's data
+
+        The timestamp is None until two samples have been seen
+        """
+        with self._lock:
+            return self._rates.get(parser, (None, dict()))
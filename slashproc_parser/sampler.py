@@ -0,0 +1,124 @@
+"""
+Background sampling of parsers
+
+The sampler reads each registered parser on its own interval in a
+daemon thread, so the cost of reading /proc stays constant no matter how
+many clients poll the server. Requests are then served from the latest
+sample.
+
+Parsers given as separate are sampled on a thread of their own each, so
+a slow read, eg. of every process on a busy host, does not hold up the
+samples of the others. The rest share one thread.
+
+Intervals are in seconds, an interval of 0 or None samples the parser
+once at start up.
+
+Listeners registered with add_listener are called with
+(parser, timestamp, data) after every sample, on the thread that took it.
+"""
+import time
+import heapq
+import logging
+import threading
+
+
+class Sampler(object):
+    """
+    Samples parsers on per-parser intervals
+    """
+
+    def __init__(self, classes, intervals, separate=()):
+        """
+        :param classes: dict of parser name to parser class
+        :param intervals: dict of parser name to interval in seconds
+        :param separate: names of the parsers sampled on their own thread
+        """
+        self.classes = classes
+        self.intervals = dict((k, v) for k, v in intervals.iteritems()
+                              if k in classes)
+        self.separate = [name for name in separate if name in self.intervals]
+        self.listeners = list()
+        self._latest = dict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = list()
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def is_sampled(self, parser):
+        return parser in self.intervals
+
+    def latest(self, parser):
+        """
+        Returns (timestamp, data) of the latest sample or None
+        """
+        with self._lock:
+            return self._latest.get(parser)
+
+    def sample(self, parser):
+        """
+        Reads parser now, stores the result and notifies the listeners
+        """
+        data = self.classes[parser].get_data()
+        timestamp = time.time()
+
+        with self._lock:
+            self._latest[parser] = (timestamp, data)
+
+        for listener in self.listeners:
+            try:
+                listener(parser, timestamp, data)
+            except Exception:
+                logging.exception("Sample listener failed for %s", parser)
+
+        return timestamp, data
+
+    def run(self, names=None):
+        """
+        Samples names, default all parsers, until stopped
+        """
+        if names is None:
+            names = self.intervals
+        now = time.time()
+        schedule = [(now, name) for name in names]
+        heapq.heapify(schedule)
+
+        while schedule and not self._stop.is_set():
+            due, name = schedule[0]
+            wait = due - time.time()
+            if wait > 0:
+                self._stop.wait(wait)
+                continue
+
+            heapq.heappop(schedule)
+            try:
+                self.sample(name)
+            except Exception:
+                logging.exception("Sampling %s failed", name)
+
+            interval = self.intervals[name]
+            if interval:
+                # keep to the original cadence unless we have fallen behind
+                heapq.heappush(schedule, (max(due + interval, time.time()), name))
+
+    def start(self):
+        self._stop.clear()
+        shared = [name for name in self.intervals
+                  if name not in self.separate]
+        groups = [('sampler', shared)] + [('sampler-' + name, [name])
+                                          for name in self.separate]
+        for thread_name, names in groups:
+            if not names:
+                continue
+            thread = threading.Thread(target=self.run, args=(names,),
+                                      name=thread_name)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = list()
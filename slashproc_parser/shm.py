@@ -0,0 +1,206 @@
+"""
+Shared memory snapshot of sampled values
+
+The server publishes the latest numeric values of selected parsers to a
+memory-mapped file, so processes on the same host can read them without
+HTTP, JSON or any syscall once the file is mapped.
+
+The layout is fixed when the publisher starts, from a first read of every
+parser, all integers little-endian:
+
+    header, 64 bytes
+        0   8s  magic 'SPSHM001'
+        8   I   number of slots
+        12  I   offset of the values
+        16  Q   sequence, odd while the writer is updating
+        24  d   time of the last update
+    index, 64 bytes per slot
+        0   c   type, 'q' for integers, 'd' for floats
+        1   63s var path, eg. 'meminfo/memfree', NUL padded
+    values, 8 bytes per slot, in the order of the index
+
+Values a parser stops reporting, or that do not fit their slot, read as
+NaN, or 0 for integers. Vars that appear later are not published until the
+server restarts.
+
+Updates are guarded by a seqlock: the writer makes the sequence odd,
+writes, then makes it even again, and a reader retries when the sequence
+was odd or changed while it copied the values. On restart the file is
+replaced, ShmReader.stale tells a reader to open it again.
+"""
+import os
+import mmap
+import struct
+
+from slashproc_parser.store import to_number
+from slashproc_parser.parsers.parse_helpers import flatten_tree
+
+MAGIC = 'SPSHM001'
+HEADER = struct.Struct('<8sIIQd')
+HEADER_SIZE = 64
+SEQUENCE = struct.Struct('<Q')
+SEQUENCE_OFFSET = 16
+UPDATED = struct.Struct('<Qd')
+SLOT = struct.Struct('<c63s')
+VALUE_SIZE = 8
+NAME_SIZE = 63
+
+NAN = float('nan')
+
+
+def var_name(parser, path):
+    if path == parser or path.startswith(parser + '/'):
+        return path
+    return parser + '/' + path
+
+
+def numeric_vars(parser, data):
+    """
+    Returns {var path: value} of the numeric values of a sample
+    """
+    ret = dict()
+    if not isinstance(data, dict):
+        return ret
+    for path, value in flatten_tree(data).iteritems():
+        if isinstance(value, bool):
+            continue
+        if not isinstance(value, (int, long)):
+            value = to_number(value)
+            if value is None:
+                continue
+        ret[var_name(parser, path)] = value
+    return ret
+
+
+class ShmPublisher(object):
+    """
+    Writes the samples of some parsers to a shared memory file
+    """
+
+    def __init__(self, path, classes):
+        """
+        :param path: file to publish to, eg. on /dev/shm
+        :param classes: dict of parser name to class, each is read once
+            to lay out its slots
+        """
+        self.path = path
+        self.parsers = set(classes)
+        slots = list()
+        for parser in sorted(classes):
+            for name, value in sorted(numeric_vars(
+                    parser, classes[parser].get_data()).iteritems()):
+                if len(name) <= NAME_SIZE:
+                    slots.append((name, 'q' if isinstance(value, (int, long))
+                                  else 'd'))
+
+        self.slots = dict((name, (i, kind))
+                          for i, (name, kind) in enumerate(slots))
+        self.values_offset = HEADER_SIZE + SLOT.size * len(slots)
+        self._create(slots)
+        self._sequence = 0
+        with open(path, 'r+b') as f:
+            self._mm = mmap.mmap(f.fileno(), 0)
+
+    def _create(self, slots):
+        size = self.values_offset + VALUE_SIZE * len(slots)
+        buf = bytearray(size)
+        HEADER.pack_into(buf, 0, MAGIC, len(slots), self.values_offset, 0,
+                         0.0)
+        for i, (name, kind) in enumerate(slots):
+            SLOT.pack_into(buf, HEADER_SIZE + i * SLOT.size, kind, name)
+            struct.pack_into('<' + kind, buf,
+                             self.values_offset + i * VALUE_SIZE,
+                             0 if kind == 'q' else NAN)
+        # replaced in one rename so a reader never maps half a layout
+        with open(self.path + '.tmp', 'wb') as f:
+            f.write(buf)
+        os.rename(self.path + '.tmp', self.path)
+
+    def _write(self, mm, i, kind, value):
+        # values missing or out of range of their slot are cleared
+        offset = self.values_offset + i * VALUE_SIZE
+        empty = 0 if kind == 'q' else NAN
+        try:
+            if value is not None and kind == 'q':
+                value = int(value)
+            struct.pack_into('<' + kind, mm, offset,
+                             empty if value is None else value)
+        except (ValueError, OverflowError, struct.error):
+            struct.pack_into('<' + kind, mm, offset, empty)
+
+    def add_sample(self, parser, timestamp, data):
+        """
+        Publishes the values of data, signature of a Sampler listener
+        """
+        if parser not in self.parsers:
+            return
+        values = numeric_vars(parser, data)
+        prefix = parser + '/'
+
+        mm = self._mm
+        self._sequence += 1
+        UPDATED.pack_into(mm, SEQUENCE_OFFSET, self._sequence, timestamp)
+        try:
+            for name, (i, kind) in self.slots.iteritems():
+                if name.startswith(prefix):
+                    self._write(mm, i, kind, values.get(name))
+        finally:
+            # even again whatever happened, or every snapshot would fail
+            self._sequence += 1
+            SEQUENCE.pack_into(mm, SEQUENCE_OFFSET, self._sequence)
+
+    def close(self):
+        self._mm.close()
+
+
+class ShmReader(object):
+    """
+    Reads consistent snapshots from a file written by ShmPublisher
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._inode = os.fstat(f.fileno()).st_ino
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, count, self.values_offset, _, _ = HEADER.unpack_from(self._mm)
+        if magic != MAGIC:
+            raise ValueError('%s is not a snapshot file' % path)
+        kinds = list()
+        self.names = list()
+        for i in range(count):
+            kind, name = SLOT.unpack_from(self._mm, HEADER_SIZE + i * SLOT.size)
+            kinds.append(kind)
+            self.names.append(name.rstrip('\0'))
+        self._values = struct.Struct('<' + ''.join(kinds))
+
+    def snapshot(self, retries=1000):
+        """
+        Returns (timestamp, {var path: value}) of the latest update
+        """
+        mm = self._mm
+        for _ in xrange(retries):
+            before = SEQUENCE.unpack_from(mm, SEQUENCE_OFFSET)[0]
+            if before & 1:
+                continue
+            values = self._values.unpack_from(mm, self.values_offset)
+            after, timestamp = UPDATED.unpack_from(mm, SEQUENCE_OFFSET)
+            if before == after:
+                return timestamp, dict(zip(self.names, values))
+        raise RuntimeError('snapshot kept changing while being read')
+
+    def get(self, name):
+        return self.snapshot()[1][name]
+
+    def stale(self):
+        """
+        True once the publisher has replaced the file, costs a stat
+        """
+        try:
+            return os.stat(self.path).st_ino != self._inode
+        except OSError:
+            return True
+
+    def close(self):
+        self._mm.close()
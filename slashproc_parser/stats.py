@@ -0,0 +1,189 @@
+"""
+Request timing statistics
+
+Every request handled by the server gets a RequestTimer, kept per thread,
+which the code on the request path feeds with the time spent in each
+phase:
+
+* read, file I/O on the proc tree, see parse_helpers.read_file
+* parse, the parser turning the files into data, excluding read
+* filter, picking the requested groups and vars out of the data
+* serialize, encoding the response
+
+When the request ends the phases and the total are added to histograms
+per (parser, method), and requests slower than SLOW_REQUEST seconds are
+logged with their breakdown. Requests that are served without a parser,
+get_parsers for instance, are only logged.
+
+Phases outside a request, such as the sampler thread reading parsers in
+the background, are not recorded. Requests handled in the children of the
+forking server are lost with the child.
+"""
+import math
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+PHASES = ('read', 'parse', 'filter', 'serialize')
+
+#requests taking longer than this many seconds are logged, None disables
+SLOW_REQUEST = None
+
+#bucket i counts durations below 2**i microseconds
+BUCKETS = 32
+
+_local = threading.local()
+
+
+class Histogram(object):
+    """
+    Log2 bucketed durations
+    """
+
+    def __init__(self):
+        self.buckets = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        i = math.frexp(seconds * 1e6)[1] if seconds > 0 else 0
+        self.buckets[max(0, min(i, BUCKETS - 1))] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, pct):
+        """
+        Upper bound in seconds of the bucket holding the percentile
+        """
+        if not self.count:
+            return None
+        rank = pct / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return min(2 ** i / 1e6, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {'count': self.count,
+                'mean': self.total / self.count if self.count else None,
+                'max': self.max,
+                'p50': self.percentile(50),
+                'p90': self.percentile(90),
+                'p99': self.percentile(99),
+                'buckets': dict((str(2 ** i / 1e6), n)
+                                for i, n in enumerate(self.buckets) if n)}
+
+
+class RequestTimer(object):
+
+    def __init__(self, method):
+        self.method = method
+        self.parser = None
+        self.phases = dict()
+        self.start = time.time()
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+
+class Stats(object):
+    """
+    Histograms of the finished requests
+    """
+
+    def __init__(self):
+        self.histograms = dict()
+        self._lock = threading.Lock()
+
+    def record(self, timer, total):
+        phases = dict(timer.phases, total=total)
+        with self._lock:
+            for phase, seconds in phases.iteritems():
+                key = (timer.parser, timer.method, phase)
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = Histogram()
+                histogram.add(seconds)
+
+    def snapshot(self, parser=None):
+        """
+        Returns {parser: {method: {phase: histogram dict}}}
+        """
+        ret = dict()
+        with self._lock:
+            for (name, method, phase), h in self.histograms.iteritems():
+                if parser is None or name == parser:
+                    ret.setdefault(name, dict()).setdefault(
+                        method, dict())[phase] = h.to_dict()
+        return ret
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+
+
+stats = Stats()
+
+
+def begin(method):
+    """
+    Starts timing a request on this thread
+    """
+    _local.timer = RequestTimer(method)
+    return _local.timer
+
+
+def current():
+    return getattr(_local, 'timer', None)
+
+
+def set_parser(parser):
+    timer = current()
+    if timer is not None:
+        timer.parser = parser
+
+
+@contextmanager
+def phase(name):
+    """
+    Adds the time spent in the block to a phase of the current request
+    """
+    timer = current()
+    if timer is None:
+        yield
+        return
+    start = time.time()
+    try:
+        yield
+    finally:
+        timer.add(name, time.time() - start)
+
+
+def end():
+    """
+    Finishes the request on this thread, records and logs it
+    """
+    timer = current()
+    if timer is None:
+        return None
+    _local.timer = None
+    total = time.time() - timer.start
+
+    # reads happen inside the parser, parse only keeps its own time
+    if 'parse' in timer.phases and 'read' in timer.phases:
+        timer.phases['parse'] = max(0.0, timer.phases['parse'] -
+                                    timer.phases['read'])
+
+    if timer.parser is not None:
+        stats.record(timer, total)
+    if SLOW_REQUEST is not None and total >= SLOW_REQUEST:
+        logging.warning("Slow request %s %s %.3fs %s", timer.method,
+                        timer.parser or '', total,
+                        ' '.join('%s=%.3fs' % (p, timer.phases[p])
+                                 for p in PHASES if p in timer.phases))
+    return timer
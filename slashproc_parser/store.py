@@ -0,0 +1,214 @@
+"""
+In-memory time series of sampled values
+
+Every numeric var of the stored parsers is kept in a fixed size ring
+buffer, keyed by (parser, var path). Timestamps and values live in two
+parallel arrays of doubles, so memory use is bounded up front:
+
+    16 bytes * size * max_series
+
+With compress set the series are gorilla.CompressedSeries instead, which
+hold the same number of samples of slowly changing gauges and counters in
+around a tenth of the memory.
+
+The store is meant to be registered as a Sampler listener.
+"""
+import math
+import bisect
+import threading
+from array import array
+
+from slashproc_parser.gorilla import CompressedSeries
+from slashproc_parser.parsers.parse_helpers import flatten_tree
+
+#5 minutes of 1 second samples
+DEFAULT_SIZE = 300
+DEFAULT_MAX_SERIES = 4096
+
+#aggregates work on whole array slices so the loops stay in C
+AGGREGATES = {
+    'avg': lambda values: sum(values) / len(values),
+    'min': min,
+    'max': max,
+    'sum': sum,
+    'last': lambda values: values[-1],
+}
+
+
+def to_number(value):
+    """
+    Returns value as a float, or None if it is not numeric
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, long, float)):
+        return float(value)
+    if isinstance(value, basestring):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+def downsample(timestamps, values, step, agg='avg'):
+    """
+    Aggregates values into buckets of step seconds
+
+    Buckets start on multiples of step so series downsampled with the same
+    step line up with each other. Empty buckets are left out.
+
+    :param timestamps: sorted array of timestamps
+    :param values: array of values, aligned with timestamps
+    :param step: bucket width in seconds
+    :param agg: one of AGGREGATES
+    :rtype tuple: (bucket timestamps, aggregated values) lists
+    """
+    func = AGGREGATES[agg]
+    out_timestamps = list()
+    out_values = list()
+
+    i = 0
+    while i < len(timestamps):
+        bucket = math.floor(timestamps[i] / step) * step
+        j = bisect.bisect_left(timestamps, bucket + step, i)
+        out_timestamps.append(bucket)
+        out_values.append(func(values[i:j]))
+        i = j
+
+    return out_timestamps, out_values
+
+
+class RingBuffer(object):
+    """
+    Fixed size series of (timestamp, value) pairs
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.timestamps = array('d', [0.0]) * size
+        self.values = array('d', [0.0]) * size
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def append(self, timestamp, value):
+        i = self.count % self.size
+        self.timestamps[i] = timestamp
+        self.values[i] = value
+        self.count += 1
+
+    def ordered(self):
+        """
+        Returns (timestamps, values) arrays oldest first
+        """
+        if self.count <= self.size:
+            return self.timestamps[:self.count], self.values[:self.count]
+        start = self.count % self.size
+        return (self.timestamps[start:] + self.timestamps[:start],
+                self.values[start:] + self.values[:start])
+
+    def range(self, since=None, until=None):
+        """
+        Returns (timestamps, values) arrays with since <= timestamp <= until
+        """
+        timestamps, values = self.ordered()
+        lo = 0 if since is None else bisect.bisect_left(timestamps, since)
+        hi = len(timestamps) if until is None else \
+            bisect.bisect_right(timestamps, until)
+        return timestamps[lo:hi], values[lo:hi]
+
+    @property
+    def oldest(self):
+        if not self.count:
+            return None
+        i = self.count % self.size if self.count > self.size else 0
+        return self.timestamps[i]
+
+    def nbytes(self):
+        return (self.timestamps.itemsize * len(self.timestamps) +
+                self.values.itemsize * len(self.values))
+
+
+class SampleStore(object):
+    """
+    Ring buffers for the numeric vars of sampled parsers
+    """
+
+    def __init__(self, size=DEFAULT_SIZE, max_series=DEFAULT_MAX_SERIES,
+                 parsers=None, compress=False):
+        """
+        :param size: samples kept per series
+        :param max_series: series beyond this are dropped
+        :param parsers: names of the parsers to store, None for all
+        :param compress: keep the samples in compressed blocks
+        """
+        self.size = size
+        self.max_series = max_series
+        self.parsers = set(parsers) if parsers is not None else None
+        self.compress = compress
+        self._series = dict()
+        self._lock = threading.Lock()
+
+    def new_series(self):
+        if self.compress:
+            return CompressedSeries(self.size)
+        return RingBuffer(self.size)
+
+    def add_sample(self, parser, timestamp, data):
+        """
+        Appends the numeric values of data, signature of a Sampler listener
+        """
+        if self.parsers is not None and parser not in self.parsers:
+            return
+
+        flat = flatten_tree(data)
+        with self._lock:
+            for path, value in flat.iteritems():
+                value = to_number(value)
+                if value is None:
+                    continue
+                key = (parser, path)
+                series = self._series.get(key)
+                if series is None:
+                    if len(self._series) >= self.max_series:
+                        continue
+                    series = self._series[key] = self.new_series()
+                series.append(timestamp, value)
+
+    def paths(self, parser):
+        with self._lock:
+            return sorted(p for n, p in self._series if n == parser)
+
+    def find(self, parser, get):
+        """
+        Returns the stored paths of parser ending with the get path
+
+        :param get: list of path components, empty for every path
+        """
+        suffix = '/'.join(get)
+        return [p for p in self.paths(parser)
+                if not suffix or p == suffix or p.endswith('/' + suffix)]
+
+    def range(self, parser, path, since=None, until=None):
+        """
+        Returns (timestamps, values) arrays for one series
+        """
+        with self._lock:
+            series = self._series.get((parser, path))
+            if series is None:
+                return array('d'), array('d')
+            return series.range(since, until)
+
+    def oldest(self, parser, path):
+        """
+        Returns the timestamp of the oldest sample held for a series
+        """
+        with self._lock:
+            series = self._series.get((parser, path))
+            return series.oldest if series is not None else None
+
+    def nbytes(self):
+        with self._lock:
+            return sum(s.nbytes() for s in self._series.itervalues())
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+import json
+import shutil
+import tempfile
+import time
+import threading
+import unittest
+
+from slashproc_parser import basic_server
+from slashproc_parser import fixtures
+from slashproc_parser.cache import ParserCache
+from slashproc_parser.basic_parser import BasicSPParser, VOLATILITY_TTLS
+from slashproc_parser.jsonrpclib import RawJSON, dumps
+
+
+class TestParserCache(unittest.TestCase):
+
+    def setUp(self):
+        self.reads = 0
+
+    def read(self):
+        self.reads += 1
+        return {'reads': self.reads}
+
+    def test_ttl(self):
+        cache = ParserCache({'pidstatus': 60, 'loadavg': 0})
+        for _ in range(3):
+            cache.get('pidstatus', self.read)
+        self.assertEqual(self.reads, 1)
+
+        for _ in range(3):
+            cache.get('loadavg', self.read)
+        self.assertEqual(self.reads, 4)
+
+        counters = cache.counters()
+        self.assertEqual(counters['pidstatus'],
+                         {'hits': 2, 'misses': 1, 'coalesced': 0, 'ttl': 60})
+        self.assertEqual(counters['loadavg']['misses'], 3)
+
+    def test_invalidate(self):
+        cache = ParserCache(default_ttl=60)
+        cache.get('version', self.read)
+        cache.invalidate('version')
+        timestamp, data = cache.get('version', self.read)
+        self.assertEqual(data, {'reads': 2})
+
+    def test_coalesce(self):
+        cache = ParserCache(default_ttl=0)
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_read():
+            started.set()
+            release.wait()
+            return self.read()
+
+        results = list()
+        def request():
+            results.append(cache.get('pidstatus', slow_read))
+
+        leader = threading.Thread(target=request)
+        leader.start()
+        started.wait()
+        waiters = [threading.Thread(target=request) for _ in range(5)]
+        for t in waiters:
+            t.start()
+        while cache.counters()['pidstatus']['coalesced'] < 5:
+            time.sleep(0.001)
+        release.set()
+        for t in [leader] + waiters:
+            t.join()
+
+        self.assertEqual(self.reads, 1)
+        self.assertEqual(len(set(id(r) for r in results)), 1)
+
+    def test_key(self):
+        cache = ParserCache(default_ttl=0)
+        cache.get('version', self.read, key='boot1')
+        cache.get('version', self.read, key='boot1')
+        self.assertEqual(self.reads, 1)
+        timestamp, data = cache.get('version', self.read, key='boot2')
+        self.assertEqual(data, {'reads': 2})
+
+    def test_error(self):
+        cache = ParserCache()
+
+        def fail():
+            raise IOError('gone')
+
+        self.assertRaises(IOError, cache.get, 'pidstatus', fail)
+        cache.get('pidstatus', self.read)
+        self.assertEqual(self.reads, 1)
+
+
+class TestVolatility(unittest.TestCase):
+
+    def test_declared(self):
+        names, classes = basic_server.import_parsers()
+        for name, cls in classes.iteritems():
+            self.assertIn(cls.VOLATILITY, VOLATILITY_TTLS, name)
+        self.assertEqual(classes['version'].VOLATILITY, 'boot')
+        self.assertEqual(classes['meminfo'].get_ttl(), VOLATILITY_TTLS['dynamic'])
+        self.assertEqual(classes['pidstatus'].get_ttl(), 2)
+
+    def test_cache_ttl(self):
+        cache = ParserCache(default_ttl=0)
+        cache.get('cmdline', dict, ttl=3600)
+        cache.get('cmdline', dict)
+        self.assertEqual(cache.counters()['cmdline']['hits'], 1)
+        self.assertEqual(cache.counters()['cmdline']['ttl'], 3600)
+
+    def test_get_parsers(self):
+        self.assertIn('cpuinfo', basic_server.get_parsers())
+        detail = basic_server.get_parsers(detail=True)
+        self.assertEqual(detail['cpuinfo']['volatility'], 'slow')
+        self.assertEqual(detail['sysnet']['ttl'], VOLATILITY_TTLS['rare'])
+
+    def test_sampled_once(self):
+        # only 'boot' parsers are sampled just once, others every TTL
+        self.assertNotIn('cpuinfo', basic_server.SAMPLE_INTERVALS)
+        basic_server.start_sampler({'cpuinfo': 0, 'version': 0})
+        try:
+            self.assertEqual(basic_server.sampler.intervals,
+                             {'cpuinfo': VOLATILITY_TTLS['slow'],
+                              'version': 0})
+        finally:
+            basic_server.stop_sampler()
+
+
+class TestBootCache(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        fixtures.generate(self.root, processes=5)
+        BasicSPParser.set_proc_root(self.root)
+        basic_server.parser_cache.invalidate()
+
+    def tearDown(self):
+        BasicSPParser.set_proc_root('/proc')
+        basic_server.parser_cache.invalidate()
+        shutil.rmtree(self.root)
+
+    def test_boot_id(self):
+        with open(self.root + '/sys/kernel/random/boot_id') as f:
+            self.assertEqual(BasicSPParser.get_boot_id(), f.read().strip())
+
+    def test_rendered(self):
+        first = basic_server.get_data(parser='version')
+        second = basic_server.get_data(parser='version')
+        self.assertTrue(isinstance(first, RawJSON))
+        self.assertTrue(first is second)
+        self.assertIn('kernel_version', first['found'])
+
+        response = json.loads(dumps(first, methodresponse=True, rpcid=3))
+        self.assertEqual(response['id'], 3)
+        self.assertEqual(response['result']['found'], first['found'])
+
+    def test_filtered(self):
+        ret = basic_server.get_data(parser='version', get='kernel_type')
+        self.assertFalse(isinstance(ret, RawJSON))
+        self.assertIn('/kernel_type', ret['found'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+import unittest
+
+from slashproc_parser import changes
+from slashproc_parser.changes import ChangeTracker
+
+
+class TestChangeTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.tracker = ChangeTracker()
+        self.data = {'net': {'core': {'somaxconn': '128'},
+                             'ipv4': {'ip_forward': '0',
+                                      'tcp_syncookies': '1'}}}
+
+    def test_first_call_is_full(self):
+        ret = self.tracker.changes('sysnet', self.data)
+        self.assertTrue(ret['full'])
+        self.assertEqual(len(ret['changed']), 3)
+        self.assertEqual(ret['changed']['net/ipv4/ip_forward'], '0')
+
+    def test_unchanged_returns_nothing(self):
+        token = self.tracker.changes('sysnet', self.data)['token']
+        ret = self.tracker.changes('sysnet', self.data, token)
+        self.assertEqual(ret['changed'], {})
+        self.assertEqual(ret['token'], token)
+        self.assertFalse('full' in ret)
+
+    def test_changed_and_removed(self):
+        token = self.tracker.changes('sysnet', self.data)['token']
+        self.data['net']['ipv4']['ip_forward'] = '1'
+        del self.data['net']['core']
+
+        ret = self.tracker.changes('sysnet', self.data, token)
+        self.assertEqual(ret['changed'], {'net/ipv4/ip_forward': '1'})
+        self.assertEqual(ret['removed'], ['net/core/somaxconn'])
+        self.assertNotEqual(ret['token'], token)
+
+    def test_unknown_token_resyncs(self):
+        self.tracker.changes('sysnet', self.data)
+        for token in ('deadbeef.1', 'garbage', self.tracker.token(99)):
+            ret = self.tracker.changes('sysnet', self.data, token)
+            self.assertTrue(ret['full'], token)
+            self.assertEqual(len(ret['changed']), 3)
+
+    def test_removed_pruned(self):
+        first = self.tracker.changes('pidstatus', {'1': 'a'})['token']
+        for pid in range(2, 2 + 2 * changes.KEEP_GENERATIONS):
+            token = self.tracker.changes('pidstatus',
+                                         {str(pid): 'a'})['token']
+        state = self.tracker._states['pidstatus']
+        self.assertEqual(state.pruned, changes.KEEP_GENERATIONS)
+        self.assertEqual(len(state.removed), changes.KEEP_GENERATIONS + 1)
+
+        ret = self.tracker.changes('pidstatus', {str(pid): 'a'}, token)
+        self.assertEqual(ret['changed'], {})
+        ret = self.tracker.changes('pidstatus', {str(pid): 'a'}, first)
+        self.assertTrue(ret['full'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+import unittest
+import threading
+
+from slashproc_parser.basic_server import SimpleThreadedJSONRPCServer
+from slashproc_parser.basic_server import RPC_FUNCTIONS
+from slashproc_parser.client import LocalClient, connect
+from slashproc_parser.jsonrpclib import Server, RawJSON
+
+PORT = 18866
+
+
+class TestLocalClient(unittest.TestCase):
+
+    def setUp(self):
+        self.client = connect('local')
+
+    def test_connect(self):
+        self.assertTrue(isinstance(self.client, LocalClient))
+        self.assertTrue(isinstance(connect('http://localhost:1'),
+                                   Server))
+
+    def test_methods(self):
+        self.assertIn('meminfo', self.client.get_parsers())
+        self.assertIn('found', self.client.get_groups(parser='meminfo'))
+        self.assertIn('found', self.client.get_vars(parser='meminfo'))
+        data = self.client.get_data(parser='meminfo', get='memfree')
+        self.assertTrue(isinstance(data['found']['/meminfo/memfree'], int))
+        self.assertRaises(AttributeError, getattr, self.client, 'main')
+        # GET only on the server, so not here either
+        self.assertRaises(AttributeError, getattr, self.client, 'get_metrics')
+
+    def test_raw_json(self):
+        result = self.client.get_data(parser='cmdline')
+        self.assertFalse(isinstance(result, RawJSON))
+        self.assertIn('found', result)
+
+    def test_copy(self):
+        result = self.client.get_vars(parser='meminfo')
+        result['found'].clear()
+        self.assertIn('memfree',
+                      self.client.get_vars(parser='meminfo')['found'])
+
+        shared = LocalClient(copy=False)
+        self.assertTrue(shared.get_vars(parser='meminfo')['found'] is
+                        shared.get_vars(parser='meminfo')['found'])
+
+    def test_same_as_remote(self):
+        server = SimpleThreadedJSONRPCServer(('localhost', PORT),
+                                             logRequests=False)
+        for function in RPC_FUNCTIONS:
+            server.register_function(function)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            remote = connect('http://localhost:%d' % PORT)
+            for client in (self.client, remote):
+                self.assertEqual(sorted(client.get_parsers()),
+                                 sorted(self.client.get_parsers()))
+                self.assertEqual(
+                    client.get_vars(parser='loadavg', get='loadavg_1min'),
+                    self.client.get_vars(parser='loadavg',
+                                         get='loadavg_1min'))
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+import json
+import httplib
+import unittest
+import threading
+
+from slashproc_parser.basic_server import SimpleThreadedJSONRPCServer
+from slashproc_parser.jsonrpclib import Server, PooledTransport, RawJSON
+from slashproc_parser.jsonrpclib import dumps, loads
+from slashproc_parser.jsonrpclib.fanout import FanOut
+from slashproc_parser.jsonrpclib.jsonrpc import decompress
+from slashproc_parser.jsonrpclib.SimpleJSONRPCServer import \
+    SimpleJSONRPCRequestHandler
+
+PORT = 18868
+
+TABLE = dict(('eth%d' % i, {'rx_bytes': i, 'tx_bytes': i * 2,
+                            'desc': 'bytes received by the interface'})
+             for i in range(500))
+
+RAW = RawJSON({'found': TABLE})
+
+
+def get_table(path=None):
+    return TABLE
+
+
+def get_raw(path=None):
+    return RAW
+
+
+class CompressingHandler(SimpleJSONRPCRequestHandler):
+    stream_threshold = 8 * 1024
+    get_routes = {"table": "get_table", "raw": "get_raw"}
+
+
+class TestRawJSON(unittest.TestCase):
+
+    def test_compress(self):
+        for envelope in ({}, {'id': '1', 'jsonrpc': '2.0'}):
+            spliced = RAW.splice(envelope)
+            self.assertEqual(json.loads(spliced),
+                             dict(envelope, result={'found': TABLE}))
+            for coding in ('gzip', 'deflate'):
+                self.assertEqual(decompress(spliced.compress(coding), coding),
+                                 spliced)
+        self.assertEqual(len(RAW._compressed), 2)
+
+
+class TestCompression(unittest.TestCase):
+
+    def setUp(self):
+        self.server = SimpleThreadedJSONRPCServer(
+            ('localhost', PORT), requestHandler=CompressingHandler,
+            logRequests=False)
+        for function in (get_table, get_raw):
+            self.server.register_function(function)
+        self.server.register_function(lambda: 'small', 'get_small')
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+
+    def request(self, method, accept=None, path='/'):
+        connection = httplib.HTTPConnection('localhost', PORT)
+        headers = {'Accept-Encoding': accept} if accept else {}
+        if path == '/':
+            connection.request('POST', path, dumps([], method, rpcid='1'),
+                               headers)
+        else:
+            connection.request('GET', path, headers=headers)
+        response = connection.getresponse()
+        coding = response.getheader('content-encoding')
+        return coding, decompress(response.read(), coding)
+
+    def test_negotiation(self):
+        for accept, expected in ((None, None), ('gzip', 'gzip'),
+                                 ('deflate', 'deflate'),
+                                 ('gzip;q=0, deflate', 'deflate'),
+                                 ('*', 'gzip'), ('identity', None),
+                                 ('br, GZIP;q=0.5', 'gzip')):
+            coding, body = self.request('get_table', accept)
+            self.assertEqual(coding, expected, accept)
+            self.assertEqual(loads(body)['result'], TABLE)
+
+    def test_threshold(self):
+        coding, body = self.request('get_small', 'gzip')
+        self.assertEqual(coding, None)
+        self.assertEqual(loads(body)['result'], 'small')
+
+    def test_disabled(self):
+        CompressingHandler.compress_level = 0
+        try:
+            coding, body = self.request('get_table', 'gzip')
+        finally:
+            del CompressingHandler.compress_level
+        self.assertEqual(coding, None)
+
+    def test_raw(self):
+        RAW._compressed.clear()
+        for path in ('/', '/raw'):
+            coding, body = self.request('get_raw', 'gzip', path)
+            self.assertEqual(coding, 'gzip')
+            self.assertEqual(json.loads(body)['result'], {'found': TABLE})
+        self.assertEqual(RAW._compressed.keys(), [('result', 'gzip', 6)])
+
+    def test_get_streamed(self):
+        coding, body = self.request(None, 'deflate', '/table')
+        self.assertEqual(coding, 'deflate')
+        self.assertEqual(json.loads(body)['result'], TABLE)
+
+    def test_clients(self):
+        uri = 'http://localhost:%d' % PORT
+        transport = PooledTransport()
+        self.assertEqual(Server(uri, transport=transport).get_table(), TABLE)
+        transport.close()
+        self.assertEqual(Server(uri).get_table(), TABLE)
+        results = list(FanOut().call([uri], 'get_table'))
+        self.assertEqual(results, [(uri, TABLE, None)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+import json
+import httplib
+import unittest
+import threading
+
+from slashproc_parser import basic_server
+from slashproc_parser.basic_server import SimpleThreadedJSONRPCServer
+from slashproc_parser.basic_server import get_groups, get_vars
+from slashproc_parser.jsonrpclib import Server
+
+PORT = 18869
+
+
+class TestSchemaEtag(unittest.TestCase):
+
+    def test_etag(self):
+        first = get_vars(parser='meminfo')
+        self.assertIn('memfree', first['found'])
+        self.assertEqual(len(first['etag']), 16)
+        self.assertEqual(get_vars(parser='meminfo')['etag'], first['etag'])
+        self.assertNotEqual(get_groups(parser='meminfo')['etag'],
+                            first['etag'])
+
+        filtered = get_vars(parser='meminfo', get='memfree')
+        self.assertNotEqual(filtered['etag'], first['etag'])
+        self.assertEqual(filtered['found'].keys(), ['memfree'])
+        self.assertEqual(get_vars(parser='meminfo', get=['memfree'])['etag'],
+                         filtered['etag'])
+        self.assertNotEqual(get_vars(parser='meminfo', get='memtotal')['etag'],
+                            filtered['etag'])
+
+    def test_filtered_not_modified(self):
+        etag = get_vars(parser='meminfo')['etag']
+        self.assertIn('found', get_vars(parser='meminfo', get='memfree',
+                                        etag=etag))
+        etag = get_vars(parser='meminfo', get='memfree')['etag']
+        self.assertEqual(get_vars(parser='meminfo', get='memfree', etag=etag),
+                         {'etag': etag, 'notmodified': True})
+        self.assertIn('found', get_vars(parser='meminfo', etag=etag))
+
+    def test_not_modified(self):
+        etag = get_groups(parser='loadavg')['etag']
+        for tags in (etag, [etag], ['0123', etag], '*'):
+            self.assertEqual(get_groups(parser='loadavg', etag=tags),
+                             {'etag': etag, 'notmodified': True})
+        self.assertIn('found', get_groups(parser='loadavg', etag='0123'))
+
+    def test_dynamic_schema(self):
+        basic_server.schema_cache.invalidate()
+        get_vars(parser='loadavg')
+        get_vars(parser='pidstatus')
+        counters = basic_server.schema_cache.counters()
+        self.assertIn('loadavg/vars', counters)
+        self.assertNotIn('pidstatus/vars', counters)
+
+
+class TestConditionalGet(unittest.TestCase):
+
+    def setUp(self):
+        self.server = SimpleThreadedJSONRPCServer(('localhost', PORT),
+                                                  logRequests=False)
+        self.server.register_function(get_groups)
+        self.server.register_function(get_vars)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.connection = httplib.HTTPConnection('localhost', PORT)
+
+    def tearDown(self):
+        self.connection.close()
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+
+    def get(self, path, tags=None):
+        headers = {'If-None-Match': tags} if tags else {}
+        self.connection.request('GET', path, headers=headers)
+        response = self.connection.getresponse()
+        return response, response.read()
+
+    def test_304(self):
+        response, body = self.get('/vars/uptime')
+        self.assertEqual(response.status, 200)
+        etag = response.getheader('etag')
+        self.assertTrue(etag.startswith('W/'))
+        self.assertEqual(json.loads(body)['result']['etag'],
+                         etag[2:].strip('"'))
+
+        # on the same connection
+        for tags in (etag, etag[2:], '"0123", %s' % etag):
+            response, body = self.get('/vars/uptime', tags)
+            self.assertEqual(response.status, 304)
+            self.assertEqual(response.getheader('etag'), etag)
+            self.assertEqual(body, '')
+
+        response, body = self.get('/vars/uptime', '"0123"')
+        self.assertEqual(response.status, 200)
+        self.assertIn('total', json.loads(body)['result']['found'])
+
+    def test_groups(self):
+        response, body = self.get('/groups/meminfo')
+        self.assertEqual(response.status, 200)
+        response, body = self.get('/groups/meminfo',
+                                  response.getheader('etag'))
+        self.assertEqual(response.status, 304)
+
+    def test_rpc(self):
+        proxy = Server('http://localhost:%d' % PORT)
+        etag = proxy.get_vars(parser='uptime')['etag']
+        self.assertEqual(proxy.get_vars(parser='uptime', etag=etag),
+                         {'etag': etag, 'notmodified': True})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+import time
+import errno
+import socket
+import unittest
+import threading
+
+from slashproc_parser.basic_server import SimpleThreadedJSONRPCServer
+from slashproc_parser.basic_server import get_parsers, get_data
+from slashproc_parser.jsonrpclib.fanout import FanOut, Request, dechunk
+from slashproc_parser.jsonrpclib.fanout import Resolver
+
+PORTS = (18861, 18862, 18863)
+SILENT_PORT = 18864
+CLOSED_PORT = 18865
+
+
+class TestFanOut(unittest.TestCase):
+
+    def setUp(self):
+        self.servers = list()
+        for port in PORTS:
+            server = SimpleThreadedJSONRPCServer(('localhost', port),
+                                                 logRequests=False)
+            server.register_function(get_parsers)
+            server.register_function(get_data)
+            thread = threading.Thread(target=server.serve_forever)
+            thread.start()
+            self.servers.append((server, thread))
+        # accepts connections but never answers
+        self.silent = socket.socket()
+        self.silent.bind(('localhost', SILENT_PORT))
+        self.silent.listen(5)
+        self.uris = ['http://localhost:%d' % p for p in PORTS]
+
+    def tearDown(self):
+        self.silent.close()
+        for server, thread in self.servers:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+    def test_call(self):
+        fanout = FanOut(concurrency=2)
+        results = dict((uri, (result, error)) for uri, result, error in
+                       fanout.call(self.uris, 'get_data', parser='uptime'))
+        self.assertEqual(sorted(results), sorted(self.uris))
+        for result, error in results.values():
+            self.assertEqual(error, None)
+            self.assertIn('found', result)
+
+    def test_errors(self):
+        silent = 'http://localhost:%d' % SILENT_PORT
+        closed = 'http://localhost:%d' % CLOSED_PORT
+        fanout = FanOut(timeout=5, timeouts={silent: 0.3})
+        results = list(fanout.call([silent, closed] + self.uris,
+                                   'get_parsers'))
+
+        self.assertEqual(len(results), 5)
+        # answers stream in before the silent server times out
+        self.assertEqual(results[-1][0], silent)
+        self.assertTrue(isinstance(results[-1][2], socket.timeout))
+        errors = dict((uri, error) for uri, result, error in results)
+        self.assertTrue(isinstance(errors[closed], socket.error))
+        self.assertEqual([errors[u] for u in self.uris], [None] * 3)
+
+    def test_batch(self):
+        fanout = FanOut()
+        calls = [('get_parsers', []), ('get_data', {'parser': 'loadavg'}),
+                 ('no_such_method', [])]
+        for uri, results, error in fanout.batch(self.uris, calls):
+            self.assertEqual(error, None)
+            self.assertIn('loadavg', results[0])
+            self.assertIn('found', results[1])
+            self.assertTrue(isinstance(results[2], Exception))
+
+    def test_unknown_host(self):
+        unknown = 'http://no-such-host.invalid:8848'
+        results = list(FanOut().call([unknown] + self.uris, 'get_parsers'))
+        errors = dict((uri, error) for uri, result, error in results)
+        self.assertTrue(isinstance(errors.pop(unknown), socket.error))
+        self.assertEqual(errors.values(), [None] * 3)
+
+    def test_refused(self):
+        done = list()
+        request = Request('http://localhost:%d' % CLOSED_PORT, '', 5, {},
+                          done, Resolver())
+        while request.socket is None:
+            time.sleep(0.01)
+            request.lookup()
+        time.sleep(0.1)
+        # the connect errno, not a response cut short
+        request.handle_expt_event()
+        self.assertEqual(done[0][2].errno, errno.ECONNREFUSED)
+
+    def test_resolver(self):
+        resolver = Resolver()
+        self.assertEqual(resolver.lookup('127.0.0.1'), ('127.0.0.1', None))
+        while resolver.lookup('localhost') is None:
+            time.sleep(0.01)
+        self.assertEqual(resolver.lookup('localhost'), ('127.0.0.1', None))
+        while resolver.lookup('no-such-host.invalid') is None:
+            time.sleep(0.01)
+        self.assertTrue(isinstance(
+            resolver.lookup('no-such-host.invalid')[1], socket.error))
+
+    def test_complete(self):
+        request = Request('http://127.0.0.1:%d' % PORTS[0], '', 5, {}, [],
+                          Resolver())
+        response = 'HTTP/1.1 200 OK\r\nContent-Length: 10\r\n\r\n0123456789'
+        self.assertFalse(request.complete(response[:20]))
+        self.assertFalse(request.complete(response[20:-4]))
+        self.assertTrue(request.complete(response[-4:]))
+        request.close()
+
+    def test_dechunk(self):
+        self.assertEqual(dechunk('4\r\nWiki\r\n5\r\npedia\r\n0\r\n\r\n'),
+                         'Wikipedia')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+import random
+import unittest
+
+from slashproc_parser.gorilla import Encoder, CompressedSeries, decode
+from slashproc_parser.store import RingBuffer, SampleStore
+
+
+class TestEncoding(unittest.TestCase):
+
+    def test_roundtrip(self):
+        rnd = random.Random(42)
+        timestamp = 1445350215.123
+        points = list()
+        for i in range(500):
+            timestamp += rnd.choice([1, 1, 1, 1.001, 0.999, 10, 3600, 0])
+            value = rnd.choice([0.0, -3.25, float(i), rnd.random() * 1e9,
+                                1e300, float('inf')])
+            points.append((round(timestamp, 3), value))
+
+        encoder = Encoder()
+        for point in points:
+            encoder.append(*point)
+        block = encoder.close()
+
+        decoded = [(round(t, 3), v) for t, v in decode(block.data, block.count)]
+        self.assertEqual(decoded, points)
+        self.assertEqual(block.first, points[0][0])
+        self.assertEqual(block.last, points[-1][0])
+
+    def test_compresses_gauge(self):
+        series = CompressedSeries(3600)
+        ring = RingBuffer(3600)
+        for i in range(3600):
+            series.append(1445350215.0 + i, 5302708)
+            ring.append(1445350215.0 + i, 5302708)
+        self.assertTrue(ring.nbytes() > 10 * series.nbytes(), series.nbytes())
+
+
+class TestCompressedSeries(unittest.TestCase):
+
+    def setUp(self):
+        self.series = CompressedSeries(256, block_size=64)
+        for i in range(1000):
+            self.series.append(1000.0 + i, float(i * 7))
+
+    def test_bounded(self):
+        self.assertEqual(len(self.series.blocks), 4)
+        self.assertTrue(256 <= len(self.series) < 256 + 64)
+        self.assertEqual(self.series.oldest, 1000.0 + 1000 - len(self.series))
+
+    def test_range(self):
+        timestamps, values = self.series.range(1900.0, 1903.0)
+        self.assertEqual(list(timestamps), [1900.0, 1901.0, 1902.0, 1903.0])
+        self.assertEqual(list(values), [6300.0, 6307.0, 6314.0, 6321.0])
+        self.assertEqual(list(self.series.range(since=1999.0)[1]), [6993.0])
+
+    def test_store_compress(self):
+        store = SampleStore(size=16, compress=True)
+        store.add_sample('vmstat', 1.0, {'pgfault': 10})
+        store.add_sample('vmstat', 2.0, {'pgfault': 12})
+        self.assertEqual(list(store.range('vmstat', 'pgfault')[1]), [10.0, 12.0])
+        self.assertEqual(store.oldest('vmstat', 'pgfault'), 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
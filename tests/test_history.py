@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+import unittest
+
+from slashproc_parser.jsonrpclib import config
+from slashproc_parser.jsonrpclib.history import History
+
+
+class TestHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.defaults = (config.history, config.history_size,
+                         config.history_bytes)
+        self.history = History()
+
+    def tearDown(self):
+        (config.history, config.history_size,
+         config.history_bytes) = self.defaults
+
+    def test_off(self):
+        config.history = False
+        self.history.add_request('{"id": 1}')
+        self.history.add_response('{"result": 1}')
+        self.assertEqual(self.history.request, None)
+        self.assertEqual(self.history.nbytes, 0)
+
+    def test_size(self):
+        config.history = True
+        config.history_size = 3
+        for i in range(10):
+            self.history.add_request('req%d' % i)
+            self.history.add_response('resp%d' % i)
+        self.assertEqual(list(self.history.requests), ['req7', 'req8', 'req9'])
+        self.assertEqual(self.history.response, 'resp9')
+        self.assertEqual(self.history.nbytes, 3 * 4 + 3 * 5)
+
+    def test_bytes(self):
+        config.history = True
+        config.history_bytes = 100
+        for i in range(5):
+            self.history.add_request('x' * 10)
+            self.history.add_response('y' * 40)
+        self.assertTrue(self.history.nbytes <= 100)
+        self.assertEqual(len(self.history.requests), 2)
+        self.assertEqual(len(self.history.responses), 2)
+
+        self.history.add_response('z' * 1000)
+        self.assertTrue(self.history.nbytes <= 100)
+
+        self.history.clear()
+        self.assertEqual(self.history.nbytes, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+import urllib2
+import unittest
+import threading
+
+from slashproc_parser import basic_server
+from slashproc_parser.metrics import Family, MetricsRenderer, format_value
+from slashproc_parser.jsonrpclib import Server, ProtocolError
+
+PORT = 18870
+
+
+class FakeParser(object):
+
+    calls = 0
+
+    @staticmethod
+    def get_vars():
+        FakeParser.calls += 1
+        return {'memfree': {'label': 'MemFree', 'desc': 'Free "RAM"',
+                            'unit': 'kB'},
+                'pgfault': {'label': 'pgfault', 'counter': True},
+                'cpu_mhz': {'label': 'cpu MHz'}}
+
+
+class TestFamily(unittest.TestCase):
+
+    def test_unit(self):
+        family = Family('meminfo', 'memfree', {'unit': 'KB', 'desc': 'free'})
+        self.assertEqual(family.name, 'slashproc_meminfo_memfree_bytes')
+        self.assertEqual(family.scale, 1024)
+        self.assertEqual(family.type, 'gauge')
+
+    def test_counter(self):
+        family = Family('vmstat', 'pgfault', {'counter': True})
+        self.assertEqual(family.name, 'slashproc_vmstat_pgfault_total')
+        self.assertEqual(family.type, 'counter')
+
+    def test_undescribed(self):
+        family = Family('sysnet', 'eth0-mtu(x)', None)
+        self.assertEqual(family.name, 'slashproc_sysnet_eth0_mtu_x_')
+        self.assertEqual(family.help, 'eth0-mtu(x)')
+
+    def test_format_value(self):
+        for value, text in ((7.0, '7'), (0.5, '0.5'), (float('inf'), '+Inf'),
+                            (float('-inf'), '-Inf'), (float('nan'), 'NaN')):
+            self.assertEqual(format_value(value), text)
+
+
+class TestRenderer(unittest.TestCase):
+
+    def setUp(self):
+        self.renderer = MetricsRenderer()
+        FakeParser.calls = 0
+
+    def test_render(self):
+        data = {'fake': {'memfree': '10', 'pgfault': 7, 'name': 'x',
+                         'core0': {'cpu_mhz': '2000.5'},
+                         'core1': {'cpu_mhz': '1999'}}}
+        text = self.renderer.render_parser('fake', FakeParser, data)
+        lines = text.splitlines()
+
+        self.assertIn('# TYPE slashproc_fake_pgfault_total counter', lines)
+        self.assertIn('slashproc_fake_pgfault_total 7', lines)
+        self.assertIn('slashproc_fake_memfree_bytes 10240', lines)
+        self.assertIn('slashproc_fake_cpu_mhz{group="core0"} 2000.5', lines)
+        self.assertIn('slashproc_fake_cpu_mhz{group="core1"} 1999', lines)
+        self.assertEqual(text.count('# HELP slashproc_fake_cpu_mhz '), 1)
+        self.assertNotIn('name', text)
+
+    def test_metadata_cached(self):
+        for _ in range(3):
+            list(self.renderer.render(['fake'], {'fake': FakeParser},
+                                      lambda p, c: (0, {'memfree': 1})))
+        self.assertEqual(FakeParser.calls, 1)
+
+    def test_get_metrics(self):
+        text = ''.join(basic_server.get_metrics(path='/uptime'))
+        self.assertIn('# TYPE slashproc_uptime_total_seconds gauge', text)
+        self.assertNotIn('meminfo', text)
+
+
+class TestGetOnly(unittest.TestCase):
+
+    def setUp(self):
+        self.server = basic_server.SimpleThreadedJSONRPCServer(
+            ('localhost', PORT), logRequests=False)
+        for function in basic_server.GET_FUNCTIONS:
+            self.server.register_get_function(function)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+
+    def test_get_only(self):
+        text = urllib2.urlopen('http://localhost:%d/metrics/uptime'
+                               % PORT).read()
+        self.assertIn('slashproc_uptime_total_seconds', text)
+        proxy = Server('http://localhost:%d' % PORT)
+        try:
+            proxy.get_metrics()
+            self.fail('get_metrics answered over POST')
+        except ProtocolError, e:
+            self.assertEqual(e.args[0][0], -32601)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+import os
+import argparse
+import shutil
+import tempfile
+import unittest
+
+from slashproc_parser import fixtures
+from slashproc_parser.basic_parser import BasicSPParser
+from slashproc_parser.parsers.cpuinfo import CpuInfo
+from slashproc_parser.parsers.vmstat import VmStat
+from slashproc_parser.parsers.meminfo import MemInfo
+from slashproc_parser.parsers.uptime import UpTime
+from slashproc_parser.parsers.pidstatus import PidStatus
+from slashproc_parser.parsers.sysnet import SysNet
+
+
+FILES = {
+    'meminfo': "MemTotal:        8000000 kB\nMemFree:         1234 kB\n",
+    'uptime': "100.50 300.25\n",
+    '1/status': "Name:\tinit\nPid:\t1\nPPid:\t0\nVmRSS:\t  100 kB\n",
+    '42/status': "Name:\tsh\nPid:\t42\nPPid:\t1\nVmRSS:\t  10 kB\n",
+    'sys/net/core/somaxconn': "128\n",
+    'sys/net/ipv4/ip_forward': "1\n",
+}
+
+
+class TestProcRoot(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        for name, content in FILES.items():
+            path = os.path.join(self.root, name)
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, 'w') as f:
+                f.write(content)
+        BasicSPParser.set_proc_root(self.root + '/')
+
+    def tearDown(self):
+        BasicSPParser.set_proc_root('/proc')
+        shutil.rmtree(self.root)
+
+    def test_proc_path(self):
+        self.assertEqual(MemInfo.proc_path(MemInfo.MEMINFO),
+                         self.root + '/meminfo')
+        self.assertEqual(MemInfo.proc_path('/etc/hosts'), '/etc/hosts')
+        self.assertEqual(MemInfo.proc_path('/proc'), self.root)
+
+    def test_root_slash(self):
+        # a host's /proc mounted as the root of a container
+        BasicSPParser.set_proc_root('/')
+        self.assertEqual(MemInfo.proc_path(MemInfo.MEMINFO), '/meminfo')
+        self.assertEqual(MemInfo.proc_path('/proc/sys/net'), '/sys/net')
+        self.assertEqual(MemInfo.proc_path('/proc'), '/')
+
+    def test_files(self):
+        self.assertEqual(MemInfo.get_data(),
+                         {'meminfo': {'memtotal': 8000000, 'memfree': 1234}})
+        self.assertEqual(UpTime.get_data(),
+                         {'uptime': {'total': '100.50', 'idle': '300.25'}})
+
+    def test_pids(self):
+        data = PidStatus.get_data()
+        self.assertEqual(data['pid']['0']['1']['42']['vmrss'], '10')
+
+    def test_directories(self):
+        self.assertEqual(SysNet.get_data(),
+                         {'net': {'core': {'somaxconn': '128'},
+                                  'ipv4': {'ip_forward': '1'}}})
+
+
+class TestFixtures(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        fixtures.generate(self.root, processes=50, interfaces=3, cpus=6,
+                          depth=5)
+        BasicSPParser.set_proc_root(self.root)
+
+    def tearDown(self):
+        BasicSPParser.set_proc_root('/proc')
+        shutil.rmtree(self.root)
+
+    def test_sizes(self):
+        self.assertEqual(len(CpuInfo.get_data()['cpuinfo']), 6)
+        self.assertEqual(len(PidStatus.parse_pidstatus(mode='flat')['pid']), 50)
+
+        conf = SysNet.get_data()['net']['ipv4']['conf']
+        self.assertEqual(sorted(conf), ['all', 'default', 'eth0', 'eth1',
+                                        'eth2', 'lo'])
+
+        self.assertTrue('pgfault' in VmStat.get_data())
+        self.assertTrue('memfree' in MemInfo.get_data()['meminfo'])
+
+    def test_depth(self):
+        init = PidStatus.get_data()['pid']['0']['1']
+        self.assertEqual(len([k for k in init if k.isdigit()]), 10)
+
+        chain = ['2']
+        level = init['2']
+        while [k for k in level if k.isdigit()]:
+            chain.extend(k for k in level if k.isdigit())
+            level = level[chain[-1]]
+        self.assertEqual(chain, ['2', '3', '4', '5', '6'])
+
+    def test_invalid(self):
+        for kwargs in ({'depth': 0}, {'processes': 0}, {'cpus': 0}):
+            self.assertRaises(ValueError, fixtures.generate, self.root,
+                              **kwargs)
+        check = fixtures.at_least(1)
+        self.assertEqual(check('3'), 3)
+        self.assertRaises(argparse.ArgumentTypeError, check, '0')
+
+
+if __name__ == '__main__':
+    unittest.main()
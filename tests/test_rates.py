@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+import unittest
+
+from slashproc_parser.rates import RateEngine, counter_delta
+from slashproc_parser.parsers.vmstat import VmStat
+from slashproc_parser.parsers.pidstatus import PidStatus
+
+
+class TestCounterDelta(unittest.TestCase):
+
+    def test_increase(self):
+        self.assertEqual(counter_delta(100, 150), 50)
+
+    def test_wraparound(self):
+        self.assertEqual(counter_delta(2 ** 32 - 10, 5), 15)
+        self.assertEqual(counter_delta(2 ** 64 - 1, 1), 2)
+
+    def test_reset(self):
+        self.assertEqual(counter_delta(1000, 7), 7)
+
+
+class TestRateEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = RateEngine()
+        self.counters = set(['pgfault'])
+
+    def update(self, timestamp, pgfault, uptime):
+        self.engine.update('vmstat', timestamp,
+                           {'pgfault': pgfault, 'nr_free_pages': 10},
+                           self.counters, uptime=uptime)
+
+    def test_first_sample_is_baseline(self):
+        self.update(100.0, 1000, 50.0)
+        self.assertEqual(self.engine.latest('vmstat'), (None, {}))
+
+    def test_rate(self):
+        self.update(100.0, 1000, 50.0)
+        self.update(102.0, 1100, 52.0)
+        self.assertEqual(self.engine.latest('vmstat'),
+                         (102.0, {'pgfault': 50.0}))
+
+    def test_reboot(self):
+        self.update(100.0, 100000, 5000.0)
+        self.update(110.0, 400, 4.0)
+        self.assertEqual(self.engine.latest('vmstat')[1], {'pgfault': 100.0})
+
+
+class TestCounterMetadata(unittest.TestCase):
+
+    def test_vmstat_counters(self):
+        counters = VmStat.get_counters()
+        self.assertTrue('pgfault' in counters)
+        self.assertFalse('nr_free_pages' in counters)
+
+    def test_pidstatus_counters(self):
+        self.assertEqual(PidStatus.get_counters(),
+                         set(['voluntary_ctxt_switches',
+                              'nonvoluntary_ctxt_switches']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+import time
+import unittest
+
+from slashproc_parser.sampler import Sampler
+
+
+class CountingParser(object):
+    calls = 0
+
+    @staticmethod
+    def get_data():
+        CountingParser.calls += 1
+        return {'counting': {'calls': CountingParser.calls}}
+
+
+class OnceParser(object):
+    calls = 0
+
+    @staticmethod
+    def get_data():
+        OnceParser.calls += 1
+        return {'once': {'calls': OnceParser.calls}}
+
+
+class SlowParser(object):
+
+    @staticmethod
+    def get_data():
+        time.sleep(0.5)
+        return {'slow': {}}
+
+
+class TestSampler(unittest.TestCase):
+
+    def setUp(self):
+        CountingParser.calls = 0
+        OnceParser.calls = 0
+        classes = {'counting': CountingParser, 'once': OnceParser}
+        self.sampler = Sampler(classes, {'counting': 0.05, 'once': 0,
+                                         'unknown': 1})
+        self.seen = list()
+        self.sampler.add_listener(lambda p, ts, d: self.seen.append(p))
+
+    def tearDown(self):
+        self.sampler.stop()
+
+    def test_unknown_parsers_ignored(self):
+        self.assertFalse(self.sampler.is_sampled('unknown'))
+        self.assertEqual(self.sampler.latest('counting'), None)
+
+    def test_intervals(self):
+        self.sampler.start()
+        time.sleep(0.3)
+        self.sampler.stop()
+
+        self.assertEqual(OnceParser.calls, 1)
+        self.assertTrue(CountingParser.calls >= 3, CountingParser.calls)
+
+        timestamp, data = self.sampler.latest('counting')
+        self.assertEqual(data['counting']['calls'], CountingParser.calls)
+        self.assertTrue(timestamp <= time.time())
+        self.assertEqual(self.seen.count('once'), 1)
+
+    def test_separate(self):
+        classes = {'counting': CountingParser, 'slow': SlowParser}
+        intervals = {'counting': 0.05, 'slow': 0.05}
+        sampler = Sampler(classes, intervals, separate=('slow', 'unknown'))
+        self.assertEqual(sampler.separate, ['slow'])
+        sampler.start()
+        time.sleep(0.3)
+        sampler.stop()
+        # the slow read does not hold up the others
+        self.assertTrue(CountingParser.calls >= 3, CountingParser.calls)
+        self.assertNotEqual(sampler.latest('slow'), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
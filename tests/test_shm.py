@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+import os
+import math
+import shutil
+import tempfile
+import unittest
+
+from slashproc_parser import basic_server
+from slashproc_parser import fixtures
+from slashproc_parser.shm import ShmPublisher, ShmReader, numeric_vars
+from slashproc_parser.basic_parser import BasicSPParser
+
+
+class FakeParser(object):
+
+    data = {'memfree': 100, 'load': '0.5', 'name': 'x',
+            'node0': {'active': 7}}
+
+    @classmethod
+    def get_data(cls):
+        return cls.data
+
+
+class TestShm(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'snapshot')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_numeric_vars(self):
+        self.assertEqual(numeric_vars('fake', FakeParser.data),
+                         {'fake/memfree': 100, 'fake/load': 0.5,
+                          'fake/node0/active': 7})
+        self.assertEqual(numeric_vars('fake', 'error'), {})
+
+    def test_publish(self):
+        publisher = ShmPublisher(self.path, {'fake': FakeParser})
+        reader = ShmReader(self.path)
+        self.assertEqual(sorted(reader.names),
+                         ['fake/load', 'fake/memfree', 'fake/node0/active'])
+
+        timestamp, values = reader.snapshot()
+        self.assertEqual(timestamp, 0.0)
+        self.assertEqual(values['fake/memfree'], 0)
+        self.assertTrue(math.isnan(values['fake/load']))
+
+        publisher.add_sample('fake', 12.5, {'memfree': 200, 'load': '1.25',
+                                            'node0': {'active': 9}})
+        timestamp, values = reader.snapshot()
+        self.assertEqual(timestamp, 12.5)
+        self.assertEqual(values, {'fake/memfree': 200, 'fake/load': 1.25,
+                                  'fake/node0/active': 9})
+        self.assertTrue(isinstance(values['fake/memfree'], (int, long)))
+
+        # missing vars are cleared, new ones ignored
+        publisher.add_sample('fake', 13.0, {'load': '2', 'new': 1})
+        self.assertEqual(reader.get('fake/memfree'), 0)
+        self.assertEqual(reader.get('fake/load'), 2.0)
+
+        # other parsers leave the file alone
+        publisher.add_sample('other', 14.0, {'memfree': 1})
+        self.assertEqual(reader.snapshot()[0], 13.0)
+        publisher.close()
+        reader.close()
+
+    def test_unpackable(self):
+        publisher = ShmPublisher(self.path, {'fake': FakeParser})
+        reader = ShmReader(self.path)
+        for memfree in (float('nan'), float('inf'), 2 ** 70):
+            publisher.add_sample('fake', 1.0, {'memfree': memfree,
+                                               'load': 1.5})
+            timestamp, values = reader.snapshot(10)
+            self.assertEqual(values['fake/memfree'], 0)
+            self.assertEqual(values['fake/load'], 1.5)
+
+        # an error while writing still leaves the sequence even
+        def fail(*args):
+            raise RuntimeError('write')
+        publisher._write = fail
+        self.assertRaises(RuntimeError, publisher.add_sample, 'fake', 2.0,
+                          FakeParser.data)
+        self.assertEqual(reader.snapshot(10)[1]['fake/load'], 1.5)
+        publisher.close()
+        reader.close()
+
+    def test_torn_read(self):
+        publisher = ShmPublisher(self.path, {'fake': FakeParser})
+        reader = ShmReader(self.path)
+        # a writer caught mid update leaves the sequence odd
+        publisher._sequence = 1
+        publisher.add_sample('fake', 1.0, FakeParser.data)
+        publisher._mm[16] = chr(5)
+        self.assertRaises(RuntimeError, reader.snapshot, 10)
+        publisher.close()
+        reader.close()
+
+    def test_stale(self):
+        ShmPublisher(self.path, {'fake': FakeParser}).close()
+        reader = ShmReader(self.path)
+        self.assertFalse(reader.stale())
+        ShmPublisher(self.path, {'fake': FakeParser}).close()
+        self.assertTrue(reader.stale())
+        reader.close()
+
+    def test_server(self):
+        proc_root = BasicSPParser.proc_root
+        fixtures.generate(os.path.join(self.tmp, 'proc'), processes=1)
+        BasicSPParser.set_proc_root(os.path.join(self.tmp, 'proc'))
+        try:
+            basic_server.start_sampler({'meminfo': 60, 'loadavg': 60},
+                                       shm_path=self.path)
+            basic_server.sampler.sample('meminfo')
+            reader = ShmReader(self.path)
+            self.assertEqual(reader.get('meminfo/memtotal'),
+                             basic_server.sampler.latest('meminfo')[1]
+                             ['meminfo']['memtotal'])
+            self.assertTrue(any(name.startswith('loadavg/')
+                                for name in reader.names))
+            reader.close()
+        finally:
+            basic_server.stop_sampler()
+            BasicSPParser.set_proc_root(proc_root)
+
+
+if __name__ == '__main__':
+    unittest.main()
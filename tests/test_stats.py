@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+import time
+import unittest
+
+from slashproc_parser import stats
+from slashproc_parser import basic_server
+
+
+class TestHistogram(unittest.TestCase):
+
+    def test_buckets(self):
+        h = stats.Histogram()
+        for seconds in (0.0001, 0.0001, 0.0001, 0.01):
+            h.add(seconds)
+        self.assertEqual(h.count, 4)
+        self.assertAlmostEqual(h.max, 0.01)
+        self.assertEqual(sorted(h.to_dict()['buckets'].values()), [1, 3])
+        self.assertAlmostEqual(h.percentile(50), 0.000128)
+        self.assertAlmostEqual(h.percentile(99), 0.01)
+
+    def test_empty(self):
+        self.assertEqual(stats.Histogram().percentile(99), None)
+
+
+class TestRequestTimer(unittest.TestCase):
+
+    def setUp(self):
+        stats.stats.reset()
+
+    def test_no_request(self):
+        with stats.phase('read'):
+            pass
+        self.assertEqual(stats.end(), None)
+
+    def test_phases(self):
+        stats.begin('get_data')
+        stats.set_parser('meminfo')
+        with stats.phase('parse'):
+            with stats.phase('read'):
+                time.sleep(0.01)
+        timer = stats.end()
+
+        self.assertTrue(timer.phases['read'] >= 0.01)
+        self.assertTrue(timer.phases['parse'] < timer.phases['read'])
+        found = stats.stats.snapshot('meminfo')
+        self.assertEqual(sorted(found['meminfo']['get_data']),
+                         ['parse', 'read', 'total'])
+
+    def test_get_stats(self):
+        stats.begin('get_data')
+        basic_server.get_data(parser='meminfo', get='memfree')
+        stats.end()
+
+        found = basic_server.get_stats(parser='/proc/meminfo')['found']
+        phases = found['meminfo']['get_data']
+        self.assertEqual(phases['total']['count'], 1)
+        self.assertIn('filter', phases)
+
+        basic_server.get_stats(reset=True)
+        self.assertEqual(basic_server.get_stats()['found'], {})
+
+
+if __name__ == '__main__':
+    unittest.main()
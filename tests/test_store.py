@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+import os
+import shutil
+import tempfile
+import unittest
+
+from slashproc_parser import basic_server
+from slashproc_parser.diskstore import DiskStore, DAY
+from slashproc_parser.store import RingBuffer, SampleStore, to_number, downsample
+
+
+class TestRingBuffer(unittest.TestCase):
+
+    def test_wraps_oldest_first(self):
+        ring = RingBuffer(4)
+        for i in range(10):
+            ring.append(float(i), i * 10.0)
+
+        timestamps, values = ring.ordered()
+        self.assertEqual(list(timestamps), [6.0, 7.0, 8.0, 9.0])
+        self.assertEqual(list(values), [60.0, 70.0, 80.0, 90.0])
+        self.assertEqual(len(ring), 4)
+        self.assertEqual(ring.oldest, 6.0)
+
+    def test_range(self):
+        ring = RingBuffer(8)
+        for i in range(5):
+            ring.append(float(i), float(i))
+
+        timestamps, values = ring.range(1.0, 3.0)
+        self.assertEqual(list(timestamps), [1.0, 2.0, 3.0])
+        self.assertEqual(list(ring.range(since=3.5)[1]), [4.0])
+        self.assertEqual(list(ring.range(until=0.0)[1]), [0.0])
+
+    def test_fixed_size(self):
+        ring = RingBuffer(16)
+        before = ring.nbytes()
+        for i in range(100):
+            ring.append(float(i), float(i))
+        self.assertEqual(ring.nbytes(), before)
+
+
+class TestSampleStore(unittest.TestCase):
+
+    def test_numeric_only(self):
+        self.assertEqual(to_number('0.52'), 0.52)
+        self.assertEqual(to_number(12), 12.0)
+        self.assertEqual(to_number('1/73'), None)
+        self.assertEqual(to_number(True), None)
+
+    def test_add_and_find(self):
+        store = SampleStore(size=4, parsers=['loadavg'])
+        data = {'loadavg': {'loadavg_1min': '0.5',
+                            'curr_num_proc_over_tot': '1/73'}}
+        store.add_sample('loadavg', 1.0, data)
+        store.add_sample('loadavg', 2.0, data)
+        store.add_sample('pidstatus', 2.0, {'pid': {'1': {'threads': '1'}}})
+
+        self.assertEqual(store.paths('loadavg'), ['loadavg/loadavg_1min'])
+        self.assertEqual(store.paths('pidstatus'), [])
+        self.assertEqual(store.find('loadavg', ['loadavg_1min']),
+                         ['loadavg/loadavg_1min'])
+        self.assertEqual(store.find('loadavg', ['1min']), [])
+
+        timestamps, values = store.range('loadavg', 'loadavg/loadavg_1min')
+        self.assertEqual(list(timestamps), [1.0, 2.0])
+        self.assertEqual(list(values), [0.5, 0.5])
+
+    def test_max_series(self):
+        store = SampleStore(size=2, max_series=2)
+        store.add_sample('vmstat', 1.0, {'a': 1, 'b': 2, 'c': 3})
+        self.assertEqual(len(store.paths('vmstat')), 2)
+        self.assertEqual(store.nbytes(), 2 * 2 * 16)
+
+
+class TestDownsample(unittest.TestCase):
+
+    def setUp(self):
+        ring = RingBuffer(16)
+        for i in range(10):
+            ring.append(100.0 + i, float(i))
+        self.timestamps, self.values = ring.ordered()
+
+    def test_aggregates(self):
+        expected = {'avg': [2.0, 7.0], 'min': [0.0, 5.0], 'max': [4.0, 9.0],
+                    'last': [4.0, 9.0], 'sum': [10.0, 35.0]}
+        for agg, values in expected.items():
+            timestamps, result = downsample(self.timestamps, self.values, 5, agg)
+            self.assertEqual(timestamps, [100.0, 105.0])
+            self.assertEqual(result, values, agg)
+
+    def test_buckets_aligned(self):
+        timestamps, values = downsample(self.timestamps[3:], self.values[3:], 4)
+        self.assertEqual(timestamps, [100.0, 104.0, 108.0])
+        self.assertEqual(values, [3.0, 5.5, 8.5])
+
+
+class TestGetHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.store = basic_server.store
+        basic_server.store = SampleStore(size=4, parsers=['loadavg'])
+        for timestamp in (10.0, 11.0, 12.0):
+            basic_server.store.add_sample(
+                'loadavg', timestamp, {'loadavg': {'loadavg_1min': '0.5'}})
+
+    def tearDown(self):
+        basic_server.store = self.store
+
+    def test_history(self):
+        found = basic_server.get_history(parser='loadavg', step=2,
+                                         agg='max')['found']
+        self.assertEqual(found['/loadavg/loadavg_1min'],
+                         {'timestamps': [10.0, 12.0], 'values': [0.5, 0.5]})
+
+    def test_nan(self):
+        basic_server.store.add_sample(
+            'loadavg', 13.0, {'loadavg': {'loadavg_1min': 'nan'}})
+        found = basic_server.get_history(parser='loadavg')['found']
+        self.assertEqual(found['/loadavg/loadavg_1min']['values'],
+                         [0.5, 0.5, 0.5, None])
+
+    def test_invalid(self):
+        for params in ({'step': 0}, {'step': -1}, {'step': 1e-320},
+                       {'step': '10'}, {'step': float('inf')},
+                       {'since': 'yesterday'}, {'until': float('nan')},
+                       {'since': True}):
+            result = basic_server.get_history(parser='loadavg', **params)
+            self.assertEqual(result['err'], 6, params)
+            self.assertIn(params.keys()[0], result['msg'])
+
+
+class TestDiskStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.day = 1445299200
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_survives_reopen(self):
+        disk = DiskStore(self.directory, parsers=['meminfo'])
+        for i in range(5):
+            disk.add_sample('meminfo', self.day + 10 + i + 0.5,
+                            {'meminfo': {'memfree': 100 + i, 'name': 'x'}})
+        disk.close()
+
+        disk = DiskStore(self.directory)
+        timestamps, values = disk.range('meminfo', 'meminfo/memfree',
+                                        self.day, self.day + 12)
+        self.assertEqual(list(timestamps), [self.day + 10.0, self.day + 11.0,
+                                            self.day + 12.0])
+        self.assertEqual(list(values), [100.0, 101.0, 102.0])
+        timestamps, values = disk.range('meminfo', 'meminfo/name',
+                                        self.day, self.day + 20)
+        self.assertEqual(len(timestamps), 0)
+
+    def test_file_per_day(self):
+        disk = DiskStore(self.directory, resolution=60)
+        disk.add_sample('uptime', self.day + DAY - 1, {'uptime': {'total': 1}})
+        disk.add_sample('uptime', self.day + DAY, {'uptime': {'total': 2}})
+        disk.close()
+
+        filename = disk.filename('uptime', 'uptime/total', self.day)
+        self.assertEqual(os.path.getsize(filename), DAY // 60 * 8)
+
+        timestamps, values = disk.range('uptime', 'uptime/total',
+                                        self.day, self.day + DAY)
+        self.assertEqual(list(values), [1.0, 2.0])
+
+    def test_sparse(self):
+        disk = DiskStore(self.directory)
+        disk.add_sample('uptime', self.day + 5, {'uptime': {'total': 0}})
+        disk.add_sample('uptime', self.day + 6, {'uptime': {'total': -1.5}})
+        disk.close()
+
+        filename = disk.filename('uptime', 'uptime/total', self.day)
+        self.assertEqual(os.path.getsize(filename), DAY * 8)
+        self.assertTrue(os.stat(filename).st_blocks * 512 < DAY * 8)
+
+        timestamps, values = disk.range('uptime', 'uptime/total',
+                                        self.day, self.day + 60)
+        self.assertEqual(list(timestamps), [self.day + 5.0, self.day + 6.0])
+        self.assertEqual(list(values), [0.0, -1.5])
+        self.assertEqual(repr(values[0]), '0.0')
+
+    def test_prune(self):
+        disk = DiskStore(self.directory, resolution=3600, retention_days=2)
+        for days in range(4):
+            disk.add_sample('uptime', self.day + days * DAY,
+                            {'uptime': {'total': days}})
+        disk.close()
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
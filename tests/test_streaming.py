@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+import json
+import httplib
+import unittest
+import threading
+
+from slashproc_parser.basic_server import SimpleThreadedJSONRPCServer
+from slashproc_parser.jsonrpclib import Server, MultiCall, dumps, loads
+from slashproc_parser.jsonrpclib.jsonrpc import iterencode, iterdumps
+from slashproc_parser.jsonrpclib.SimpleJSONRPCServer import \
+    SimpleJSONRPCRequestHandler
+
+PORT = 18867
+
+BIG = dict(('%d' % pid, {'name': 'process%d' % pid, 'vmrss': pid * 4,
+                         'groups': [0, 1, pid]})
+           for pid in range(2000))
+
+
+def get_big(path=None):
+    return BIG
+
+
+class Point(object):
+
+    def __init__(self, x):
+        self.x = x
+
+    def _serialize(self):
+        return [self.x], {}
+
+
+class StreamingHandler(SimpleJSONRPCRequestHandler):
+    stream_threshold = 1024
+    get_routes = {"big": "get_big"}
+
+
+class TestIterencode(unittest.TestCase):
+
+    def test_same_as_dumps(self):
+        for obj in (BIG, {}, [], [1, [2, {}], {'a': (1, 2)}], 'text', None,
+                    {1: 'int key', None: 1, 2.5: [], True: {'a': {}}},
+                    {'deep': {'er': {'still': {'more': [1]}}}},
+                    {'result': {'table': BIG}}, [BIG, [BIG]]):
+            for kwargs in ({}, {'depth': 1}, {'size': 2}):
+                self.assertEqual(json.loads(''.join(iterencode(obj, **kwargs))),
+                                 json.loads(json.dumps(obj)))
+
+    def test_small(self):
+        for obj in ({'a': [1, 2]}, range(100), {'result': 'text'}):
+            self.assertEqual(list(iterencode(obj)), [json.dumps(obj)])
+
+    def test_pieces(self):
+        whole = len(json.dumps(BIG))
+        for obj in (BIG, {'id': '1', 'result': {'table': BIG}}):
+            chunks = list(iterencode(obj))
+            self.assertTrue(len(chunks) > 4)
+            self.assertTrue(max(len(c) for c in chunks) < whole / 4)
+
+    def test_bad_key(self):
+        self.assertRaises(TypeError, list, iterencode({(1, 2): 3}))
+
+    def test_iterdumps(self):
+        for result in (BIG, [1, 2], {'point': Point(3)}):
+            self.assertEqual(
+                json.loads(''.join(iterdumps(result, rpcid='1'))),
+                json.loads(dumps(result, methodresponse=True, rpcid='1')))
+
+
+class TestStreaming(unittest.TestCase):
+
+    def setUp(self):
+        self.server = SimpleThreadedJSONRPCServer(
+            ('localhost', PORT), requestHandler=StreamingHandler,
+            logRequests=False)
+        self.server.register_function(get_big)
+        self.server.register_function(lambda: 'small', 'get_small')
+        self.server.register_function(lambda: set([1]), 'get_set')
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+
+    def post(self, body, version=11):
+        connection = httplib.HTTPConnection('localhost', PORT)
+        connection._http_vsn = version
+        connection._http_vsn_str = 'HTTP/1.%d' % (version - 10)
+        connection.request('POST', '/', body)
+        response = connection.getresponse()
+        return response, response.read()
+
+    def test_chunked(self):
+        response, body = self.post(dumps([], 'get_big', rpcid='1'))
+        self.assertEqual(response.getheader('transfer-encoding'), 'chunked')
+        self.assertEqual(response.getheader('content-length'), None)
+        self.assertEqual(loads(body)['result'], BIG)
+
+    def test_small(self):
+        response, body = self.post(dumps([], 'get_small', rpcid='1'))
+        self.assertEqual(response.getheader('transfer-encoding'), None)
+        self.assertEqual(int(response.getheader('content-length')), len(body))
+        self.assertEqual(loads(body)['result'], 'small')
+
+    def test_http10(self):
+        response, body = self.post(dumps([], 'get_big', rpcid='1'), 10)
+        self.assertEqual(response.getheader('transfer-encoding'), None)
+        self.assertEqual(response.getheader('connection'), 'close')
+        self.assertEqual(loads(body)['result'], BIG)
+
+    def test_get(self):
+        connection = httplib.HTTPConnection('localhost', PORT)
+        connection.request('GET', '/big')
+        response = connection.getresponse()
+        self.assertEqual(response.getheader('transfer-encoding'), 'chunked')
+        self.assertEqual(json.loads(response.read())['result'], BIG)
+
+    def test_encoding_error(self):
+        response, body = self.post(dumps([], 'get_set', rpcid='1'))
+        self.assertEqual(response.status, 200)
+        self.assertEqual(loads(body)['error']['code'], -32603)
+
+        batch = '[%s,%s]' % (dumps([], 'get_small', rpcid='1'),
+                             dumps([], 'get_set', rpcid='2'))
+        response, body = self.post(batch)
+        self.assertEqual(response.status, 200)
+        small, bad = loads(body)
+        self.assertEqual(small['result'], 'small')
+        self.assertEqual((bad['id'], bad['error']['code']), ('2', -32603))
+
+    def test_proxy(self):
+        proxy = Server('http://localhost:%d' % PORT)
+        self.assertEqual(proxy.get_big(), BIG)
+        batch = MultiCall(proxy)
+        batch.get_big()
+        batch.get_small()
+        big, small = list(batch())
+        self.assertEqual((big, small), (BIG, 'small'))
+
+
+if __name__ == '__main__':
+    unittest.main()
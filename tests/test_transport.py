@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+import os
+import sys
+import stat
+import time
+import shutil
+import socket
+import tempfile
+import unittest
+import threading
+from StringIO import StringIO
+
+from slashproc_parser.basic_server import SimpleThreadedJSONRPCServer
+from slashproc_parser.basic_server import get_parsers, get_data
+from slashproc_parser.jsonrpclib import Server, MultiCall, PooledTransport
+from slashproc_parser.jsonrpclib.jsonrpc import UnixHTTPConnection
+from slashproc_parser.jsonrpclib.SimpleJSONRPCServer import \
+    SimpleJSONRPCRequestHandler, SimpleJSONRPCServer
+
+PORT = 18849
+
+
+class CountingHandler(SimpleJSONRPCRequestHandler):
+
+    connections = 0
+    timeout = 0.2
+
+    def setup(self):
+        CountingHandler.connections += 1
+        SimpleJSONRPCRequestHandler.setup(self)
+
+
+class TestPooledTransport(unittest.TestCase):
+
+    def setUp(self):
+        CountingHandler.connections = 0
+        address = ('localhost', PORT)
+        self.server = SimpleThreadedJSONRPCServer(
+            address, requestHandler=CountingHandler, logRequests=False)
+        self.server.register_function(get_parsers)
+        self.server.register_function(get_data)
+        self.thread = threading.Thread(target=self.serve)
+        self.thread.start()
+        self.transport = PooledTransport()
+        self.proxy = Server('http://localhost:%d' % PORT,
+                            transport=self.transport)
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.shutdown()
+        self.thread.join()
+
+    def serve(self):
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+
+    def test_reuse(self):
+        for _ in range(5):
+            self.assertIn('meminfo', self.proxy.get_parsers())
+        self.assertEqual(CountingHandler.connections, 1)
+        self.assertEqual(self.transport.idle(), 1)
+
+    def test_stale_retry(self):
+        self.proxy.get_parsers()
+        # the server closes the idle connection after its timeout
+        time.sleep(0.5)
+        self.assertIn('uptime', self.proxy.get_parsers())
+        self.assertEqual(CountingHandler.connections, 2)
+
+    def test_stale_pool(self):
+        host = 'localhost:%d' % PORT
+        for _ in range(3):
+            connection = self.transport._connect(host)
+            connection.connect()
+            self.transport._release(host, connection)
+        self.assertEqual(self.transport.idle(), 3)
+        stderr, sys.stderr = sys.stderr, StringIO()
+        try:
+            # all three are closed by the server, the retry opens a new one
+            time.sleep(0.5)
+            self.assertIn('uptime', self.proxy.get_parsers())
+            log = sys.stderr.getvalue()
+        finally:
+            sys.stderr = stderr
+        self.assertEqual(CountingHandler.connections, 4)
+        self.assertEqual(self.transport.idle(), 1)
+        # idle connections timing out are not logged with logRequests off
+        self.assertNotIn('timed out', log)
+
+    def test_multicall(self):
+        batch = MultiCall(self.proxy)
+        batch.get_parsers()
+        batch.get_data(parser='uptime')
+        parsers, uptime = list(batch())
+        self.assertIn('uptime', parsers)
+        self.assertIn('found', uptime)
+        self.assertEqual(self.transport.idle(), 1)
+
+    def test_threads(self):
+        errors = list()
+
+        def call():
+            try:
+                for _ in range(10):
+                    self.proxy.get_parsers()
+            except Exception, e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        self.assertTrue(CountingHandler.connections <= 4)
+
+
+class TestSingleServer(unittest.TestCase):
+
+    def setUp(self):
+        CountingHandler.connections = 0
+        self.server = SimpleJSONRPCServer(
+            ('localhost', PORT), requestHandler=CountingHandler,
+            logRequests=False)
+        self.server.register_function(get_parsers)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+
+    def test_no_keep_alive(self):
+        # an idle client would hold off every other one
+        transport = PooledTransport()
+        proxy = Server('http://localhost:%d' % PORT, transport=transport)
+        for _ in range(3):
+            self.assertIn('meminfo', proxy.get_parsers())
+        self.assertEqual(CountingHandler.connections, 3)
+        self.assertEqual(transport.idle(), 0)
+        transport.close()
+
+
+class TestUnixSocket(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'slashproc.sock')
+        self.server = SimpleThreadedJSONRPCServer(
+            # logged requests name the socket, unix peers have no address
+            self.path, requestHandler=CountingHandler, logRequests=True,
+            address_family=socket.AF_UNIX, socket_mode=0600)
+        self.server.register_function(get_parsers)
+        self.thread = threading.Thread(target=self.serve)
+        self.thread.start()
+
+    def tearDown(self):
+        self.stop()
+        shutil.rmtree(self.tmp)
+
+    def stop(self):
+        if self.thread.is_alive():
+            self.server.shutdown()
+            self.thread.join()
+
+    def serve(self):
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+
+    def test_mode(self):
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0600)
+
+    def test_transport(self):
+        proxy = Server('unix:' + self.path)
+        for _ in range(2):
+            self.assertIn('meminfo', proxy.get_parsers())
+
+    def test_pooled(self):
+        CountingHandler.connections = 0
+        transport = PooledTransport(connection_class=UnixHTTPConnection)
+        proxy = Server('unix:' + self.path, transport=transport)
+        for _ in range(3):
+            self.assertIn('meminfo', proxy.get_parsers())
+        self.assertEqual(CountingHandler.connections, 1)
+        transport.close()
+
+    def test_close(self):
+        self.stop()
+        self.assertFalse(os.path.exists(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()